@@ -113,6 +113,11 @@ async function loadMessages() {
     }
 
     updateMessageCount(msgs.length);
+    if (typeof data.viewers === "number") {
+      document.querySelectorAll(".js-viewer-count").forEach((el) => {
+        el.textContent = String(data.viewers);
+      });
+    }
     scrollToBottom();
   } catch (e) {
     box.innerHTML = `<div class="text-danger small">Error carregant missatges.</div>`;
@@ -7,6 +7,7 @@ from django.utils.timezone import localtime
 
 
 from events.models import Event
+from events.presence import get_presence
 from .forms import ChatMessageForm
 from .models import ChatMessage
 
@@ -147,7 +148,8 @@ def chat_load_messages(request, event_pk):
             }
         )
 
-    return JsonResponse({"messages": payload})
+    # Espectadors en directe (presència en memòria, sense consulta)
+    return JsonResponse({"messages": payload, "viewers": get_presence().count(event.pk)})
 
 
 @login_required
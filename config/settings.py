@@ -106,3 +106,98 @@ EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 # CSRF_COOKIE_SECURE = True  # MOD
 # SESSION_COOKIE_SECURE = True  # MOD
 # SECURE_HSTS_SECONDS = 3600  # MOD
+
+# Cerca semàntica
+# Snapshot .npy dels embeddings (un subdirectori per model), mapat per tots els workers
+SEMANTIC_SEARCH_VECTOR_DIR = BASE_DIR / "var" / "vectors"
+# Format dels embeddings a la col·lecció EventEmbedding ("float16" o "int8")
+SEMANTIC_SEARCH_STORAGE_DTYPE = "int8"
+# Format dels vectors al snapshot ("float32" o "int8"); amb int8 es puntua directament sobre els codis
+SEMANTIC_SEARCH_SNAPSHOT_DTYPE = "int8"
+# Cache LRU de vectors de consulta (entrades en memòria per procés)
+SEMANTIC_SEARCH_QUERY_CACHE_SIZE = 1024
+# Nivell persistent opcional de la cache (fitxer SQLite); None = desactivat
+SEMANTIC_SEARCH_QUERY_CACHE_PATH = None
+# Re-embedding automàtic en desar un Event (només si el contingut canvia)
+SEMANTIC_SEARCH_AUTO_REEMBED = True
+SEMANTIC_SEARCH_REEMBED_DELAY = 2.0  # segons d'espera per agrupar canvis en un lot
+SEMANTIC_SEARCH_REEMBED_BATCH_SIZE = 32
+# Micro-lots d'embed_text: agrupa les consultes concurrents en una sola crida al model
+SEMANTIC_SEARCH_BATCH_WINDOW_MS = 5  # 0 = desactivat
+SEMANTIC_SEARCH_BATCH_MAX_SIZE = 32
+# Fils intra-op de torch (0 = valor per defecte de torch)
+SEMANTIC_SEARCH_TORCH_THREADS = 0
+# Sidecar d'embeddings (socket Unix); si no està configurat o no respon, inferència en procés
+SEMANTIC_SEARCH_SIDECAR_SOCKET = os.environ.get("SEMANTIC_SEARCH_SIDECAR_SOCKET") or None
+SEMANTIC_SEARCH_SIDECAR_TIMEOUT = 5.0
+# Carrega el model en arrencar (AppConfig.ready) en lloc de la primera cerca; pensat per als workers
+SEMANTIC_SEARCH_WARMUP_ON_READY = os.environ.get("SEMANTIC_SEARCH_WARMUP_ON_READY") == "1"
+# Backend d'inferència: "torch" (float32) o "torch-int8" (quantització dinàmica de les capes Linear, CPU)
+SEMANTIC_SEARCH_INFERENCE_BACKEND = os.environ.get("SEMANTIC_SEARCH_INFERENCE_BACKEND", "torch")
+# Cerca híbrida: índex BM25 local (títol, descripció, etiquetes) fusionat amb el rànquing vectorial (RRF)
+SEMANTIC_SEARCH_LEXICAL = True
+SEMANTIC_SEARCH_LEXICAL_REFRESH = 30  # segons entre sincronitzacions amb els canvis d'altres workers
+SEMANTIC_SEARCH_RRF_K = 60
+# "Esdeveniments relacionats": recàlcul incremental en segon pla quan canvia el vector o l'estat d'un Event
+SEMANTIC_SEARCH_RELATED_AUTO = True
+# Avís de quasi-duplicats en crear un Event (similitud cosinus amb events del mateix creador)
+SEMANTIC_SEARCH_DUPLICATE_THRESHOLD = 0.92
+SEMANTIC_SEARCH_DUPLICATE_WINDOW_DAYS = 7
+
+# Cache de resultats (cerca semàntica, núvol d'etiquetes, pàgines de categoria)
+# Fa servir la cache "default" de Django; amb un backend compartit (Redis, Memcached)
+# el single-flight coordina tots els workers.
+RESULT_CACHE_ALIAS = "default"
+RESULT_CACHE_TTL = 60  # segons que una entrada es considera fresca
+RESULT_CACHE_STALE_TTL = 600  # segons addicionals en què es pot servir vella mentre es recalcula
+RESULT_CACHE_LOCK_TIMEOUT = 30
+RESULT_CACHE_MAX_WAIT = 2.0  # espera màxima pel resultat d'un altre worker si no n'hi ha cap de vell
+
+# IPs que poden consultar /semantic/metrics/
+INTERNAL_IPS = ["127.0.0.1"]
+
+# Cerca personalitzada: pes del perfil de l'usuari en el vector de la consulta (0 = desactivada)
+SEMANTIC_SEARCH_PERSONALIZATION_WEIGHT = 0.2
+# Mitja vida de les interaccions (events creats, xat, seguiments) en el perfil
+SEMANTIC_SEARCH_PROFILE_HALF_LIFE_DAYS = 30
+
+# Registre de models d'embeddings: SEMANTIC_SEARCH_MODEL és l'actiu inicial; per canviar-lo
+# sense aturar la cerca, afegiu el nou a SEMANTIC_SEARCH_MODELS i executeu migrate_embedding_model
+SEMANTIC_SEARCH_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+SEMANTIC_SEARCH_MODELS = [SEMANTIC_SEARCH_MODEL]
+SEMANTIC_SEARCH_REGISTRY_REFRESH = 10  # segons que cada procés guarda l'estat del registre
+
+# Comptadors d'Event amb escriptura diferida (tendències, visites): segons entre escriptures
+EVENT_COUNTERS_FLUSH_INTERVAL = 5.0
+# Tendències: mitja vida de l'activitat (xat, visites, seguidors nous) i cada quant s'avança l'època
+TRENDING_HALF_LIFE_MINUTES = 60
+TRENDING_REBASE_HOURS = 24
+
+# Presència d'espectadors: interval dels heartbeats i segons sense cap abans de treure'l
+# (l'interval ha de ser menor que PRESENCE_TTL / 2)
+PRESENCE_HEARTBEAT_SECONDS = 15
+PRESENCE_TTL = 45
+# "cache": comptadors a la cache (compartits entre workers si la cache ho és, i amb ells
+# el límit max_viewers); "memory": exacte però per procés (només amb un sol worker)
+PRESENCE_BACKEND = "cache"
+PRESENCE_CACHE_ALIAS = "default"
+
+# Portada materialitzada: targetes per secció (en directe, properes 24 h, destacats) i
+# segons que cada procés la serveix de memòria abans de comprovar-ne la versió
+HOME_FEED_SECTION_SIZE = 8
+HOME_FEED_CACHE_SECONDS = 5
+
+# Feed "Seguint": entrades màximes per timeline, seguidors a partir dels quals un creador
+# no fa fan-out (els seus events es barregen en llegir) i seguidors per lot de bulk_write
+TIMELINE_MAX_ENTRIES = 500
+TIMELINE_FANOUT_MAX_FOLLOWERS = 5000
+TIMELINE_FANOUT_BATCH_SIZE = 1000
+
+# "A qui seguir" (rebuild_follow_suggestions): suggeriments per usuari, pressupost de memòria per
+# bloc de files, usuaris semblants per al co-seguiment i seguidors a partir dels quals un creador
+# és massa popular per indicar semblança; els pesos combinen amics d'amics, co-seguiment i categoria
+FOLLOW_SUGGESTIONS_COUNT = 20
+FOLLOW_SUGGESTIONS_MEMORY_MB = 512
+FOLLOW_SUGGESTIONS_SIMILAR = 50
+FOLLOW_SUGGESTIONS_POPULAR_CAP = 10000
+FOLLOW_SUGGESTIONS_WEIGHTS = {"fof": 1.0, "cofollow": 1.0, "category": 0.5}
@@ -0,0 +1,210 @@
+"""
+Comptadors d'Event amb escriptura diferida (write-behind).
+
+Els increments (activitat per a tendències, visites...) s'acumulen en memòria
+i un fil en segon pla els escriu cada EVENT_COUNTERS_FLUSH_INTERVAL segons
+amb un sol `bulk_write` de `$inc` a la col·lecció d'Events. Així una lectura
+calenta (la pàgina de detall, el xat) no es converteix en una escriptura per
+petició. En una aturada ordenada del procés (`atexit`) s'escriu el que quedi.
+
+Les escriptures no passen per `save()`: no envien signals ni toquen
+`updated_at`, de manera que no invaliden la cache de resultats ni l'índex BM25.
+"""
+import atexit
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CounterBuffer:
+    """
+    Increments pendents per Event (`incr`) o per filtre (`incr_where`, p. ex.
+    tots els events d'un creador), escrits junts a cada `flush`.
+
+    Els hooks (`add_hook`) reben els increments just abans d'escriure'ls i
+    els poden modificar (p. ex. reescalar-los). Els locks (`add_lock`) es
+    prenen abans dels hooks i s'alliberen després de l'escriptura; si algun no
+    s'obté, els increments es tornen a deixar pendents per al proper flush.
+    """
+
+    def __init__(self, interval: float = 5.0, name: str = "events-counters"):
+        self.interval = interval
+        self.name = name
+        self.flushes = 0
+        self.written = 0
+        self._docs = {}    # event_id -> Counter({camp: delta})
+        self._groups = {}  # clau -> (filtre, Counter({camp: delta}))
+        self._hooks = []
+        self._locks = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+    def add_hook(self, fn):
+        self._hooks.append(fn)
+
+    def add_lock(self, factory):
+        """
+        factory(): context manager que retorna True si ha obtingut el lock.
+        """
+        self._locks.append(factory)
+
+    def incr(self, event_id: int, **fields):
+        with self._lock:
+            self._docs.setdefault(event_id, Counter()).update(fields)
+        self._ensure_started()
+
+    def incr_where(self, query: dict, **fields):
+        key = json.dumps(query, sort_keys=True, default=str)
+        with self._lock:
+            self._groups.setdefault(key, (query, Counter()))[1].update(fields)
+        self._ensure_started()
+
+    def pending(self, event_id: int) -> dict:
+        """
+        Increments d'un Event que encara no s'han escrit (només els d'aquest procés).
+        """
+        with self._lock:
+            return dict(self._docs.get(event_id) or {})
+
+    def _ensure_started(self):
+        if self._thread is None and not self._closed:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("No s'han pogut escriure els comptadors (%s)", self.name)
+
+    def flush(self) -> int:
+        """
+        Escriu tots els increments pendents amb un sol bulk_write. Retorna quantes operacions.
+        """
+        from django.db import close_old_connections
+        from pymongo import UpdateMany, UpdateOne
+        from pymongo.errors import BulkWriteError, PyMongoError
+
+        from events.models import Event
+
+        with self._flush_lock:
+            with self._lock:
+                docs, self._docs = self._docs, {}
+                groups, self._groups = self._groups, {}
+            if not docs and not groups:
+                return 0
+
+            with ExitStack() as held:
+                for factory in self._locks:
+                    if not held.enter_context(factory()):
+                        logger.info("Comptadors ajornats (%s): lock ocupat", self.name)
+                        self._merge_back(docs, groups)
+                        return 0
+
+                for hook in self._hooks:
+                    hook(docs, groups)
+
+                ops = [
+                    UpdateOne({"id": event_id}, {"$inc": dict(fields)})
+                    for event_id, fields in docs.items() if fields
+                ]
+                ops += [
+                    UpdateMany(query, {"$inc": dict(fields)})
+                    for query, fields in groups.values() if fields
+                ]
+                if not ops:
+                    return 0
+
+                close_old_connections()
+                try:
+                    Event.objects.mongo_bulk_write(ops, ordered=False)
+                except BulkWriteError:
+                    # Escriptura parcial: reintentar-la duplicaria els que sí s'han aplicat
+                    logger.exception("Comptadors escrits parcialment (%s); es descarta el lot", self.name)
+                    return 0
+                except PyMongoError:
+                    logger.exception("No s'han pogut escriure els comptadors (%s); es reintentarà", self.name)
+                    self._merge_back(docs, groups)
+                    return 0
+
+            self.flushes += 1
+            self.written += len(ops)
+            return len(ops)
+
+    def close(self):
+        """
+        Escriu els increments pendents abans que el procés acabi (registrat a `atexit`).
+        Els increments posteriors continuen acumulant-se però ja no s'escriuen sols.
+        """
+        self._closed = True
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("No s'han pogut escriure els comptadors en aturar (%s)", self.name)
+
+    def _merge_back(self, docs, groups):
+        with self._lock:
+            for event_id, fields in docs.items():
+                self._docs.setdefault(event_id, Counter()).update(fields)
+            for key, (query, fields) in groups.items():
+                self._groups.setdefault(key, (query, Counter()))[1].update(fields)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._docs) + len(self._groups)
+        return {"pending": pending, "flushes": self.flushes, "written": self.written}
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer() -> CounterBuffer:
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = CounterBuffer(
+                    interval=getattr(settings, "EVENT_COUNTERS_FLUSH_INTERVAL", 5.0),
+                )
+                atexit.register(_buffer.close)
+    return _buffer
+
+
+# ==========================
+#   VISITES
+# ==========================
+
+def record_view(event_id: int):
+    """
+    Visita de la pàgina de detall: comptador total i activitat de tendències,
+    en un sol increment en memòria (no fa cap consulta).
+    """
+    from . import trending
+
+    get_buffer().incr(event_id, view_count=1, **trending.view_increment())
+
+
+def view_counts(events) -> dict:
+    """
+    {event_id: visites} dels events ja carregats, sumant-hi els increments
+    d'aquest procés que encara no s'han escrit. No fa cap consulta.
+    """
+    buffer = get_buffer()
+    return {
+        e.pk: (e.view_count or 0) + buffer.pending(e.pk).get("view_count", 0)
+        for e in events
+    }
@@ -2,7 +2,10 @@ from django import forms
 from django.utils import timezone
 from urllib.parse import urlparse
 
-from events.models import Event, CATEGORY_CHOICES, STATUS_CHOICES
+from events.models import Event, CATEGORY_CHOICES, STATUS_CHOICES, normalize_title
+
+# Valor de `EventSearchForm.sort` per ordenar per puntuació de tendències
+SORT_TRENDING = "trending"
 
 
 def _validate_stream_url_or_raise(url: str):
@@ -76,6 +79,13 @@ class EventCreationForm(forms.ModelForm):
             "stream_url": forms.URLInput(attrs={"class": "form-control"}),
         }
 
+    # Només es mostra (com a checkbox) quan s'ha detectat un possible duplicat
+    confirm_duplicate = forms.BooleanField(
+        required=False,
+        label="Crear igualment",
+        widget=forms.HiddenInput(),
+    )
+
     def __init__(self, *args, **kwargs):
         # passem l'usuari des de la vista per validar títol únic per usuari
         self.user = kwargs.pop("user", None)
@@ -108,14 +118,40 @@ class EventCreationForm(forms.ModelForm):
         if self.user and title:
             exists = Event.objects.filter(
                 creator=self.user,
-                title__iexact=title
+                normalized_title=normalize_title(title)
             ).exists()
             if exists:
                 raise forms.ValidationError(
                     "Ja tens un esdeveniment amb aquest títol."
                 )
+
+        if self.user and title and not self.errors and not cleaned_data.get("confirm_duplicate"):
+            self._warn_near_duplicates(cleaned_data)
         return cleaned_data
 
+    def _warn_near_duplicates(self, cleaned_data):
+        """
+        Avisa (abans de desar) si l'esborrany s'assembla molt a un altre
+        esdeveniment del mateix creador en dates properes.
+        """
+        from semantic_search.services.duplicates import find_near_duplicates
+
+        draft = Event(
+            title=cleaned_data.get("title"),
+            description=cleaned_data.get("description"),
+            category=cleaned_data.get("category"),
+            tags=cleaned_data.get("tags"),
+            scheduled_date=cleaned_data.get("scheduled_date"),
+        )
+        duplicates = find_near_duplicates(self.user, draft)
+        if duplicates:
+            self.fields["confirm_duplicate"].widget = forms.CheckboxInput(attrs={"class": "form-check-input"})
+            titles = ", ".join(f"«{e.title}» ({e.scheduled_date:%d/%m/%Y})" for e, _ in duplicates)
+            raise forms.ValidationError(
+                f"Sembla molt similar a: {titles}. "
+                "Si no és un duplicat, marca «Crear igualment» i torna a enviar el formulari."
+            )
+
 
 class EventUpdateForm(forms.ModelForm):
     """
@@ -240,6 +276,13 @@ class EventSearchForm(forms.Form):
         widget=forms.DateInput(attrs={"type": "date", "class": "form-control"})
     )
 
+    sort = forms.ChoiceField(
+        required=False,
+        label="Ordre",
+        choices=[("", "Destacats i recents"), (SORT_TRENDING, "Tendències")],
+        widget=forms.Select(attrs={"class": "form-select"})
+    )
+
     def clean(self):
         cleaned_data = super().clean()
         date_from = cleaned_data.get("date_from")
@@ -0,0 +1,313 @@
+"""
+Portada materialitzada: un sol document (`HomeFeed`) amb les seccions ja
+preparades per renderitzar (dades de targeta, no Events):
+
+- "live": events en directe,
+- "upcoming": programats per a les properes 24 hores,
+- "featured": destacats que encara no han acabat.
+
+El document es manté de manera incremental: quan un Event es crea, canvia
+d'estat, de data, de dades de targeta o de destacat (o s'elimina), només es
+recalcula la seva pertinença a cada secció (`apply_change`). Una secció que
+perd una targeta estant plena es completa amb una consulta limitada.
+Les escriptures són optimistes per `version`, perquè dos workers no
+es trepitgin els canvis.
+
+La finestra de 24 hores depèn del rellotge: `expires_at` és el primer
+instant en què la secció "upcoming" canviaria sola (un event hi entra o en
+surt) i llavors es recalcula.
+
+Lectura (`get_home_feed`): cache per procés; com a molt cada
+HOME_FEED_CACHE_SECONDS es comprova la versió amb una lectura d'un sol camp.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+FEED_KEY = "home"
+SECTIONS = ("live", "upcoming", "featured")
+UPCOMING_WINDOW = timedelta(hours=24)
+# Camps que decideixen la pertinença o el contingut d'una targeta
+FEED_FIELDS = {"title", "category", "status", "scheduled_date", "is_featured", "thumbnail", "creator"}
+MAX_RETRIES = 5
+
+
+def section_size() -> int:
+    return getattr(settings, "HOME_FEED_SECTION_SIZE", 8)
+
+
+# ==========================
+#   SECCIONS
+# ==========================
+
+def _card(event) -> dict:
+    """
+    Dades d'una targeta de la portada (tot el que necessita la plantilla).
+    """
+    creator = event.creator
+    return {
+        "id": event.pk,
+        "title": event.title,
+        "url": event.get_absolute_url(),
+        "category": event.get_category_display(),
+        "status": event.status,
+        "status_display": event.get_status_display(),
+        "is_featured": event.is_featured,
+        "scheduled_ts": event.scheduled_date.timestamp() if event.scheduled_date else None,
+        "scheduled_display": (
+            timezone.localtime(event.scheduled_date).strftime("%d/%m/%Y %H:%M")
+            if event.scheduled_date else ""
+        ),
+        "created_ts": event.created_at.timestamp() if event.created_at else 0.0,
+        "thumbnail_url": event.get_thumbnail_url() if event.thumbnail else "",
+        "creator": getattr(creator, "display_name", "") or creator.username,
+    }
+
+
+def _sort_key(section: str):
+    if section == "live":
+        # Els que han començat més recentment primer
+        return lambda card: -(card["scheduled_ts"] or 0.0)
+    if section == "upcoming":
+        return lambda card: card["scheduled_ts"] or 0.0
+    return lambda card: -card["created_ts"]
+
+
+def _section_queryset(section: str, now):
+    from .models import Event
+
+    qs = Event.objects.select_related("creator")
+    if section == "live":
+        return qs.filter(status="En Directe").order_by("-scheduled_date")
+    if section == "upcoming":
+        return qs.filter(
+            status="Programat", scheduled_date__gte=now, scheduled_date__lte=now + UPCOMING_WINDOW
+        ).order_by("scheduled_date")
+    return qs.filter(is_featured=True, status__in=["Programat", "En Directe"]).order_by("-created_at")
+
+
+def _qualifies(section: str, event, now) -> bool:
+    if section == "live":
+        return event.status == "En Directe"
+    if section == "upcoming":
+        return (
+            event.status == "Programat"
+            and event.scheduled_date is not None
+            and now <= event.scheduled_date <= now + UPCOMING_WINDOW
+        )
+    return event.is_featured and event.status in ("Programat", "En Directe")
+
+
+def _build_section(section: str, now) -> list[dict]:
+    return [_card(e) for e in _section_queryset(section, now)[:section_size()]]
+
+
+def _upcoming_expiry(upcoming: list[dict], now) -> float | None:
+    """
+    Primer instant en què la secció "upcoming" canviaria sense cap escriptura:
+    quan la primera targeta comença o quan el següent event entra a la finestra.
+    """
+    from .models import Event
+
+    candidates = [card["scheduled_ts"] for card in upcoming if card["scheduled_ts"]]
+    nxt = (
+        Event.objects.filter(status="Programat", scheduled_date__gt=now + UPCOMING_WINDOW)
+        .order_by("scheduled_date")
+        .values_list("scheduled_date", flat=True)
+        .first()
+    )
+    if nxt is not None:
+        candidates.append((nxt - UPCOMING_WINDOW).timestamp())
+    return min(candidates) if candidates else None
+
+
+# ==========================
+#   ESCRIPTURA
+# ==========================
+
+def _load():
+    from .models import HomeFeed
+
+    feed = HomeFeed.objects.filter(key=FEED_KEY).first()
+    if feed is None:
+        try:
+            feed = HomeFeed.objects.create(key=FEED_KEY, sections={}, version=0)
+        except IntegrityError:
+            feed = HomeFeed.objects.get(key=FEED_KEY)
+    return feed
+
+
+def _save(feed, sections: dict, expires_at) -> bool:
+    """
+    Desa si ningú no ha canviat el document des que s'ha llegit (versió igual).
+    """
+    from .models import HomeFeed
+
+    result = HomeFeed.objects.mongo_update_one(
+        {"key": FEED_KEY, "version": feed.version},
+        {"$set": {
+            "sections": sections,
+            "expires_at": expires_at,
+            "version": feed.version + 1,
+            "built_at": time.time(),
+        }},
+    )
+    return result.matched_count == 1
+
+
+def _update(mutate) -> bool:
+    """
+    Llegeix el document, aplica `mutate(sections, expires_at, now)` -> (sections, expires_at)
+    i el desa amb control de versió; reintenta si un altre procés l'ha canviat.
+    """
+    for _ in range(MAX_RETRIES):
+        feed = _load()
+        now = timezone.now()
+        sections = {name: list((feed.sections or {}).get(name) or []) for name in SECTIONS}
+        sections, expires_at = mutate(sections, feed.expires_at, now)
+        if _save(feed, sections, expires_at):
+            _cache.invalidate()
+            return True
+    logger.warning("No s'ha pogut actualitzar la portada després de %s intents", MAX_RETRIES)
+    return False
+
+
+def rebuild() -> bool:
+    """
+    Recalcula totes les seccions (una consulta limitada per secció).
+    """
+    def mutate(sections, expires_at, now):
+        sections = {name: _build_section(name, now) for name in SECTIONS}
+        return sections, _upcoming_expiry(sections["upcoming"], now)
+
+    return _update(mutate)
+
+
+def apply_change(event_id: int) -> bool:
+    """
+    Actualitza la portada després que un Event s'hagi creat, modificat o eliminat.
+    """
+    from .models import Event
+
+    def mutate(sections, expires_at, now):
+        event = Event.objects.select_related("creator").filter(pk=event_id).first()
+        size = section_size()
+        for name in SECTIONS:
+            cards = sections[name]
+            was_full = len(cards) >= size
+            removed = any(card["id"] == event_id for card in cards)
+            cards = [card for card in cards if card["id"] != event_id]
+
+            if event is not None and _qualifies(name, event, now):
+                cards.append(_card(event))
+                cards.sort(key=_sort_key(name))
+                cards = cards[:size]
+                if removed and was_full and (not cards or cards[-1]["id"] == event_id):
+                    # S'ha mogut al final: algun event de fora podria anar-hi davant
+                    cards = _build_section(name, now)
+            elif removed and was_full:
+                # Hi pot haver un altre event que ara hi entra
+                cards = _build_section(name, now)
+            sections[name] = cards
+
+        # La finestra pot canviar abans amb aquest event (entra o comença abans)
+        if (
+            event is not None
+            and event.status == "Programat"
+            and event.scheduled_date
+            and event.scheduled_date > now
+        ):
+            ts = event.scheduled_date.timestamp()
+            start = ts - UPCOMING_WINDOW.total_seconds()
+            candidate = ts if start <= now.timestamp() else start
+            expires_at = candidate if expires_at is None else min(expires_at, candidate)
+        return sections, expires_at
+
+    return _update(mutate)
+
+
+def refresh_upcoming() -> bool:
+    """
+    Recalcula la secció "upcoming" quan la finestra de 24 hores ha avançat.
+    """
+    def mutate(sections, expires_at, now):
+        if expires_at is not None and expires_at > now.timestamp():
+            return sections, expires_at  # ja ho ha fet un altre procés
+        sections["upcoming"] = _build_section("upcoming", now)
+        return sections, _upcoming_expiry(sections["upcoming"], now)
+
+    return _update(mutate)
+
+
+# ==========================
+#   LECTURA (cache per procés)
+# ==========================
+
+class _FeedCache:
+    def __init__(self):
+        self.version = None
+        self.sections = None
+        self.expires_at = None
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self.checked_at = 0.0
+
+    @staticmethod
+    def _head():
+        from .models import HomeFeed
+
+        return HomeFeed.objects.mongo_find_one({"key": FEED_KEY}, {"version": 1, "expires_at": 1})
+
+    def get(self):
+        from .models import HomeFeed
+
+        ttl = getattr(settings, "HOME_FEED_CACHE_SECONDS", 5)
+        with self._lock:
+            if self.sections is not None and time.monotonic() - self.checked_at < ttl:
+                if self.expires_at is None or self.expires_at > time.time():
+                    return self.sections
+
+        # Lectura petita: només la versió i la caducitat
+        head = self._head()
+        if head is None:
+            rebuild()
+            head = self._head() or {}
+        elif head.get("expires_at") is not None and head["expires_at"] <= time.time():
+            refresh_upcoming()
+            head = self._head() or {}
+        expires_at = head.get("expires_at")
+
+        with self._lock:
+            if head.get("version") == self.version and self.sections is not None:
+                self.checked_at = time.monotonic()
+                self.expires_at = expires_at
+                return self.sections
+
+        feed = HomeFeed.objects.filter(key=FEED_KEY).first()
+        sections = {name: list((feed.sections or {}).get(name) or []) for name in SECTIONS} if feed else {}
+        with self._lock:
+            self.version = feed.version if feed else None
+            self.sections = sections
+            self.expires_at = feed.expires_at if feed else None
+            self.checked_at = time.monotonic()
+        return sections
+
+
+_cache = _FeedCache()
+
+
+def get_home_feed() -> dict:
+    """
+    {"live": [...], "upcoming": [...], "featured": [...]} amb dades de targeta.
+    """
+    return _cache.get()
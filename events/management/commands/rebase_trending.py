@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from events import trending
+
+
+class Command(BaseCommand):
+    help = (
+        "Avança l'època dels comptadors de tendències (els workers ho fan sols "
+        "cada TRENDING_REBASE_HOURS; útil després d'una aturada llarga)."
+    )
+
+    def handle(self, *args, **options):
+        factor = trending.rebase()
+        self.stdout.write(self.style.SUCCESS(f"Tendències rebasejades (factor {factor:.3g})."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from events import home_feed
+from events.models import HomeFeed
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstrueix la portada materialitzada (els signals la mantenen al dia; "
+        "útil després d'una importació o de canviar HOME_FEED_SECTION_SIZE)."
+    )
+
+    def handle(self, *args, **options):
+        if not home_feed.rebuild():
+            raise CommandError("No s'ha pogut desar la portada (escriptures concurrents).")
+        feed = HomeFeed.objects.get(key=home_feed.FEED_KEY)
+        sizes = ", ".join(f"{name}: {len(feed.sections.get(name) or [])}" for name in home_feed.SECTIONS)
+        self.stdout.write(self.style.SUCCESS(f"Portada reconstruïda (v{feed.version}; {sizes})."))
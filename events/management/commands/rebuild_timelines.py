@@ -0,0 +1,27 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from events import timelines
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstrueix des dels seguiments les timelines del feed \"Seguint\" "
+        "(els signals les mantenen al dia; útil després d'una importació)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", action="append", type=int, default=[], help="Només aquest usuari (repetible)")
+
+    def handle(self, *args, **options):
+        user_ids = options["user"] or list(get_user_model().objects.values_list("pk", flat=True))
+        started = time.monotonic()
+        entries = 0
+        for user_id in user_ids:
+            entries += timelines.rebuild(user_id)
+        self.stdout.write(self.style.SUCCESS(
+            f"Timelines reconstruïdes: {len(user_ids)} usuaris, {entries} entrades "
+            f"en {time.monotonic() - started:.1f}s."
+        ))
@@ -0,0 +1,27 @@
+# Generated by Django 4.1.13 on 2026-10-19 16:20
+
+from django.db import migrations, models
+
+
+def populate_normalized_title(apps, schema_editor):
+    from events.models import normalize_title
+
+    Event = apps.get_model("events", "Event")
+    for event_id, title in Event.objects.values_list("id", "title").iterator():
+        Event.objects.filter(pk=event_id).update(normalized_title=normalize_title(title))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_auto_20260130_1658'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='normalized_title',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(populate_normalized_title, migrations.RunPython.noop),
+    ]
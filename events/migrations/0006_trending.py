@@ -0,0 +1,45 @@
+# Generated by Django 4.1.13 on 2026-10-19 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_event_normalized_title'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('epoch', models.DateTimeField()),
+                ('rebased_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Estat de tendències',
+                'verbose_name_plural': 'Estat de tendències',
+            },
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='trending_chat',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='trending_follows',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='trending_score',
+            field=models.FloatField(db_index=True, default=0.0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='trending_views',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+    ]
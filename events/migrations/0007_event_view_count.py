@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-19 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_trending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='view_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
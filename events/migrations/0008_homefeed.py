@@ -0,0 +1,29 @@
+# Generated by Django 4.1.13 on 2026-10-19 21:10
+
+from django.db import migrations, models
+import djongo.models.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_event_view_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HomeFeed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True)),
+                ('sections', djongo.models.fields.JSONField(default=dict)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('expires_at', models.FloatField(blank=True, null=True)),
+                ('built_at', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Portada',
+                'verbose_name_plural': 'Portada',
+            },
+        ),
+    ]
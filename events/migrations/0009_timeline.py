@@ -0,0 +1,29 @@
+# Generated by Django 4.1.13 on 2026-10-19 21:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import djongo.models.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('events', '0008_homefeed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Timeline',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='timeline', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('entries', djongo.models.fields.JSONField(default=list)),
+                ('pulled', djongo.models.fields.JSONField(default=list)),
+            ],
+            options={
+                'verbose_name': 'Timeline',
+                'verbose_name_plural': 'Timelines',
+            },
+        ),
+    ]
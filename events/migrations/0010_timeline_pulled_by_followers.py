@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-19 23:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0009_timeline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timeline',
+            name='pulled_by_followers',
+            field=models.BooleanField(default=False),
+        ),
+    ]
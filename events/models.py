@@ -7,6 +7,7 @@ from urllib.parse import urlparse, parse_qs
 from collections import Counter
 from io import BytesIO
 import os
+import unicodedata
 
 from django.core.files.base import ContentFile
 from django.templatetags.static import static
@@ -49,12 +50,29 @@ CATEGORY_ESTIMATED_DURATION = {
 }
 
 
+def normalize_title(title: str) -> str:
+    """
+    Clau de comparació d'un títol: NFC, sense distinció de majúscules i amb
+    els espais col·lapsats. Es guarda indexada a Event.normalized_title.
+    """
+    title = unicodedata.normalize("NFC", title or "")
+    return " ".join(title.split()).casefold()
+
+
 class Event(models.Model):
     # --- Camps bàsics ---
     title = models.CharField(
         max_length=200,
         help_text="Títol de l'esdeveniment",
     )
+    # Títol normalitzat (vegeu `normalize_title`) per comprovar duplicats amb l'índex
+    normalized_title = models.CharField(
+        max_length=200,
+        blank=True,
+        default="",
+        editable=False,
+        db_index=True,
+    )
     description = models.TextField(
         help_text="Descripció detallada de l'esdeveniment",
     )
@@ -115,10 +133,26 @@ class Event(models.Model):
         help_text="URL de YouTube, Twitch o similar",
     )
     
-    embedding = models.JSONField(blank=True, null=True)  # llista de floats
+    # Format antic (llista de floats en JSON). Els embeddings nous es guarden a
+    # semantic_search.EventEmbedding; vegeu `migrate_embeddings_storage`.
+    embedding = models.JSONField(blank=True, null=True)
     embedding_model = models.CharField(max_length=200, blank=True, null=True)
     embedding_updated_at = models.DateTimeField(blank=True, null=True)
-    
+
+    # Visites de la pàgina de detall (escriptura diferida, vegeu events/counters.py)
+    view_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Tendències: comptadors d'activitat amb decaïment exponencial, guardats
+    # normalitzats a l'època de `TrendingState` (vegeu events/trending.py) perquè
+    # s'actualitzin només amb $inc i l'ordre sigui el mateix en qualsevol instant.
+    trending_chat = models.FloatField(default=0.0, editable=False)
+    trending_views = models.FloatField(default=0.0, editable=False)
+    trending_follows = models.FloatField(default=0.0, editable=False)
+    trending_score = models.FloatField(default=0.0, editable=False, db_index=True)
+
+    # Permet operacions directes de pymongo (Event.objects.mongo_<mètode>)
+    objects = models.DjongoManager()
+
     class Meta:
         ordering = ["-created_at"]  # Més recents primer
         verbose_name = "Esdeveniment"
@@ -295,6 +329,11 @@ class Event(models.Model):
         """
         Sobreescrivim save per optimitzar la imatge de thumbnail.
         """
+        self.normalized_title = normalize_title(self.title)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "title" in update_fields:
+            kwargs["update_fields"] = list(update_fields) + ["normalized_title"]
+
         # Guardem primer
         super().save(*args, **kwargs)
 
@@ -372,3 +411,81 @@ class Event(models.Model):
                     counter[tag] += 1
 
         return [t for t, _ in counter.most_common(limit)]
+
+
+class TrendingState(models.Model):
+    """
+    Època comuna dels comptadors de tendències (un sol document).
+
+    Els valors guardats són activitat * 2^((t - època) / mitja vida); en
+    "rebasejar", l'època avança i tots els valors es multipliquen pel mateix
+    factor perquè no creixin sense límit.
+    """
+
+    epoch = models.DateTimeField()
+    rebased_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Estat de tendències"
+        verbose_name_plural = "Estat de tendències"
+
+    def __str__(self) -> str:
+        return f"Època {self.epoch:%Y-%m-%d %H:%M}"
+
+
+class HomeFeed(models.Model):
+    """
+    Portada materialitzada (vegeu `events.home_feed`): seccions amb les dades
+    de targeta ja preparades, perquè la pàgina d'inici sigui una sola lectura.
+
+    `version` augmenta a cada escriptura (control optimista i cache per procés);
+    `expires_at` és quan la finestra de "properes 24 hores" canvia sola.
+    """
+
+    key = models.CharField(max_length=50, unique=True)
+    sections = models.JSONField(default=dict)
+    version = models.PositiveIntegerField(default=0)
+    expires_at = models.FloatField(null=True, blank=True)
+    built_at = models.FloatField(null=True, blank=True)
+
+    objects = models.DjongoManager()
+
+    class Meta:
+        verbose_name = "Portada"
+        verbose_name_plural = "Portada"
+
+    def __str__(self) -> str:
+        return f"{self.key} (v{self.version})"
+
+
+class Timeline(models.Model):
+    """
+    Feed "Seguint" d'un usuari (vegeu `events.timelines`).
+
+    `entries`: [{"event_id", "creator_id", "ts"}] dels creadors seguits, més
+    recents primer i limitades a TIMELINE_MAX_ENTRIES. `pulled`: creadors
+    seguits amb massa seguidors per fer fan-out, que es llegeixen en llegir.
+    `pulled_by_followers`: aquest usuari ja s'ha apuntat a `pulled` de tots
+    els seus seguidors (els seus events nous no fan fan-out).
+    La clau primària és l'usuari perquè els upserts de pymongo no necessitin
+    cap id autoincremental.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        primary_key=True,
+        related_name="timeline",
+        on_delete=models.CASCADE,
+    )
+    entries = models.JSONField(default=list)
+    pulled = models.JSONField(default=list)
+    pulled_by_followers = models.BooleanField(default=False)
+
+    objects = models.DjongoManager()
+
+    class Meta:
+        verbose_name = "Timeline"
+        verbose_name_plural = "Timelines"
+
+    def __str__(self) -> str:
+        return f"Timeline de {self.user_id}"
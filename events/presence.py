@@ -0,0 +1,303 @@
+"""
+Presència d'espectadors en temps real (qui està mirant cada event ara).
+
+Els clients de la pàgina de detall envien un heartbeat cada
+PRESENCE_HEARTBEAT_SECONDS; un espectador deixa de comptar quan fa més de
+PRESENCE_TTL segons que no n'envia cap (o quan marxa de la pàgina).
+
+Cap escriptura a la BD per heartbeat. Dos backends (PRESENCE_BACKEND):
+
+- "cache" (per defecte), `CachePresence`: comptadors a la cache de Django,
+  compartits entre workers si la cache ho és (Redis, Memcached). Així el
+  límit `Event.max_viewers` val per a tot el desplegament i no per procés.
+- "memory", `Presence`: comptador exacte en memòria damunt d'una
+  `TimingWheel` (roda de temps amb una ranura per tick: renovar o treure un
+  espectador és O(1) i en avançar només es recorren les ranures caducades).
+  L'estat és per procés: només serveix amb un sol worker.
+"""
+import math
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class TimingWheel:
+    """
+    Caducitat per TTL amb ranures de `tick` segons.
+
+    Una entrada renovada al tick t caduca al tick t + k (k = ceil(ttl / tick))
+    i es guarda a la ranura (t + k) % (k + 1): com que hi ha una ranura més
+    que ticks de vida, mai coincideix amb una entrada encara viva d'una altra volta.
+    """
+
+    def __init__(self, ttl: float, tick: float = 1.0, clock=time.monotonic):
+        self.tick = tick
+        self.ticks_ttl = max(1, math.ceil(ttl / tick))
+        self._slots = [dict() for _ in range(self.ticks_ttl + 1)]  # dict com a conjunt ordenat
+        self._where = {}  # clau -> índex de ranura
+        self._clock = clock
+        self._cursor = self._now_tick()
+
+    def _now_tick(self) -> int:
+        return int(self._clock() // self.tick)
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key) -> bool:
+        return key in self._where
+
+    def advance(self) -> list:
+        """
+        Avança fins al tick actual i retorna les claus caducades.
+        """
+        now = self._now_tick()
+        expired = []
+        # Després d'una pausa llarga n'hi ha prou amb una volta sencera
+        steps = min(now - self._cursor, len(self._slots))
+        for step in range(1, steps + 1):
+            slot = self._slots[(self._cursor + step) % len(self._slots)]
+            if slot:
+                expired.extend(slot)
+                for key in slot:
+                    del self._where[key]
+                slot.clear()
+        self._cursor = max(self._cursor, now)
+        return expired
+
+    def touch(self, key):
+        """
+        Afegeix o renova `key` (caducarà d'aquí a ttl). Cal haver cridat `advance` abans.
+        """
+        self.remove(key)
+        index = (self._cursor + self.ticks_ttl) % len(self._slots)
+        self._slots[index][key] = None
+        self._where[key] = index
+
+    def remove(self, key) -> bool:
+        index = self._where.pop(key, None)
+        if index is None:
+            return False
+        del self._slots[index][key]
+        return True
+
+
+class Presence:
+    """
+    Espectadors actuals per event. Claus de la roda: (event_id, espectador).
+    """
+
+    def __init__(self, ttl: float, tick: float = 1.0):
+        self._wheel = TimingWheel(ttl, tick)
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        for event_id, _ in self._wheel.advance():
+            self._counts[event_id] -= 1
+            if self._counts[event_id] <= 0:
+                del self._counts[event_id]
+
+    def heartbeat(self, event_id: int, viewer: str, limit: int | None = None, bypass: bool = False):
+        """
+        Registra o renova un espectador. Una entrada nova es rebutja si l'event ja
+        té `limit` espectadors (excepte amb `bypass`). Retorna (admès, espectadors).
+        """
+        key = (event_id, viewer)
+        with self._lock:
+            self._expire()
+            if key not in self._wheel:
+                if limit and not bypass and self._counts[event_id] >= limit:
+                    return False, self._counts[event_id]
+                self._counts[event_id] += 1
+            self._wheel.touch(key)
+            return True, self._counts[event_id]
+
+    def leave(self, event_id: int, viewer: str) -> int:
+        with self._lock:
+            self._expire()
+            if self._wheel.remove((event_id, viewer)):
+                self._counts[event_id] -= 1
+                if self._counts[event_id] <= 0:
+                    del self._counts[event_id]
+            return self._counts[event_id]
+
+    def count(self, event_id: int) -> int:
+        with self._lock:
+            self._expire()
+            return self._counts[event_id]
+
+    def counts(self, event_ids) -> dict:
+        with self._lock:
+            self._expire()
+            return {event_id: self._counts[event_id] for event_id in event_ids}
+
+
+class CachePresence:
+    """
+    Espectadors per event a la cache de Django (mateixa interfície que `Presence`).
+
+    El temps es divideix en finestres de ttl / 2 segons. Un espectador compta
+    si ha enviat algun heartbeat a la finestra actual o a l'anterior, és a
+    dir, durant entre ttl / 2 i ttl segons després de l'últim (cal que
+    l'interval dels heartbeats sigui menor que ttl / 2). Per finestra w:
+
+    - "v:<espectador>": vist a w (cache.add, una sola vegada per finestra),
+    - "total": espectadors vists a w,
+    - "new": vists a w que no ho eren a w - 1,
+
+    i espectadors = total(w - 1) + new(w). Tot són `add` / `incr` atòmics;
+    una entrada nova que supera el límit es desfà (pot rebutjar de més, mai
+    admetre de més).
+    """
+
+    def __init__(self, ttl: float, alias: str = "default", clock=time.time):
+        self.window = max(1.0, ttl / 2)
+        self.timeout = int(math.ceil(self.window * 3))
+        self._alias = alias
+        self._clock = clock
+
+    @property
+    def _cache(self):
+        return caches[self._alias]
+
+    def _now(self) -> int:
+        return int(self._clock() // self.window)
+
+    @staticmethod
+    def _key(event_id: int, window: int, name: str) -> str:
+        return f"presence:{event_id}:{window}:{name}"
+
+    def _incr(self, key: str, delta: int = 1) -> int:
+        cache = self._cache
+        cache.add(key, 0, self.timeout)
+        try:
+            return cache.incr(key, delta)
+        except ValueError:
+            # Ha caducat just ara: ja no compta
+            return 0
+
+    def _count(self, event_id: int, window: int, values: dict | None = None) -> int:
+        keys = [self._key(event_id, window - 1, "total"), self._key(event_id, window, "new")]
+        if values is None:
+            values = self._cache.get_many(keys)
+        return max(0, sum(values.get(key) or 0 for key in keys))
+
+    def heartbeat(self, event_id: int, viewer: str, limit: int | None = None, bypass: bool = False):
+        """
+        Registra o renova un espectador. Una entrada nova es rebutja si l'event ja
+        té `limit` espectadors (excepte amb `bypass`). Retorna (admès, espectadors).
+        """
+        w = self._now()
+        seen_now = self._key(event_id, w, f"v:{viewer}")
+        seen_before = self._key(event_id, w - 1, f"v:{viewer}")
+        seen = self._cache.get_many([seen_now, seen_before])
+        if seen_now in seen or not self._cache.add(seen_now, 1, self.timeout):
+            return True, self._count(event_id, w)
+
+        self._incr(self._key(event_id, w, "total"))
+        if seen_before in seen:
+            return True, self._count(event_id, w)
+
+        # Entrada nova: es compta primer i es desfà si passa del límit
+        self._incr(self._key(event_id, w, "new"))
+        viewers = self._count(event_id, w)
+        if limit and not bypass and viewers > limit:
+            self._incr(self._key(event_id, w, "new"), -1)
+            self._incr(self._key(event_id, w, "total"), -1)
+            self._cache.delete(seen_now)
+            return False, viewers - 1
+        return True, viewers
+
+    def leave(self, event_id: int, viewer: str) -> int:
+        w = self._now()
+        seen_now = self._key(event_id, w, f"v:{viewer}")
+        seen_before = self._key(event_id, w - 1, f"v:{viewer}")
+        seen = self._cache.get_many([seen_now, seen_before])
+        if seen_now in seen:
+            self._cache.delete(seen_now)
+            self._incr(self._key(event_id, w, "total"), -1)
+            if seen_before not in seen:
+                self._incr(self._key(event_id, w, "new"), -1)
+        if seen_before in seen:
+            self._cache.delete(seen_before)
+            self._incr(self._key(event_id, w - 1, "total"), -1)
+        return self._count(event_id, w)
+
+    def count(self, event_id: int) -> int:
+        return self._count(event_id, self._now())
+
+    def counts(self, event_ids) -> dict:
+        w = self._now()
+        event_ids = list(event_ids)
+        values = self._cache.get_many([
+            key
+            for event_id in event_ids
+            for key in (self._key(event_id, w - 1, "total"), self._key(event_id, w, "new"))
+        ])
+        return {event_id: self._count(event_id, w, values) for event_id in event_ids}
+
+
+_presence = None
+_presence_lock = threading.Lock()
+
+
+def get_presence():
+    global _presence
+    if _presence is None:
+        with _presence_lock:
+            if _presence is None:
+                ttl = getattr(settings, "PRESENCE_TTL", 45)
+                if getattr(settings, "PRESENCE_BACKEND", "cache") == "memory":
+                    _presence = Presence(ttl=ttl)
+                else:
+                    _presence = CachePresence(ttl=ttl, alias=getattr(settings, "PRESENCE_CACHE_ALIAS", "default"))
+    return _presence
+
+
+def heartbeat_interval() -> int:
+    return getattr(settings, "PRESENCE_HEARTBEAT_SECONDS", 15)
+
+
+# ==========================
+#   IDENTITAT DE L'ESPECTADOR
+# ==========================
+
+VIEWER_COOKIE = "viewer_id"
+_VIEWER_SALT = "events.presence.viewer"
+
+
+def viewer_key(request):
+    """
+    (clau, cookie nova o None). Els usuaris identificats compten un cop
+    encara que tinguin diverses pestanyes; els anònims, per cookie signada
+    (sense crear cap sessió a la BD).
+    """
+    import uuid
+
+    if request.user.is_authenticated:
+        return f"u{request.user.pk}", None
+    token = request.get_signed_cookie(VIEWER_COOKIE, default=None, salt=_VIEWER_SALT)
+    if token:
+        return f"a{token}", None
+    token = uuid.uuid4().hex
+    return f"a{token}", token
+
+
+def set_viewer_cookie(response, token):
+    if token:
+        response.set_signed_cookie(
+            VIEWER_COOKIE, token, salt=_VIEWER_SALT, max_age=30 * 86400, httponly=True, samesite="Lax"
+        )
+    return response
+
+
+def can_bypass_limit(request, event) -> bool:
+    """
+    El creador i el personal sempre poden entrar, encara que l'aforament sigui complet.
+    """
+    user = request.user
+    return user.is_authenticated and (user.is_staff or user.pk == event.creator_id)
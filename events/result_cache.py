@@ -0,0 +1,142 @@
+"""
+Cache compartida de resultats (cerca semàntica, núvol d'etiquetes, pàgines
+de categoria) sobre el framework de cache de Django.
+
+- Clau: espai de noms + paràmetres normalitzats (consulta, filtres...).
+- Cada entrada recorda la versió de dades amb què es va calcular. Els signals
+  d'Event i d'embeddings incrementen la versió (`bump_data_version`), de
+  manera que les entrades anteriors passen a ser "velles".
+- Single-flight: quan una entrada falta o és vella, només el procés que
+  aconsegueix el lock (`cache.add`) la recalcula. La resta serveixen el valor
+  vell si n'hi ha, o esperen breument el resultat del que recalcula.
+
+Amb la cache per defecte (LocMemCache) la coordinació és per procés; amb un
+backend compartit (Redis, Memcached) és entre tots els workers.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "result_cache:data_version"
+# Interval de consulta mentre s'espera el resultat d'un altre procés
+WAIT_POLL_SECONDS = 0.05
+
+
+def _cache():
+    return caches[getattr(settings, "RESULT_CACHE_ALIAS", "default")]
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, (list, tuple, set)):
+        return sorted(_normalize(v) for v in value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def make_key(namespace: str, params: dict) -> str:
+    """
+    Clau estable per a (espai de noms, paràmetres normalitzats).
+    """
+    normalized = {k: _normalize(v) for k, v in params.items() if v not in (None, "", [])}
+    digest = hashlib.sha1(
+        json.dumps(normalized, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+    return f"result_cache:{namespace}:{digest}"
+
+
+def data_version() -> int:
+    cache = _cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, None)
+        version = cache.get(VERSION_KEY) or 1
+    return version
+
+
+def bump_data_version():
+    """
+    Invalida (marca com a velles) totes les entrades calculades fins ara.
+    """
+    cache = _cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # La clau no existia (o ha expirat): cap entrada anterior és vàlida
+        cache.add(VERSION_KEY, 2, None)
+
+
+_stats = {"hits": 0, "stale": 0, "computed": 0, "waited": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name: str):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
+
+
+def get_or_compute(namespace: str, params: dict, compute):
+    """
+    Retorna el resultat en cache per (namespace, params) o el calcula amb
+    `compute()` (un sol càlcul concurrent per clau). El valor ha de ser picklable.
+    """
+    cache = _cache()
+    ttl = getattr(settings, "RESULT_CACHE_TTL", 60)
+    stale_ttl = getattr(settings, "RESULT_CACHE_STALE_TTL", 600)
+    lock_timeout = getattr(settings, "RESULT_CACHE_LOCK_TIMEOUT", 30)
+    max_wait = getattr(settings, "RESULT_CACHE_MAX_WAIT", 2.0)
+
+    key = make_key(namespace, params)
+    version = data_version()
+    entry = cache.get(key)
+    if entry and entry["version"] == version and entry["fresh_until"] > time.time():
+        _count("hits")
+        return entry["value"]
+
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, lock_timeout):
+        try:
+            value = compute()
+            cache.set(
+                key,
+                {"value": value, "version": version, "fresh_until": time.time() + ttl},
+                ttl + stale_ttl,
+            )
+        finally:
+            cache.delete(lock_key)
+        _count("computed")
+        return value
+
+    # Un altre procés ja recalcula aquesta clau
+    if entry is not None:
+        _count("stale")
+        return entry["value"]
+
+    deadline = time.monotonic() + max_wait
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_POLL_SECONDS)
+        entry = cache.get(key)
+        if entry is not None:
+            _count("waited")
+            return entry["value"]
+        if cache.get(lock_key) is None:
+            break
+
+    # El càlcul de l'altre procés ha fallat o triga massa: el fem aquí
+    logger.info("Result cache: s'ha esgotat l'espera per %s; es recalcula.", key)
+    _count("computed")
+    return compute()
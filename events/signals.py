@@ -0,0 +1,145 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from chat.models import ChatMessage
+from events.models import Event
+from users import stats
+from users.models import Follow
+from . import home_feed, timelines, trending
+from .result_cache import bump_data_version
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_result_cache(sender, raw=False, **kwargs):
+    """
+    Qualsevol canvi d'Event fa que els resultats en cache passin a ser vells.
+    """
+    if raw:
+        return
+    transaction.on_commit(bump_data_version)
+
+
+# ==========================
+#   TENDÈNCIES
+# ==========================
+
+@receiver(post_save, sender=ChatMessage)
+def trending_on_chat(sender, instance, created, raw=False, **kwargs):
+    """
+    Cada missatge nou suma a l'activitat de xat de l'event (en memòria).
+    """
+    if raw or not created:
+        return
+    event_id = instance.event_id
+    transaction.on_commit(lambda: trending.record_chat(event_id))
+
+
+@receiver(post_save, sender=Follow)
+def trending_on_follow(sender, instance, created, raw=False, **kwargs):
+    """
+    Un seguidor nou fa pujar els events actius del creador seguit.
+    """
+    if raw or not created:
+        return
+    creator_id = instance.following_id
+    transaction.on_commit(lambda: trending.record_follow(creator_id))
+
+
+# ==========================
+#   PORTADA
+# ==========================
+
+@receiver(post_save, sender=Event)
+def home_feed_on_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """
+    Actualitza la portada materialitzada quan canvia alguna cosa que s'hi veu.
+    """
+    if raw:
+        return
+    if not created and update_fields is not None and not (set(update_fields) & home_feed.FEED_FIELDS):
+        return
+    event_id = instance.pk
+    transaction.on_commit(lambda: home_feed.apply_change(event_id))
+
+
+@receiver(post_delete, sender=Event)
+def home_feed_on_delete(sender, instance, **kwargs):
+    event_id = instance.pk
+    transaction.on_commit(lambda: home_feed.apply_change(event_id))
+
+
+# ==========================
+#   FEED "SEGUINT"
+# ==========================
+
+@receiver(post_save, sender=Event)
+def timeline_on_create(sender, instance, created, raw=False, **kwargs):
+    """
+    Event nou: fan-out a les timelines dels seguidors (en segon pla).
+    """
+    if raw or not created:
+        return
+    event_id = instance.pk
+    transaction.on_commit(lambda: timelines.enqueue_fan_out(event_id))
+
+
+@receiver(post_delete, sender=Event)
+def timeline_on_delete(sender, instance, **kwargs):
+    event_id, creator_id = instance.pk, instance.creator_id
+    transaction.on_commit(lambda: timelines.remove_event(event_id, creator_id))
+
+
+@receiver(post_save, sender=Follow)
+def timeline_on_follow(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    follower_id, creator_id = instance.follower_id, instance.following_id
+    transaction.on_commit(lambda: timelines.backfill(follower_id, creator_id))
+
+
+@receiver(post_delete, sender=Follow)
+def timeline_on_unfollow(sender, instance, **kwargs):
+    follower_id, creator_id = instance.follower_id, instance.following_id
+    transaction.on_commit(lambda: timelines.prune(follower_id, creator_id))
+
+
+# ==========================
+#   ESTADÍSTIQUES DEL CREADOR
+# ==========================
+
+@receiver(pre_save, sender=Event)
+def stats_remember_status(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Guarda l'estat anterior per saber, després de desar, si ha canviat.
+    """
+    instance._previous_status = None
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and "status" not in update_fields:
+        return
+    instance._previous_status = (
+        Event.objects.filter(pk=instance.pk).values_list("status", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Event)
+def stats_on_event_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    creator_id, status = instance.creator_id, instance.status
+    if created:
+        transaction.on_commit(lambda: stats.event_created(creator_id, status))
+        return
+    previous = getattr(instance, "_previous_status", None)
+    if previous and previous != status:
+        transaction.on_commit(lambda: stats.event_status_changed(creator_id, previous, status))
+    # Un segon save() del mateix objecte no ha de tornar a comptar el canvi
+    instance._previous_status = None
+
+
+@receiver(post_delete, sender=Event)
+def stats_on_event_delete(sender, instance, **kwargs):
+    creator_id, status = instance.creator_id, instance.status
+    transaction.on_commit(lambda: stats.event_deleted(creator_id, status))
@@ -0,0 +1,52 @@
+// static/events/js/presence.js
+// Heartbeats de presència de la pàgina de detall: mantenen l'espectador
+// comptat i actualitzen el comptador d'espectadors en directe.
+document.addEventListener("DOMContentLoaded", function () {
+  const box = document.getElementById("event-presence");
+  if (!box) return;
+
+  const heartbeatUrl = box.dataset.heartbeatUrl;
+  const leaveUrl = box.dataset.leaveUrl;
+  const interval = Number(box.dataset.interval || 15) * 1000;
+  const csrfInput = box.querySelector('input[name="csrfmiddlewaretoken"]');
+  const csrf = csrfInput ? csrfInput.value : "";
+  const full = document.getElementById("event-presence-full");
+  // Si l'aforament era complet en carregar, el stream no s'ha renderitzat
+  const startedFull = full && !full.classList.contains("d-none");
+
+  const updateCount = function (viewers) {
+    document.querySelectorAll(".js-viewer-count").forEach((el) => {
+      el.textContent = String(viewers);
+    });
+  };
+
+  const beat = function () {
+    fetch(heartbeatUrl, {
+      method: "POST",
+      headers: { "X-CSRFToken": csrf },
+      credentials: "same-origin",
+    })
+      .then((resp) => resp.json().then((data) => ({ ok: resp.ok, data })))
+      .then(({ ok, data }) => {
+        if (typeof data.viewers === "number") updateCount(data.viewers);
+        if (ok && startedFull) {
+          window.location.reload();
+          return;
+        }
+        if (full) full.classList.toggle("d-none", ok);
+      })
+      .catch(() => {
+        // Un heartbeat perdut no passa res: el TTL cobreix uns quants intervals
+      });
+  };
+
+  setInterval(beat, interval);
+
+  // En marxar de la pàgina s'allibera el lloc sense esperar el TTL
+  window.addEventListener("pagehide", function () {
+    if (!navigator.sendBeacon) return;
+    const data = new FormData();
+    data.append("csrfmiddlewaretoken", csrf);
+    navigator.sendBeacon(leaveUrl, data);
+  });
+});
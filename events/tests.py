@@ -1,3 +1,669 @@
-from django.test import TestCase
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from pymongo import UpdateMany, UpdateOne
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from events import counters, home_feed, result_cache, signals, timelines, trending
+from events.counters import CounterBuffer
+from events.models import Event, Timeline
+from events.presence import CachePresence, Presence, TimingWheel
+
+
+LOCMEM = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "events-tests"},
+}
+
+
+# ==========================
+#   CACHE DE RESULTATS
+# ==========================
+
+@override_settings(CACHES=LOCMEM, RESULT_CACHE_TTL=60, RESULT_CACHE_MAX_WAIT=2.0)
+class ResultCacheTests(SimpleTestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.calls = 0
+
+    def _compute(self, value="resultat"):
+        def compute():
+            self.calls += 1
+            return value
+        return compute
+
+    def test_make_key_normalizes_params(self):
+        a = result_cache.make_key("cerca", {"q": "  Minecraft  Live ", "tags": ["b", "a"], "page": None})
+        b = result_cache.make_key("cerca", {"q": "minecraft live", "tags": ["a", "b"]})
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, result_cache.make_key("altres", {"q": "minecraft live", "tags": ["a", "b"]}))
+
+    def test_second_call_is_a_hit(self):
+        self.assertEqual(result_cache.get_or_compute("cerca", {"q": "x"}, self._compute()), "resultat")
+        self.assertEqual(result_cache.get_or_compute("cerca", {"q": "x"}, self._compute()), "resultat")
+        self.assertEqual(self.calls, 1)
+
+    def test_bump_data_version_recomputes(self):
+        result_cache.get_or_compute("cerca", {"q": "x"}, self._compute("v1"))
+        version = result_cache.data_version()
+        result_cache.bump_data_version()
+        self.assertEqual(result_cache.data_version(), version + 1)
+        self.assertEqual(result_cache.get_or_compute("cerca", {"q": "x"}, self._compute("v2")), "v2")
+        self.assertEqual(self.calls, 2)
+
+    def test_bump_without_version_key(self):
+        caches["default"].delete(result_cache.VERSION_KEY)
+        result_cache.bump_data_version()
+        self.assertEqual(result_cache.data_version(), 2)
+
+    def test_stale_value_served_while_another_worker_recomputes(self):
+        result_cache.get_or_compute("cerca", {"q": "x"}, self._compute("vell"))
+        result_cache.bump_data_version()
+        key = result_cache.make_key("cerca", {"q": "x"})
+        caches["default"].add(f"{key}:lock", 1, 30)
+
+        self.assertEqual(result_cache.get_or_compute("cerca", {"q": "x"}, self._compute("nou")), "vell")
+        self.assertEqual(self.calls, 1)
+
+    def test_single_flight_under_concurrency(self):
+        started = threading.Event()
+
+        def slow():
+            self.calls += 1
+            started.set()
+            time.sleep(0.2)
+            return "lent"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(result_cache.get_or_compute("cerca", {"q": "y"}, slow)))
+            for _ in range(5)
+        ]
+        threads[0].start()
+        started.wait(1)
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, ["lent"] * 5)
+
+
+# ==========================
+#   PRESÈNCIA
+# ==========================
+
+class _Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TimingWheelTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = _Clock()
+        self.wheel = TimingWheel(ttl=3, tick=1, clock=self.clock)
+
+    def test_entry_expires_after_ttl(self):
+        self.wheel.touch("a")
+        self.clock.now += 2
+        self.assertEqual(self.wheel.advance(), [])
+        self.clock.now += 1
+        self.assertEqual(self.wheel.advance(), ["a"])
+        self.assertNotIn("a", self.wheel)
+
+    def test_touch_renews(self):
+        self.wheel.touch("a")
+        self.clock.now += 2
+        self.wheel.advance()
+        self.wheel.touch("a")
+        self.clock.now += 2
+        self.assertEqual(self.wheel.advance(), [])
+        self.clock.now += 1
+        self.assertEqual(self.wheel.advance(), ["a"])
+
+    def test_long_pause_expires_everything_once(self):
+        self.wheel.touch("a")
+        self.clock.now += 1
+        self.wheel.advance()
+        self.wheel.touch("b")
+        self.clock.now += 100
+        self.assertCountEqual(self.wheel.advance(), ["a", "b"])
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_remove(self):
+        self.wheel.touch("a")
+        self.assertTrue(self.wheel.remove("a"))
+        self.assertFalse(self.wheel.remove("a"))
+        self.clock.now += 5
+        self.assertEqual(self.wheel.advance(), [])
+
+
+class PresenceTests(SimpleTestCase):
+    def test_limit_applies_to_new_viewers_only(self):
+        presence = Presence(ttl=45)
+        self.assertEqual(presence.heartbeat(1, "a", limit=2), (True, 1))
+        self.assertEqual(presence.heartbeat(1, "b", limit=2), (True, 2))
+        self.assertEqual(presence.heartbeat(1, "c", limit=2), (False, 2))
+        self.assertEqual(presence.heartbeat(1, "a", limit=2), (True, 2))
+        self.assertEqual(presence.heartbeat(1, "c", limit=2, bypass=True), (True, 3))
+
+    def test_leave_frees_a_place(self):
+        presence = Presence(ttl=45)
+        presence.heartbeat(1, "a", limit=1)
+        self.assertEqual(presence.leave(1, "a"), 0)
+        self.assertEqual(presence.heartbeat(1, "b", limit=1), (True, 1))
+        self.assertEqual(presence.counts([1, 2]), {1: 1, 2: 0})
+
+
+@override_settings(CACHES=LOCMEM)
+class CachePresenceTests(SimpleTestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.clock = _Clock()
+        # Finestres de 20 s
+        self.presence = CachePresence(ttl=40, clock=self.clock)
+
+    def test_limit_applies_to_new_viewers_only(self):
+        self.assertEqual(self.presence.heartbeat(1, "a", limit=2), (True, 1))
+        self.assertEqual(self.presence.heartbeat(1, "b", limit=2), (True, 2))
+        self.assertEqual(self.presence.heartbeat(1, "c", limit=2), (False, 2))
+        self.assertEqual(self.presence.heartbeat(1, "a", limit=2), (True, 2))
+        self.assertEqual(self.presence.heartbeat(1, "c", limit=2, bypass=True), (True, 3))
+
+    def test_instances_share_counts(self):
+        # Dos workers amb la mateixa cache veuen els mateixos espectadors
+        other = CachePresence(ttl=40, clock=self.clock)
+        self.presence.heartbeat(1, "a", limit=1)
+        self.assertEqual(other.heartbeat(1, "b", limit=1), (False, 1))
+        self.assertEqual(other.count(1), 1)
+
+    def test_viewer_expires_without_heartbeats(self):
+        self.presence.heartbeat(1, "a")
+        self.presence.heartbeat(1, "b")
+        self.clock.now += 20
+        self.presence.heartbeat(1, "a")
+        self.assertEqual(self.presence.count(1), 2)
+        self.clock.now += 20
+        self.assertEqual(self.presence.count(1), 1)
+        self.clock.now += 20
+        self.assertEqual(self.presence.count(1), 0)
+
+    def test_leave_frees_a_place(self):
+        self.presence.heartbeat(1, "a", limit=1)
+        self.clock.now += 20
+        self.presence.heartbeat(1, "a", limit=1)
+        self.assertEqual(self.presence.leave(1, "a"), 0)
+        self.assertEqual(self.presence.heartbeat(1, "b", limit=1), (True, 1))
+        self.assertEqual(self.presence.counts([1, 2]), {1: 1, 2: 0})
+
+
+# ==========================
+#   COMPTADORS
+# ==========================
+
+@contextmanager
+def _lock(acquired):
+    yield acquired
+
+
+class CounterBufferTests(SimpleTestCase):
+    def setUp(self):
+        # Interval llarg: el fil de fons no arriba a escriure durant el test
+        self.buffer = CounterBuffer(interval=3600, name="tests")
+        patcher = mock.patch.object(Event, "objects")
+        self.objects = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _written_ops(self):
+        (ops,), kwargs = self.objects.mongo_bulk_write.call_args
+        self.assertFalse(kwargs["ordered"])
+        return ops
+
+    def test_increments_are_aggregated_in_one_bulk_write(self):
+        self.buffer.incr(1, view_count=1)
+        self.buffer.incr(1, view_count=2, trending_views=0.5)
+        self.buffer.incr(2, view_count=1)
+        self.buffer.incr_where({"creator_id": 5}, trending_follows=1.0)
+        self.buffer.incr_where({"creator_id": 5}, trending_follows=2.0)
+
+        self.assertEqual(self.buffer.flush(), 3)
+        self.objects.mongo_bulk_write.assert_called_once()
+        ops = self._written_ops()
+        self.assertIn(UpdateOne({"id": 1}, {"$inc": {"view_count": 3, "trending_views": 0.5}}), ops)
+        self.assertIn(UpdateOne({"id": 2}, {"$inc": {"view_count": 1}}), ops)
+        self.assertIn(UpdateMany({"creator_id": 5}, {"$inc": {"trending_follows": 3.0}}), ops)
+        self.assertEqual(self.buffer.stats(), {"pending": 0, "flushes": 1, "written": 3})
+
+    def test_empty_flush_does_not_write(self):
+        self.assertEqual(self.buffer.flush(), 0)
+        self.objects.mongo_bulk_write.assert_not_called()
+
+    def test_mongo_error_keeps_increments_for_next_flush(self):
+        self.buffer.incr(1, view_count=2)
+        self.buffer.incr_where({"creator_id": 5}, trending_follows=1.0)
+        self.objects.mongo_bulk_write.side_effect = AutoReconnect("caiguda")
+        with self.assertLogs("events.counters", "ERROR"):
+            self.assertEqual(self.buffer.flush(), 0)
+
+        self.buffer.incr(1, view_count=1)
+        self.assertEqual(self.buffer.pending(1), {"view_count": 3})
+        self.objects.mongo_bulk_write.side_effect = None
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertIn(UpdateMany({"creator_id": 5}, {"$inc": {"trending_follows": 1.0}}), self._written_ops())
+
+    def test_busy_lock_postpones_flush(self):
+        hook = mock.Mock()
+        self.buffer.add_lock(lambda: _lock(False))
+        self.buffer.add_hook(hook)
+        self.buffer.incr(1, view_count=1)
+
+        self.assertEqual(self.buffer.flush(), 0)
+        self.objects.mongo_bulk_write.assert_not_called()
+        hook.assert_not_called()
+        self.assertEqual(self.buffer.pending(1), {"view_count": 1})
+
+    def test_hooks_run_with_the_lock_held(self):
+        held = []
+
+        @contextmanager
+        def lock():
+            held.append(True)
+            yield True
+            held.pop()
+
+        self.buffer.add_lock(lock)
+        self.buffer.add_hook(lambda docs, groups: self.assertEqual(held, [True]))
+        self.buffer.incr(1, view_count=1)
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(held, [])
+
+    def test_partial_write_discards_batch(self):
+        # Reintentar-lo sumaria dues vegades el que sí s'ha aplicat
+        self.buffer.incr(1, view_count=1)
+        self.objects.mongo_bulk_write.side_effect = BulkWriteError({"writeErrors": [{"index": 0}]})
+        with self.assertLogs("events.counters", "ERROR"):
+            self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.buffer.pending(1), {})
+        self.assertEqual(self.buffer.stats()["pending"], 0)
+
+    def test_view_counts_add_pending_increments(self):
+        self.buffer.incr(1, view_count=2)
+        events = [SimpleNamespace(pk=1, view_count=10), SimpleNamespace(pk=2, view_count=None)]
+        with mock.patch.object(counters, "get_buffer", return_value=self.buffer):
+            self.assertEqual(counters.view_counts(events), {1: 12, 2: 0})
+
+
+# ==========================
+#   TENDÈNCIES
+# ==========================
+
+EPOCH = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+HOUR = timedelta(hours=1)
+
+
+@override_settings(TRENDING_HALF_LIFE_MINUTES=60, TRENDING_REBASE_HOURS=24)
+class TrendingTests(SimpleTestCase):
+    def setUp(self):
+        self.now = EPOCH
+        patcher = mock.patch("events.trending.timezone.now", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for name, value in (("_epoch", EPOCH.timestamp()), ("_read_epoch", (float("inf"), EPOCH.timestamp()))):
+            patcher = mock.patch.object(trending, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _state(self, epoch=EPOCH):
+        return mock.Mock(epoch=epoch, rebased_at=None)
+
+    def test_increment_grows_with_time_since_epoch(self):
+        self.now = EPOCH + 2 * HOUR
+        self.assertEqual(trending._increment(trending.FIELD_CHAT, 1.0), {
+            trending.FIELD_CHAT: 4.0,
+            trending.FIELD_SCORE: 4.0,
+        })
+
+    def test_current_value_decays_by_half_life(self):
+        self.now = EPOCH + 3 * HOUR
+        stored = trending._increment(trending.FIELD_CHAT, 1.0)[trending.FIELD_CHAT]
+        self.assertAlmostEqual(trending.current_value(stored, now=self.now), 1.0)
+        self.assertAlmostEqual(trending.current_value(stored, now=self.now + HOUR), 0.5)
+        self.assertEqual(trending.current_value(None), 0.0)
+
+    def test_chat_per_minute_for_a_steady_rate(self):
+        # Un missatge per minut durant 10 mitges vides
+        self.now = EPOCH + 10 * HOUR
+        stored = sum(
+            trending._growth((self.now - timedelta(minutes=m)).timestamp(), EPOCH.timestamp())
+            for m in range(600)
+        )
+        event = SimpleNamespace(trending_chat=stored)
+        self.assertAlmostEqual(trending.chat_per_minute(event, now=self.now), 1.0, delta=0.01)
+
+    def test_rebase_multiplies_by_the_epoch_factor(self):
+        state = self._state()
+        self.now = EPOCH + 2 * HOUR
+        with mock.patch.object(Event, "objects") as objects:
+            factor = trending._rebase_locked(state)
+
+        self.assertAlmostEqual(factor, 0.25)
+        (query, update), _ = objects.mongo_update_many.call_args
+        self.assertEqual(query, {})
+        self.assertEqual(update, {"$mul": {name: factor for name in trending.FIELDS}})
+        self.assertEqual(state.epoch, self.now)
+        state.save.assert_called_once_with(update_fields=["epoch", "rebased_at"])
+
+    def test_rebase_keeps_current_values(self):
+        self.now = EPOCH + 5 * HOUR
+        stored = trending._increment(trending.FIELD_CHAT, 1.0)[trending.FIELD_CHAT]
+        before = trending.current_value(stored, now=self.now)
+        with mock.patch.object(Event, "objects"):
+            factor = trending._rebase_locked(self._state())
+        with mock.patch.object(trending, "_read_epoch", (float("inf"), self.now.timestamp())):
+            self.assertAlmostEqual(trending.current_value(stored * factor, now=self.now), before)
+
+    def test_flush_hook_rescales_pending_increments(self):
+        docs = {1: {trending.FIELD_CHAT: 8.0, trending.FIELD_SCORE: 8.0, "view_count": 3}}
+        groups = {"k": ({"creator_id": 5}, {trending.FIELD_FOLLOWS: 4.0})}
+        new_epoch = EPOCH + 3 * HOUR
+        with mock.patch.object(trending, "_sync_epoch_locked", return_value=new_epoch.timestamp()):
+            trending._before_flush(docs, groups)
+
+        self.assertEqual(docs[1], {trending.FIELD_CHAT: 1.0, trending.FIELD_SCORE: 1.0, "view_count": 3})
+        self.assertEqual(groups["k"][1], {trending.FIELD_FOLLOWS: 0.5})
+        self.assertEqual(trending._epoch, new_epoch.timestamp())
+
+    def test_flush_hook_without_epoch_change(self):
+        docs = {1: {trending.FIELD_CHAT: 8.0}}
+        with mock.patch.object(trending, "_sync_epoch_locked", return_value=EPOCH.timestamp()):
+            trending._before_flush(docs, {})
+        self.assertEqual(docs[1], {trending.FIELD_CHAT: 8.0})
+
+    def test_stale_epoch_is_rebased_before_flushing(self):
+        state = self._state()
+        self.now = EPOCH + 25 * HOUR
+        with mock.patch.object(trending, "_state", return_value=state), \
+                mock.patch.object(trending, "_rebase_locked", wraps=lambda s: setattr(s, "epoch", self.now)) as rebase:
+            self.assertEqual(trending._sync_epoch_locked(), self.now.timestamp())
+        rebase.assert_called_once_with(state)
+
+    def test_fresh_epoch_is_not_rebased(self):
+        self.now = EPOCH + 23 * HOUR
+        with mock.patch.object(trending, "_state", return_value=self._state()), \
+                mock.patch.object(trending, "_rebase_locked") as rebase:
+            self.assertEqual(trending._sync_epoch_locked(), EPOCH.timestamp())
+        rebase.assert_not_called()
+
+
+# ==========================
+#   PORTADA
+# ==========================
+
+def _feed_event(pk, status="Programat", start=None, featured=False, now=EPOCH):
+    return SimpleNamespace(
+        pk=pk,
+        status=status,
+        scheduled_date=now + start if start is not None else None,
+        is_featured=featured,
+        created_at=now,
+    )
+
+
+def _feed_card(event):
+    return {
+        "id": event.pk,
+        "scheduled_ts": event.scheduled_date.timestamp() if event.scheduled_date else None,
+        "created_ts": event.created_at.timestamp(),
+    }
+
+
+@override_settings(HOME_FEED_SECTION_SIZE=2)
+class HomeFeedApplyChangeTests(SimpleTestCase):
+    def setUp(self):
+        self.build_section = self._patch(home_feed, "_build_section", side_effect=lambda name, now: [{"id": "rebuilt"}])
+        self.objects = self._patch(Event, "objects")
+        self._patch(home_feed, "_card", side_effect=_feed_card)
+
+    def _patch(self, target, attribute, **kwargs):
+        patcher = mock.patch.object(target, attribute, **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def _apply(self, event, sections, expires_at=None, event_id=None):
+        """
+        Executa `apply_change` sobre unes seccions en memòria. Retorna (seccions, expires_at).
+        """
+        result = {}
+
+        def update(mutate):
+            full = {name: list(sections.get(name, [])) for name in home_feed.SECTIONS}
+            result["value"] = mutate(full, expires_at, EPOCH)
+            return True
+
+        self.objects.select_related.return_value.filter.return_value.first.return_value = event
+        with mock.patch.object(home_feed, "_update", update):
+            home_feed.apply_change(event_id if event_id is not None else event.pk)
+        return result["value"]
+
+    def _upcoming(self, *hours):
+        return [_feed_card(_feed_event(pk, start=h * HOUR)) for pk, h in hours]
+
+    def test_new_event_enters_a_section_in_order(self):
+        sections, _ = self._apply(_feed_event(3, start=2 * HOUR), {"upcoming": self._upcoming((1, 1))})
+        self.assertEqual([card["id"] for card in sections["upcoming"]], [1, 3])
+        self.build_section.assert_not_called()
+
+    def test_removed_from_full_section_rebuilds_it(self):
+        # L'event 1 acaba: la secció plena perd una targeta i cal completar-la
+        finished = _feed_event(1, status="Finalitzat", start=HOUR)
+        sections, _ = self._apply(finished, {"upcoming": self._upcoming((1, 1), (2, 2))})
+        self.assertEqual(sections["upcoming"], [{"id": "rebuilt"}])
+        self.build_section.assert_called_once_with("upcoming", EPOCH)
+
+    def test_deleted_event_leaves_partial_section_without_rebuild(self):
+        sections, _ = self._apply(None, {"upcoming": self._upcoming((1, 1))}, event_id=1)
+        self.assertEqual(sections["upcoming"], [])
+        self.build_section.assert_not_called()
+
+    def test_moved_to_tail_of_full_section_rebuilds_it(self):
+        # Ajornat darrere de l'altre: un event de fora podria anar-hi davant
+        moved = _feed_event(1, start=3 * HOUR)
+        sections, _ = self._apply(moved, {"upcoming": self._upcoming((1, 1), (2, 2))})
+        self.assertEqual(sections["upcoming"], [{"id": "rebuilt"}])
+        self.build_section.assert_called_once_with("upcoming", EPOCH)
+
+    def test_moved_inside_full_section_keeps_it(self):
+        moved = _feed_event(2, start=HOUR / 2)
+        sections, _ = self._apply(moved, {"upcoming": self._upcoming((1, 1), (2, 2))})
+        self.assertEqual([card["id"] for card in sections["upcoming"]], [2, 1])
+        self.build_section.assert_not_called()
+
+    def test_expiry_shrinks_when_event_enters_window_earlier(self):
+        # Programat d'aquí 30 h: entra a la finestra de 24 h d'aquí 6 h
+        later = (EPOCH + 10 * HOUR).timestamp()
+        _, expires_at = self._apply(_feed_event(5, start=30 * HOUR), {}, expires_at=later)
+        self.assertEqual(expires_at, (EPOCH + 6 * HOUR).timestamp())
+
+    def test_expiry_is_start_for_event_inside_window(self):
+        _, expires_at = self._apply(_feed_event(5, start=2 * HOUR), {}, expires_at=None)
+        self.assertEqual(expires_at, (EPOCH + 2 * HOUR).timestamp())
+
+    def test_expiry_not_extended(self):
+        sooner = (EPOCH + HOUR).timestamp()
+        _, expires_at = self._apply(_feed_event(5, start=30 * HOUR), {}, expires_at=sooner)
+        self.assertEqual(expires_at, sooner)
+
+
+# ==========================
+#   FEED "SEGUINT"
+# ==========================
+
+def _entry(event_id, ts, creator_id=1):
+    return {"event_id": event_id, "creator_id": creator_id, "ts": ts}
+
+
+@override_settings(TIMELINE_FANOUT_MAX_FOLLOWERS=2, TIMELINE_MAX_ENTRIES=500)
+class TimelineTests(SimpleTestCase):
+    def setUp(self):
+        self.timeline = self._patch(Timeline, "objects")
+        self.events = self._patch(Event, "objects")
+        self.followers_count = self._patch_path("users.stats.followers_count", return_value=0)
+        self.batches = self._patch(timelines, "_follower_batches", return_value=[[10, 11]])
+        # in_bulk retorna "events" identificats pel seu pk
+        self.events.select_related.return_value.in_bulk.side_effect = lambda ids: {pk: pk for pk in ids}
+
+    def _patch(self, target, attribute, **kwargs):
+        patcher = mock.patch.object(target, attribute, **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def _patch_path(self, path, **kwargs):
+        patcher = mock.patch(path, **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def _pulled_events(self, rows):
+        chain = self.events.filter.return_value.order_by.return_value.values_list.return_value
+        chain.__getitem__.return_value = rows
+
+    # ---------- Lectura ----------
+
+    def test_read_merges_pulled_creators_by_date(self):
+        self.timeline.mongo_find_one.return_value = {
+            "entries": [_entry(1, 30.0), _entry(2, 10.0)],
+            "pulled": [9],
+        }
+        self._pulled_events([(3, 9, datetime.fromtimestamp(20.0, dt_timezone.utc))])
+
+        events, has_more = timelines.read(5, limit=10)
+        self.assertEqual(events, [1, 3, 2])
+        self.assertFalse(has_more)
+        self.events.filter.assert_called_once_with(creator_id__in=[9])
+
+    def test_read_pages_with_has_more(self):
+        entries = [_entry(pk, 100.0 - pk) for pk in range(1, 6)]
+        self.timeline.mongo_find_one.return_value = {"entries": entries}
+
+        self.assertEqual(timelines.read(5, offset=0, limit=2), ([1, 2], True))
+        self.assertEqual(timelines.read(5, offset=2, limit=2), ([3, 4], True))
+        self.assertEqual(timelines.read(5, offset=4, limit=2), ([5], False))
+        (_, projection), _ = self.timeline.mongo_find_one.call_args
+        self.assertEqual(projection["entries"], {"$slice": [0, 7]})
+
+    def test_read_skips_duplicates_and_deleted_events(self):
+        self.timeline.mongo_find_one.return_value = {"entries": [_entry(1, 30.0), _entry(1, 30.0), _entry(2, 20.0)]}
+        self.events.select_related.return_value.in_bulk.side_effect = lambda ids: {1: 1}
+        self.assertEqual(timelines.read(5), ([1], False))
+
+    def test_read_without_entries_rebuilds(self):
+        # Document creat només amb la marca de lectura (o inexistent): es construeix
+        self.timeline.mongo_find_one.side_effect = [{"pulled_by_followers": True}, {"entries": [_entry(1, 1.0)]}]
+        with mock.patch.object(timelines, "rebuild") as rebuild:
+            self.assertEqual(timelines.read(5), ([1], False))
+        rebuild.assert_called_once_with(5)
+
+    # ---------- Pas a lectura ----------
+
+    def test_switch_to_pull_happens_once(self):
+        self.timeline.mongo_find_one.return_value = None
+        self.followers_count.return_value = 3
+        self.assertTrue(timelines.is_pulled(1))
+
+        (ops,), _ = self.timeline.mongo_bulk_write.call_args
+        self.assertEqual(ops, [UpdateMany({"user_id": {"$in": [10, 11]}}, {"$addToSet": {"pulled": 1}})])
+        self.timeline.mongo_update_one.assert_called_once_with(
+            {"user_id": 1}, {"$set": {"pulled_by_followers": True}}, upsert=True
+        )
+
+        # Ja marcat: una sola lectura, sense recórrer seguidors
+        self.timeline.reset_mock()
+        self.followers_count.reset_mock()
+        self.timeline.mongo_find_one.return_value = {"pulled_by_followers": True}
+        self.assertTrue(timelines.is_pulled(1))
+        self.followers_count.assert_not_called()
+        self.timeline.mongo_bulk_write.assert_not_called()
+        self.timeline.mongo_update_one.assert_not_called()
+
+    def test_below_threshold_stays_pushed(self):
+        self.timeline.mongo_find_one.return_value = None
+        self.followers_count.return_value = 2
+        self.assertFalse(timelines.is_pulled(1))
+        self.timeline.mongo_bulk_write.assert_not_called()
+
+    def test_fan_out_skips_pulled_creator(self):
+        self.timeline.mongo_find_one.return_value = {"pulled_by_followers": True}
+        self.batches.reset_mock()
+        event = SimpleNamespace(pk=7, creator_id=1, created_at=EPOCH)
+        self.assertEqual(timelines.fan_out(event), 0)
+        self.batches.assert_not_called()
+        self.timeline.mongo_bulk_write.assert_not_called()
+
+    def test_fan_out_pushes_to_built_timelines_only(self):
+        self.timeline.mongo_find_one.return_value = None
+        event = SimpleNamespace(pk=7, creator_id=1, created_at=EPOCH)
+        self.assertEqual(timelines.fan_out(event), 2)
+
+        (ops,), _ = self.timeline.mongo_bulk_write.call_args
+        self.assertEqual(ops[0], UpdateOne(
+            {"user_id": 10, "entries": {"$exists": True}, "entries.event_id": {"$ne": 7}},
+            {"$push": {"entries": timelines._push([_entry(7, EPOCH.timestamp())])}},
+        ))
+        self.assertEqual(len(ops), 2)
+
+    def test_backfill_of_pulled_creator_adds_it_to_pulled(self):
+        self.timeline.mongo_find_one.return_value = {"pulled_by_followers": True}
+        timelines.backfill(5, 1)
+        self.timeline.mongo_update_one.assert_called_once_with(
+            {"user_id": 5, "entries": {"$exists": True}}, {"$addToSet": {"pulled": 1}}
+        )
+        self.events.filter.assert_not_called()
+
+
+# ==========================
+#   ESTADÍSTIQUES (SIGNALS)
+# ==========================
+
+class EventStatsSignalTests(SimpleTestCase):
+    def setUp(self):
+        self.event = SimpleNamespace(pk=1, creator_id=9, status="Programat", _state=SimpleNamespace(adding=False))
+        self.objects = self._patch(Event, "objects")
+        self.changed = self._patch(signals.stats, "event_status_changed")
+        # Sense transacció: els callbacks s'executen al moment
+        self._patch(signals.transaction, "on_commit", side_effect=lambda fn: fn())
+
+    def _patch(self, target, attribute, **kwargs):
+        patcher = mock.patch.object(target, attribute, **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def _save(self, stored_status, update_fields=None):
+        self.objects.filter.return_value.values_list.return_value.first.return_value = stored_status
+        signals.stats_remember_status(Event, self.event, update_fields=update_fields)
+        signals.stats_on_event_save(Event, self.event, created=False)
+
+    def test_status_change_is_counted_once_across_two_saves(self):
+        self.event.status = "En Directe"
+        self._save("Programat")
+        # Segon save() sense tocar l'estat (p. ex. només el títol)
+        self._save("En Directe", update_fields=["title"])
+        self._save("En Directe")
+        self.changed.assert_called_once_with(9, "Programat", "En Directe")
+
+    def test_post_save_without_pre_save_does_not_recount(self):
+        self.event.status = "En Directe"
+        self._save("Programat")
+        signals.stats_on_event_save(Event, self.event, created=False)
+        self.assertEqual(self.changed.call_count, 1)
+
+    def test_save_without_status_change(self):
+        self._save("Programat")
+        self.changed.assert_not_called()
@@ -0,0 +1,294 @@
+"""
+Feed "Seguint": timelines per usuari amb fan-out en escriptura.
+
+Cada usuari té un document `Timeline` (clau primària = usuari) amb les
+entrades {"event_id", "creator_id", "ts"} dels creadors que segueix,
+ordenades per data de publicació (més recents primer) i limitades a
+TIMELINE_MAX_ENTRIES. Llegir una pàgina és una sola consulta per clau amb
+`$slice`, sense creuar Follow i Event.
+
+- Event nou: s'afegeix a la timeline de tots els seguidors del creador amb
+  `$push` + `$each`/`$sort`/`$slice` (en segon pla, per lots de bulk_write).
+- Creadors amb més de TIMELINE_FANOUT_MAX_FOLLOWERS seguidors (híbrid): no
+  es fa fan-out; el creador s'apunta a `pulled` dels seguidors i els seus
+  events es barregen en llegir (una consulta per `creator_id`). Això es fa
+  una sola vegada, quan es detecta que ha passat el llindar (en publicar o
+  en guanyar un seguidor), i queda marcat a la seva pròpia Timeline
+  (`pulled_by_followers`): a partir d'aquí publicar no recorre cap seguidor.
+  Els seguidors nous l'afegeixen a `pulled` en el backfill. Un creador que
+  torna a baixar del llindar continua per lectura.
+- Seguir: s'hi afegeixen de cop els events recents del creador (backfill).
+- Deixar de seguir: se'n treuen totes les entrades amb un `$pull`.
+
+Les entrades d'events esborrats també es treuen; si alguna s'escapa,
+la lectura la descarta perquè l'Event ja no existeix.
+"""
+import logging
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def max_entries() -> int:
+    return getattr(settings, "TIMELINE_MAX_ENTRIES", 500)
+
+
+def fanout_max_followers() -> int:
+    return getattr(settings, "TIMELINE_FANOUT_MAX_FOLLOWERS", 5000)
+
+
+def _batch_size() -> int:
+    return getattr(settings, "TIMELINE_FANOUT_BATCH_SIZE", 1000)
+
+
+def _entry(event) -> dict:
+    return {"event_id": event.pk, "creator_id": event.creator_id, "ts": event.created_at.timestamp()}
+
+
+def _push(entries: list[dict]) -> dict:
+    """
+    Afegeix entrades mantenint l'ordre (més recents primer) i el límit.
+    """
+    return {"$each": entries, "$sort": {"ts": -1}, "$slice": max_entries()}
+
+
+def _bulk_write(ops):
+    from .models import Timeline
+
+    if ops:
+        Timeline.objects.mongo_bulk_write(ops, ordered=False)
+
+
+def _follower_batches(creator_id: int):
+    from users.models import Follow
+
+    ids = Follow.objects.filter(following_id=creator_id).values_list("follower_id", flat=True)
+    batch = []
+    for follower_id in ids.iterator():
+        batch.append(follower_id)
+        if len(batch) >= _batch_size():
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def is_pulled(creator_id: int) -> bool:
+    """
+    True si els events del creador es llegeixen en llegir el feed (massa
+    seguidors per fer fan-out). El primer cop que passa el llindar s'apunta a
+    `pulled` de tots els seguidors i queda marcat; després és una sola lectura.
+    """
+    from users.stats import followers_count
+
+    from .models import Timeline
+
+    doc = Timeline.objects.mongo_find_one({"user_id": creator_id}, {"pulled_by_followers": 1})
+    if doc and doc.get("pulled_by_followers"):
+        return True
+    # Comptador desnormalitzat: una lectura per clau en lloc d'un count() sobre Follow
+    if followers_count(creator_id) <= fanout_max_followers():
+        return False
+    _switch_to_pull(creator_id)
+    return True
+
+
+def _switch_to_pull(creator_id: int):
+    """
+    Apunta el creador a `pulled` de tots els seus seguidors i ho marca.
+    Idempotent: si s'interromp, el proper `is_pulled` ho torna a fer.
+    """
+    from pymongo import UpdateMany
+    from pymongo.errors import DuplicateKeyError
+
+    from .models import Timeline
+
+    for batch in _follower_batches(creator_id):
+        _bulk_write([UpdateMany(
+            {"user_id": {"$in": batch}},
+            {"$addToSet": {"pulled": creator_id}},
+        )])
+    # Sense `entries` al document nou: llegir-lo encara en fa el rebuild
+    mark = {"$set": {"pulled_by_followers": True}}
+    try:
+        Timeline.objects.mongo_update_one({"user_id": creator_id}, mark, upsert=True)
+    except DuplicateKeyError:
+        # Un altre procés ha creat el document alhora: ara ja existeix
+        Timeline.objects.mongo_update_one({"user_id": creator_id}, mark)
+    logger.info("Creador %s passa a lectura al feed \"Seguint\"", creator_id)
+
+
+# ==========================
+#   ESCRIPTURA
+# ==========================
+
+def fan_out(event) -> int:
+    """
+    Afegeix un event nou a les timelines dels seguidors del creador. Retorna
+    quants seguidors s'han actualitzat (0 si el creador va per lectura).
+    """
+    from pymongo import UpdateOne
+
+    if is_pulled(event.creator_id):
+        return 0
+
+    entry = _entry(event)
+    written = 0
+    for batch in _follower_batches(event.creator_id):
+        # Sense upsert: qui encara no té timeline la construirà sencera en llegir-la
+        _bulk_write([
+            UpdateOne(
+                {"user_id": follower_id, "entries": {"$exists": True}, "entries.event_id": {"$ne": event.pk}},
+                {"$push": {"entries": _push([entry])}},
+            )
+            for follower_id in batch
+        ])
+        written += len(batch)
+    logger.debug("Event %s afegit a %s timelines", event.pk, written)
+    return written
+
+
+def fan_out_many(event_ids: list[int]) -> int:
+    from .models import Event
+
+    written = 0
+    for event in Event.objects.filter(pk__in=event_ids):
+        written += fan_out(event)
+    return written
+
+
+def remove_event(event_id: int, creator_id: int):
+    """
+    Treu un event esborrat de les timelines dels seguidors del creador.
+    """
+    from pymongo import UpdateMany
+
+    for batch in _follower_batches(creator_id):
+        _bulk_write([UpdateMany(
+            {"user_id": {"$in": batch}},
+            {"$pull": {"entries": {"event_id": event_id}}},
+        )])
+
+
+def backfill(follower_id: int, creator_id: int):
+    """
+    Nou seguiment: els events recents del creador entren de cop a la timeline
+    (o, si el creador va per lectura, s'apunta a `pulled`).
+    """
+    from .models import Event, Timeline
+
+    # Només timelines ja construïdes; les altres es construeixen senceres en llegir-les
+    built = {"user_id": follower_id, "entries": {"$exists": True}}
+    if is_pulled(creator_id):
+        Timeline.objects.mongo_update_one(built, {"$addToSet": {"pulled": creator_id}})
+        return
+
+    events = Event.objects.filter(creator_id=creator_id).order_by("-created_at")[:max_entries()]
+    entries = [_entry(e) for e in events]
+    if not entries:
+        return
+
+    # Primer es treuen les que ja hi fossin perquè no quedin duplicades
+    Timeline.objects.mongo_update_one(built, {"$pull": {"entries": {"creator_id": creator_id}}})
+    Timeline.objects.mongo_update_one(built, {"$push": {"entries": _push(entries)}})
+
+
+def prune(follower_id: int, creator_id: int):
+    """
+    Deixar de seguir: fora totes les entrades del creador (un sol update).
+    """
+    from .models import Timeline
+
+    Timeline.objects.mongo_update_one(
+        {"user_id": follower_id},
+        {"$pull": {"entries": {"creator_id": creator_id}, "pulled": creator_id}},
+    )
+
+
+def rebuild(user_id: int) -> int:
+    """
+    Reconstrueix la timeline d'un usuari des dels seus seguiments. Retorna quantes entrades.
+    """
+    from users.models import Follow
+
+    from .models import Event, Timeline
+
+    creator_ids = list(Follow.objects.filter(follower_id=user_id).values_list("following_id", flat=True))
+    pulled = [c for c in creator_ids if is_pulled(c)]
+    pushed = [c for c in creator_ids if c not in pulled]
+    events = (
+        Event.objects.filter(creator_id__in=pushed).order_by("-created_at")[:max_entries()]
+        if pushed else []
+    )
+    entries = [_entry(e) for e in events]
+    Timeline.objects.mongo_update_one(
+        {"user_id": user_id},
+        {"$set": {"entries": entries, "pulled": pulled}},
+        upsert=True,
+    )
+    return len(entries)
+
+
+# Fan-out en segon pla: crear un event no espera les escriptures als seguidors
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def enqueue_fan_out(event_id: int):
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                from semantic_search.services.reembed_queue import ReembedWorker
+                _worker = ReembedWorker(
+                    delay=0.5,
+                    batch_size=16,
+                    process=fan_out_many,
+                    name="events-timelines",
+                )
+    _worker.enqueue(event_id)
+
+
+# ==========================
+#   LECTURA
+# ==========================
+
+def read(user_id: int, offset: int = 0, limit: int = 20):
+    """
+    Pàgina del feed: (events, hi ha més). Les entrades es llegeixen amb un sol
+    `$slice` per clau; els creadors de `pulled` s'hi barregen per data.
+    """
+    from .models import Event, Timeline
+
+    projection = {"entries": {"$slice": [0, offset + limit + 1]}, "pulled": 1}
+    doc = Timeline.objects.mongo_find_one({"user_id": user_id}, projection)
+    if doc is None or "entries" not in doc:
+        # Primer cop (o usuari anterior als timelines): es construeix des dels seguiments
+        rebuild(user_id)
+        doc = Timeline.objects.mongo_find_one({"user_id": user_id}, projection) or {}
+    entries = list(doc.get("entries") or [])
+    pulled = doc.get("pulled") or []
+
+    if pulled:
+        extra = (
+            Event.objects.filter(creator_id__in=pulled)
+            .order_by("-created_at")
+            .values_list("pk", "creator_id", "created_at")[:offset + limit + 1]
+        )
+        entries += [{"event_id": pk, "creator_id": c, "ts": created.timestamp()} for pk, c, created in extra]
+        entries.sort(key=lambda entry: -entry["ts"])
+
+    seen = set()
+    ids = []
+    for entry in entries:
+        if entry["event_id"] not in seen:
+            seen.add(entry["event_id"])
+            ids.append(entry["event_id"])
+    page_ids = ids[offset:offset + limit]
+    has_more = len(ids) > offset + limit
+
+    by_id = Event.objects.select_related("creator").in_bulk(page_ids)
+    # Entrades d'events esborrats: simplement no es mostren
+    return [by_id[pk] for pk in page_ids if pk in by_id], has_more
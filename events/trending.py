@@ -0,0 +1,238 @@
+"""
+Puntuació de tendències ("Tendències") amb comptadors de decaïment exponencial.
+
+Cada Event té tres comptadors d'activitat (missatges de xat, visites del
+detall i seguidors nous del creador) i una puntuació combinada. Per no haver
+de llegir i reescriure el valor decaigut a cada increment, es guarden
+normalitzats a una època comuna E:
+
+    valor guardat = sum(pes * 2^((t - E) / mitja_vida))
+    valor actual  = valor guardat / 2^((ara - E) / mitja_vida)
+
+Així cada activitat és només un `$inc` (via `CounterBuffer`) i, com que el
+divisor és el mateix per a tots els events, ordenar per `trending_score`
+(indexat) dona el rànquing actual sense agregar la col·lecció de missatges.
+
+Com que els valors guardats creixen amb el temps, cada TRENDING_REBASE_HOURS
+l'època avança (`rebase`): tots els valors es multipliquen (`$mul`) pel mateix
+factor. Els increments pendents d'aquest procés es reescalen abans d'escriure's.
+
+El rebase i els flushes dels comptadors comparteixen un lock a la cache: entre
+llegir l'època, reescalar els increments i escriure'ls no hi pot caure cap
+`$mul` d'un altre procés (amb una cache compartida, com el lock de la cache de
+resultats).
+"""
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .counters import get_buffer
+
+logger = logging.getLogger(__name__)
+
+WEIGHT_CHAT = 1.0
+WEIGHT_VIEW = 0.2
+WEIGHT_FOLLOW = 3.0
+
+FIELD_CHAT = "trending_chat"
+FIELD_VIEWS = "trending_views"
+FIELD_FOLLOWS = "trending_follows"
+FIELD_SCORE = "trending_score"
+FIELDS = (FIELD_CHAT, FIELD_VIEWS, FIELD_FOLLOWS, FIELD_SCORE)
+
+# Un seguidor nou només fa pujar els events del creador que encara es poden veure
+ACTIVE_STATUSES = ["Programat", "En Directe"]
+
+_WRITE_LOCK_KEY = "trending:write"
+_WRITE_LOCK_TIMEOUT = 300
+# Espera màxima pel lock abans d'ajornar el flush (o fallar el rebase manual)
+_WRITE_LOCK_WAIT = 2.0
+
+_epoch = None  # època (timestamp) amb què s'escalen els increments d'aquest procés
+_epoch_lock = threading.Lock()
+
+
+def half_life_seconds() -> float:
+    return getattr(settings, "TRENDING_HALF_LIFE_MINUTES", 60) * 60
+
+
+def _growth(ts: float, epoch: float) -> float:
+    return 2.0 ** ((ts - epoch) / half_life_seconds())
+
+
+def _state():
+    from .models import TrendingState
+
+    state = TrendingState.objects.order_by("pk").first()
+    if state is None:
+        state = TrendingState.objects.create(epoch=timezone.now())
+    return state
+
+
+def _current_epoch() -> float:
+    global _epoch
+    if _epoch is None:
+        with _epoch_lock:
+            if _epoch is None:
+                _epoch = _state().epoch.timestamp()
+    return _epoch
+
+
+# ==========================
+#   REGISTRE D'ACTIVITAT
+# ==========================
+
+def _increment(field: str, weight: float) -> dict:
+    g = _growth(timezone.now().timestamp(), _current_epoch())
+    return {field: g, FIELD_SCORE: weight * g}
+
+
+def record_chat(event_id: int):
+    get_buffer().incr(event_id, **_increment(FIELD_CHAT, WEIGHT_CHAT))
+
+
+def view_increment() -> dict:
+    """
+    Increments d'una visita (vegeu `counters.record_view`, que hi afegeix el total).
+    """
+    return _increment(FIELD_VIEWS, WEIGHT_VIEW)
+
+
+def record_follow(creator_id: int):
+    """
+    Un seguidor nou suma a tots els events actius del creador (un sol UpdateMany).
+    """
+    g = _growth(timezone.now().timestamp(), _current_epoch())
+    get_buffer().incr_where(
+        {"creator_id": creator_id, "status": {"$in": ACTIVE_STATUSES}},
+        **{FIELD_FOLLOWS: g, FIELD_SCORE: WEIGHT_FOLLOW * g},
+    )
+
+
+@contextmanager
+def write_lock(wait: float = _WRITE_LOCK_WAIT):
+    """
+    Exclusió entre el `$mul` del rebase i els `$inc` dels flushes (entre
+    processos si la cache és compartida). Retorna True si s'ha obtingut.
+    """
+    deadline = time.monotonic() + wait
+    acquired = cache.add(_WRITE_LOCK_KEY, 1, _WRITE_LOCK_TIMEOUT)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(0.05)
+        acquired = cache.add(_WRITE_LOCK_KEY, 1, _WRITE_LOCK_TIMEOUT)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            cache.delete(_WRITE_LOCK_KEY)
+
+
+def _before_flush(docs, groups):
+    """
+    Hook del CounterBuffer (amb `write_lock` pres): si l'època ha canviat
+    (rebase en aquest o en un altre procés), reescala els increments pendents
+    abans d'escriure'ls. L'època no pot tornar a canviar fins que s'escriuen.
+    """
+    global _epoch
+    if _epoch is None:
+        return
+    fresh = _sync_epoch_locked()
+    with _epoch_lock:
+        old, _epoch = _epoch, fresh
+    if fresh == old:
+        return
+    factor = 2.0 ** ((old - fresh) / half_life_seconds())
+    counters = list(docs.values()) + [fields for _, fields in groups.values()]
+    for fields in counters:
+        for name in FIELDS:
+            if name in fields:
+                fields[name] *= factor
+
+
+get_buffer().add_lock(write_lock)
+get_buffer().add_hook(_before_flush)
+
+
+# ==========================
+#   REBASE
+# ==========================
+
+def _rebase_locked(state, now=None) -> float:
+    from .models import Event
+
+    now = now or timezone.now()
+    factor = 2.0 ** ((state.epoch.timestamp() - now.timestamp()) / half_life_seconds())
+    Event.objects.mongo_update_many({}, {"$mul": {name: factor for name in FIELDS}})
+    state.epoch = now
+    state.rebased_at = now
+    state.save(update_fields=["epoch", "rebased_at"])
+    logger.info("Tendències rebasejades (factor %.3g)", factor)
+    return factor
+
+
+def rebase(state=None, now=None) -> float:
+    """
+    Avança l'època fins a `now` i multiplica tots els valors pel factor corresponent.
+    Retorna el factor aplicat.
+    """
+    with write_lock(wait=_WRITE_LOCK_TIMEOUT) as acquired:
+        if not acquired:
+            raise RuntimeError("No s'ha pogut obtenir el lock de tendències.")
+        # Es rellegeix dins del lock: un altre procés pot haver rebasejat abans
+        return _rebase_locked(_state() if state is None else state, now)
+
+
+def _sync_epoch_locked() -> float:
+    """
+    Època vigent (amb `write_lock` pres). Si té més de TRENDING_REBASE_HOURS,
+    abans la rebaseja.
+    """
+    state = _state()
+    max_age = timedelta(hours=getattr(settings, "TRENDING_REBASE_HOURS", 24))
+    if timezone.now() - state.epoch >= max_age:
+        _rebase_locked(state)
+    return state.epoch.timestamp()
+
+
+# ==========================
+#   LECTURA
+# ==========================
+
+_read_epoch = (0.0, None)  # (caduca, època) per a les lectures
+
+
+def _epoch_for_reading() -> float:
+    """
+    Època per convertir valors guardats, rellegida com a molt cada minut (un
+    procés que només llegeix no passa mai pel hook del flush).
+    """
+    global _read_epoch
+    expires, epoch = _read_epoch
+    if epoch is None or expires < time.monotonic():
+        epoch = _state().epoch.timestamp()
+        _read_epoch = (time.monotonic() + 60, epoch)
+    return epoch
+
+
+def current_value(stored: float, now=None) -> float:
+    """
+    Valor decaigut a `now` d'un comptador guardat.
+    """
+    now = now or timezone.now()
+    return (stored or 0.0) / _growth(now.timestamp(), _epoch_for_reading())
+
+
+def chat_per_minute(event, now=None) -> float:
+    """
+    Missatges per minut (aproximats) del xat d'un event: per a un ritme r
+    constant, el comptador decaigut tendeix a r * mitja_vida / ln 2.
+    """
+    decayed = current_value(event.trending_chat, now)
+    return decayed * math.log(2) / (half_life_seconds() / 60)
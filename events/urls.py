@@ -7,9 +7,12 @@ urlpatterns = [
     path("", views.event_list_view, name="event_list"),
     path("create/", views.event_create_view, name="event_create"),
     path("my-events/", views.my_events_view, name="my_events"),
+    path("following/", views.following_feed_view, name="following_feed"),
     path("category/<str:category>/", views.events_by_category_view, name="events_by_category"),
     path("<int:pk>/", views.event_detail_view, name="event_detail"),
     path("<int:pk>/edit/", views.event_update_view, name="event_update"),
     path("<int:pk>/delete/", views.event_delete_view, name="event_delete"),
+    path("<int:pk>/presence/", views.presence_heartbeat_view, name="presence_heartbeat"),
+    path("<int:pk>/presence/leave/", views.presence_leave_view, name="presence_leave"),
     path("api/tags-autocomplete/", views.tags_autocomplete_view, name="tags_autocomplete"),
 ]
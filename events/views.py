@@ -4,10 +4,17 @@ from django.db import DatabaseError
 from django.http import Http404, HttpResponseForbidden, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.core.paginator import Paginator
+from django.views.decorators.http import require_POST
+from pymongo.errors import PyMongoError
 from chat.forms import ChatMessageForm  
 
 from events.models import Event, CATEGORY_CHOICES
-from .forms import EventCreationForm, EventUpdateForm, EventSearchForm
+from events.result_cache import get_or_compute
+from semantic_search.services.related import related_for
+from users.suggestions import get_suggestions
+from . import presence, timelines
+from .counters import record_view, view_counts
+from .forms import EventCreationForm, EventUpdateForm, EventSearchForm, SORT_TRENDING
 
 
 # ==========================
@@ -31,8 +38,10 @@ def _filter_and_sort_events(events, form):
     Aplica filtres i ordenació en memòria sobre una llista d'events.
     - Cerca per títol/descr
     - Filtre categoria, estat, etiquetes, dates
-    - Ordenació: destacats primer, després created_at desc
+    - Ordenació: destacats primer, després created_at desc; amb "Tendències"
+      es manté l'ordre de la consulta (per trending_score)
     """
+    sort = ""
     if not form.is_valid():
         filtered = events
     else:
@@ -44,6 +53,7 @@ def _filter_and_sort_events(events, form):
         tag = (cleaned.get("tag") or "").strip().lower()
         date_from = cleaned.get("date_from")
         date_to = cleaned.get("date_to")
+        sort = cleaned.get("sort") or ""
 
         filtered = []
         for e in events:
@@ -82,6 +92,9 @@ def _filter_and_sort_events(events, form):
             if ok:
                 filtered.append(e)
 
+    if sort == SORT_TRENDING:
+        return filtered
+
     # Ordenació: destacats primer, després per created_at desc
     def sort_key(ev):
         created_ts = 0
@@ -119,8 +132,13 @@ def event_list_view(request):
     """
     form = EventSearchForm(request.GET or None)
 
+    # "Tendències": l'ordre el dona l'índex de trending_score, sense agregar els missatges
+    queryset = Event.objects.all()
+    if form.is_valid() and form.cleaned_data.get("sort") == SORT_TRENDING:
+        queryset = Event.objects.order_by("-trending_score", "-created_at")
+
     events = _safe_list(
-        Event.objects.all(),
+        queryset,
         request,
         "S'ha produït un error accedint als esdeveniments a la base de dades.",
     )
@@ -128,8 +146,11 @@ def event_list_view(request):
     # Filtres + ordenació
     events = _filter_and_sort_events(events, form)
 
-    # Tag cloud 
-    tag_cloud = Event.get_tag_cloud(limit=30)
+    # Tag cloud (compartit entre usuaris fins al proper canvi d'Event)
+    try:
+        tag_cloud = get_or_compute("tag_cloud", {"limit": 30}, lambda: Event.get_tag_cloud(limit=30))
+    except DatabaseError:
+        tag_cloud = []
 
     # Paginació
     paginator = Paginator(events, 12)
@@ -160,12 +181,82 @@ def event_detail_view(request, pk):
 
     is_creator = request.user.is_authenticated and event.creator == request.user
 
+    # Només s'acumula en memòria; l'escriptura es fa en segon pla (CounterBuffer)
+    record_view(event.pk)
+
+    # Presència: entrar a la pàgina compta com el primer heartbeat
+    viewer, new_token = presence.viewer_key(request)
+    admitted, viewers = _presence_heartbeat(request, event, viewer)
+
+    # Veïns precalculats: si la lectura falla, la pàgina es mostra sense
+    try:
+        related_events = related_for(event)
+    except DatabaseError:
+        related_events = []
+
     context = {
         "event": event,
         "is_creator": is_creator,
         "chat_form": ChatMessageForm(),
+        "related_events": related_events,
+        "presence": {
+            "admitted": admitted,
+            "viewers": viewers,
+            "heartbeat_seconds": presence.heartbeat_interval(),
+        },
+    }
+    response = render(request, "events/event_detail.html", context)
+    return presence.set_viewer_cookie(response, new_token)
+
+
+# ==========================
+#   PRESÈNCIA (heartbeats)
+# ==========================
+
+def _presence_heartbeat(request, event, viewer):
+    """
+    L'aforament (max_viewers) només s'aplica mentre l'event és en directe.
+    """
+    return presence.get_presence().heartbeat(
+        event.pk,
+        viewer,
+        limit=event.max_viewers if event.is_live else None,
+        bypass=presence.can_bypass_limit(request, event),
+    )
+
+
+@require_POST
+def presence_heartbeat_view(request, pk):
+    """
+    Renova la presència de l'espectador. Retorna 403 si és una entrada nova i
+    l'aforament és complet. Només llegeix l'Event; no escriu res a la BD.
+    """
+    event = Event.objects.only("id", "creator_id", "status", "max_viewers").filter(pk=pk).first()
+    if event is None:
+        raise Http404("Esdeveniment no trobat.")
+
+    viewer, new_token = presence.viewer_key(request)
+    admitted, viewers = _presence_heartbeat(request, event, viewer)
+    payload = {
+        "success": admitted,
+        "viewers": viewers,
+        "max_viewers": event.max_viewers,
+        "interval": presence.heartbeat_interval(),
     }
-    return render(request, "events/event_detail.html", context)
+    if not admitted:
+        payload["error"] = "L'aforament d'aquest esdeveniment és complet."
+    response = JsonResponse(payload, status=200 if admitted else 403)
+    return presence.set_viewer_cookie(response, new_token)
+
+
+@require_POST
+def presence_leave_view(request, pk):
+    """
+    L'espectador marxa de la pàgina (navigator.sendBeacon): deixa lloc lliure sense esperar el TTL.
+    """
+    viewer, _ = presence.viewer_key(request)
+    viewers = presence.get_presence().leave(pk, viewer)
+    return JsonResponse({"success": True, "viewers": viewers})
 
 
 @login_required
@@ -290,8 +381,14 @@ def my_events_view(request):
         "No s'han pogut carregar els teus esdeveniments per un error de base de dades.",
     )
 
+    # Visites: el camp ja carregat + el que aquest procés encara no ha escrit
+    views = view_counts(all_events)
+    for e in all_events:
+        e.views_total = views[e.pk]
+
     stats = {
         "total": len(all_events),
+        "views": sum(views.values()),
         "Programat": sum(1 for e in all_events if e.status == "Programat"),
         "En Directe": sum(1 for e in all_events if e.status == "En Directe"),
         "Finalitzat": sum(1 for e in all_events if e.status == "Finalitzat"),
@@ -311,6 +408,40 @@ def my_events_view(request):
     return render(request, "events/my_events.html", context)
 
 
+@login_required
+def following_feed_view(request):
+    """
+    Feed "Seguint": events dels creadors que segueix l'usuari, des de la seva
+    timeline materialitzada (vegeu events.timelines).
+    """
+    per_page = 12
+    try:
+        page = max(1, int(request.GET.get("page") or 1))
+    except ValueError:
+        page = 1
+
+    try:
+        events, has_next = timelines.read(request.user.pk, offset=(page - 1) * per_page, limit=per_page)
+    except (DatabaseError, PyMongoError):
+        messages.error(request, "No s'ha pogut carregar el teu feed per un error de base de dades.")
+        events, has_next = [], False
+
+    # "A qui seguir": precalculat per lots (users.suggestions)
+    try:
+        suggestions = get_suggestions(request.user)
+    except (DatabaseError, PyMongoError):
+        suggestions = []
+
+    context = {
+        "events": events,
+        "suggestions": suggestions,
+        "page": page,
+        "has_previous": page > 1,
+        "has_next": has_next,
+    }
+    return render(request, "events/following_feed.html", context)
+
+
 def events_by_category_view(request, category):
     """
     Esdeveniments per categoria amb paginació.
@@ -319,18 +450,30 @@ def events_by_category_view(request, category):
     if category not in valid_categories:
         raise Http404("Categoria inexistent.")
 
-    events = _safe_list(
-        Event.objects.filter(category=category),
-        request,
-        "No s'han pogut carregar els esdeveniments d'aquesta categoria.",
-    )
+    # Ordre de la pàgina de categoria (ids) compartit entre usuaris
+    def ordered_ids():
+        events = list(Event.objects.filter(category=category))
+        return [e.pk for e in _filter_and_sort_events(events, EventSearchForm())]
 
-    events = _filter_and_sort_events(events, EventSearchForm())
+    try:
+        event_ids = get_or_compute("category", {"category": category}, ordered_ids)
+    except (DatabaseError, PyMongoError):
+        messages.error(request, "No s'han pogut carregar els esdeveniments d'aquesta categoria.")
+        event_ids = []
 
-    paginator = Paginator(events, 12)
+    paginator = Paginator(event_ids, 12)
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
 
+    # Només es carreguen els events de la pàgina actual
+    page_events = _safe_list(
+        Event.objects.filter(pk__in=list(page_obj.object_list)),
+        request,
+        "No s'han pogut carregar els esdeveniments d'aquesta categoria.",
+    )
+    by_id = {e.pk: e for e in page_events}
+    page_obj.object_list = [by_id[pk] for pk in page_obj.object_list if pk in by_id]
+
     context = {
         "events": page_obj.object_list,
         "page_obj": page_obj,
@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class SemanticSearchConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'semantic_search'
+
+    def ready(self):
+        # Registra els signals (re-embedding automàtic dels Events)
+        from . import signals  # noqa: F401
+
+        # Opt-in per als workers que serveixen peticions: carrega el model en
+        # arrencar en lloc de fer-ho a la primera cerca.
+        if getattr(settings, "SEMANTIC_SEARCH_WARMUP_ON_READY", False):
+            from .services.embeddings import warmup
+            warmup()
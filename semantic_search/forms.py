@@ -0,0 +1,94 @@
+from datetime import datetime, time
+
+from django import forms
+from django.utils import timezone
+
+from events.models import CATEGORY_CHOICES, STATUS_CHOICES
+from .services.vector_store import Facets
+
+
+class SemanticSearchForm(forms.Form):
+    """
+    Consulta semàntica amb filtres (categoria, estat i rang de dates).
+    """
+
+    q = forms.CharField(
+        required=False,
+        label="Consulta",
+        widget=forms.TextInput(attrs={
+            "class": "form-control",
+            "placeholder": "Ex: concert de jazz aquest cap de setmana",
+        })
+    )
+
+    # Checkbox "Només futurs": el template envia future=0 quan està marcat
+    future = forms.CharField(required=False, widget=forms.CheckboxInput(check_test=lambda v: v == "0"))
+
+    category = forms.ChoiceField(
+        required=False,
+        label="Categoria",
+        choices=[("", "Totes les categories")] + list(CATEGORY_CHOICES),
+        widget=forms.Select(attrs={"class": "form-select"})
+    )
+
+    status = forms.ChoiceField(
+        required=False,
+        label="Estat",
+        choices=[("", "Tots els estats")] + list(STATUS_CHOICES),
+        widget=forms.Select(attrs={"class": "form-select"})
+    )
+
+    date_from = forms.DateField(
+        required=False,
+        label="Des de",
+        widget=forms.DateInput(attrs={"type": "date", "class": "form-control"})
+    )
+
+    date_to = forms.DateField(
+        required=False,
+        label="Fins a",
+        widget=forms.DateInput(attrs={"type": "date", "class": "form-control"})
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get("date_from")
+        date_to = cleaned_data.get("date_to")
+
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError(
+                "La data inicial no pot ser posterior a la data final."
+            )
+        return cleaned_data
+
+    @property
+    def only_future(self) -> bool:
+        return self.cleaned_data.get("future") == "0"
+
+    def facets(self) -> Facets:
+        """
+        Filtres del formulari com a Facets per al VectorStore.
+        """
+        data = self.cleaned_data
+        date_from = _start_of_day(data.get("date_from"))
+        if self.only_future:
+            now = timezone.now()
+            date_from = max(date_from, now) if date_from else now
+        return Facets(
+            categories=[data["category"]] if data.get("category") else None,
+            statuses=[data["status"]] if data.get("status") else None,
+            date_from=date_from,
+            date_to=_end_of_day(data.get("date_to")),
+        )
+
+
+def _start_of_day(day):
+    if not day:
+        return None
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _end_of_day(day):
+    if not day:
+        return None
+    return timezone.make_aware(datetime.combine(day, time.max))
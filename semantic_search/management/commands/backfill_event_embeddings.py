@@ -1,45 +1,120 @@
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 from django.core.management.base import BaseCommand
-from django.utils import timezone
+from django.db import connections
 
 from events.models import Event
-from semantic_search.services.embeddings import embed_text, model_name
+from semantic_search.services import backfill
+from semantic_search.services.backfill import (
+    backfill_range,
+    checkpoint_dir,
+    read_json,
+    split_ranges,
+    write_json,
+)
+from semantic_search.services.embeddings import model_name
+
+
+def _log_progress_to_stdout():
+    """
+    Inicialitzador dels processos fills: el progrés de cada tram surt per stdout.
+    """
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    backfill.logger.addHandler(handler)
+    backfill.logger.setLevel(logging.INFO)
+
+
+def _split_limit(limit: int, parts: int) -> list[int]:
+    """
+    Reparteix `limit` entre `parts` trams (el residu als primers).
+    Un tram amb 0 no s'executa: 0 vol dir "sense límit" a backfill_range.
+    """
+    return [limit // parts + (1 if i < limit % parts else 0) for i in range(parts)]
 
 
 class Command(BaseCommand):
-    help = "Genera i desa embeddings per a Events."
+    help = "Genera i desa embeddings per a Events (per lots, reprenible i en paral·lel)."
 
     def add_arguments(self, parser):
         parser.add_argument("--force", action="store_true", help="Recalcula encara que ja hi hagi embedding")
         parser.add_argument("--limit", type=int, default=0, help="Limita el nombre d'events (0 = tots)")
+        parser.add_argument("--batch-size", type=int, default=64, help="Events per lot (encode i escriptura)")
+        parser.add_argument("--workers", type=int, default=1, help="Nombre de processos")
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignora el checkpoint d'una execució anterior i comença de zero",
+        )
 
     def handle(self, *args, **options):
         force = options["force"]
-        limit = options["limit"]
-
-        qs = Event.objects.all().order_by("created_at")
-        if not force:
-            qs = qs.filter(embedding__isnull=True)
+        limit = max(0, options["limit"])
+        batch_size = max(1, options["batch_size"])
+        workers = max(1, options["workers"])
+        model = model_name()
 
-        if limit and limit > 0:
-            qs = qs[:limit]
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model).strip("_")
+        base = checkpoint_dir()
+        plan_path = base / f"{slug}.plan.json"
 
-        total = 0
-        for e in qs:
-            text = " | ".join([
-                (e.title or "").strip(),
-                (e.description or "").strip(),
-                (e.category or "").strip(),
-                (e.tags or "").strip(),
-            ]).strip()
+        plan = None if options["restart"] else read_json(plan_path)
+        if plan and plan.get("force") == force:
+            ranges = [tuple(r) for r in plan["ranges"]]
+            self.stdout.write(f"Reprenent l'execució anterior ({len(ranges)} trams).")
+        else:
+            for old in base.glob(f"{slug}.*.json"):
+                old.unlink()
+            if workers > 1:
+                ids = list(Event.objects.order_by("pk").values_list("pk", flat=True))
+                ranges = split_ranges(ids, workers)
+            else:
+                ranges = [(None, None)]
+            write_json(plan_path, {"force": force, "ranges": ranges})
 
-            if not text:
+        limits = _split_limit(limit, len(ranges)) if limit else [0] * len(ranges)
+        jobs = []
+        for i, (lo, hi) in enumerate(ranges):
+            if limit and not limits[i]:
                 continue
+            jobs.append(dict(
+                model=model,
+                lo=lo,
+                hi=hi,
+                checkpoint=str(base / f"{slug}.{i}.json"),
+                batch_size=batch_size,
+                force=force,
+                limit=limits[i],
+                label=f"[{i + 1}/{len(ranges)}] " if len(ranges) > 1 else "",
+            ))
+
+        started = time.monotonic()
+        if len(jobs) == 1:
+            results = [backfill_range(progress=self.stdout.write, **jobs[0])]
+        else:
+            threads = max(1, (os.cpu_count() or 1) // len(jobs))
+            # Els fills obren les seves pròpies connexions
+            connections.close_all()
+            results = []
+            with ProcessPoolExecutor(max_workers=len(jobs), initializer=_log_progress_to_stdout) as pool:
+                futures = [pool.submit(backfill_range, torch_threads=threads, **job) for job in jobs]
+                for future in as_completed(futures):
+                    results.append(future.result())
+
+        elapsed = time.monotonic() - started
+        total = sum(r["embedded"] for r in results)
+        skipped = sum(r["skipped"] for r in results)
 
-            vec = embed_text(text)
-            e.embedding = vec
-            e.embedding_model = model_name()
-            e.embedding_updated_at = timezone.now()
-            e.save(update_fields=["embedding", "embedding_model", "embedding_updated_at"])
-            total += 1
+        # Execució completa: ja no cal reprendre res
+        for path in base.glob(f"{slug}.*.json"):
+            path.unlink()
 
-        self.stdout.write(self.style.SUCCESS(f"Embeddings generats: {total}"))
+        rate = total / elapsed if elapsed > 0 else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Embeddings generats: {total} ({skipped} sense canvis) en {elapsed:.1f}s, {rate:.1f} events/s"
+        ))
@@ -0,0 +1,88 @@
+import json
+import threading
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from semantic_search.services.embeddings import embed_texts, get_model
+from semantic_search.services.executor import EmbeddingExecutor
+
+SAMPLE_QUERIES = [
+    "concert de jazz aquest cap de setmana",
+    "torneig de videojocs en directe",
+    "xerrada sobre intel·ligència artificial",
+    "partit de futbol",
+    "taller de pintura per a principiants",
+    "concierto de rock en directo",
+    "charla de programación en python",
+    "gaming",
+    "música clàssica",
+    "classe de cuina",
+]
+
+
+class Command(BaseCommand):
+    help = "Compara throughput i latència (p50/p99) d'embed_text amb i sense micro-lots."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=16, help="Fils que consulten alhora")
+        parser.add_argument("--requests", type=int, default=50, help="Consultes per fil")
+        parser.add_argument("--window-ms", type=float, default=5.0)
+        parser.add_argument("--max-batch", type=int, default=32)
+
+    def handle(self, *args, **options):
+        clients = options["clients"]
+        per_client = options["requests"]
+        model = get_model()
+
+        # Escalfament
+        model.encode(SAMPLE_QUERIES, normalize_embeddings=True)
+
+        def direct(text):
+            return model.encode([text], normalize_embeddings=True)[0]
+
+        executor = EmbeddingExecutor(embed_texts, window_ms=options["window_ms"], max_batch=options["max_batch"])
+
+        def batched(text):
+            return executor.submit(text).result()
+
+        report = {
+            "clients": clients,
+            "requests_per_client": per_client,
+            "direct": self._run(direct, clients, per_client),
+            "batched": self._run(batched, clients, per_client),
+        }
+        report["batched"].update(executor.stats())
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def _run(self, fn, clients, per_client):
+        latencies = []
+        lock = threading.Lock()
+
+        def client(offset):
+            local = []
+            for i in range(per_client):
+                # Variem el text perquè no hi hagi cap cache implícita
+                text = f"{SAMPLE_QUERIES[(offset + i) % len(SAMPLE_QUERIES)]} {offset}-{i}"
+                t0 = time.perf_counter()
+                fn(text)
+                local.append(time.perf_counter() - t0)
+            with lock:
+                latencies.extend(local)
+
+        threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        lat_ms = np.array(latencies) * 1000.0
+        return {
+            "seconds": round(elapsed, 3),
+            "throughput_qps": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(float(np.percentile(lat_ms, 50)), 2),
+            "p99_ms": round(float(np.percentile(lat_ms, 99)), 2),
+        }
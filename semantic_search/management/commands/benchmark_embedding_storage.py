@@ -0,0 +1,90 @@
+import json
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from events.models import Event
+from semantic_search.services.embeddings import embed_text, event_text
+from semantic_search.services.quantization import DTYPE_FLOAT16, DTYPE_INT8, dequantize, quantize
+from semantic_search.services.ranker import int8_scores
+
+
+class Command(BaseCommand):
+    help = "Mesura la pèrdua de precisió de l'emmagatzematge float16/int8 respecte a float32."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sample", type=int, default=2000, help="Nombre màxim d'events")
+        parser.add_argument("--queries", type=int, default=200, help="Nombre de consultes")
+        parser.add_argument("--k", type=int, default=10, help="k per al recall@k")
+        parser.add_argument(
+            "--synthetic",
+            action="store_true",
+            help="Fa servir vectors aleatoris normalitzats (no cal BD ni model)",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        k = options["k"]
+
+        if options["synthetic"]:
+            matrix = rng.normal(size=(options["sample"], 384)).astype(np.float32)
+            matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        else:
+            matrix = self._load_float32(options["sample"])
+        if matrix.shape[0] <= k:
+            raise CommandError("No hi ha prou vectors per fer el benchmark.")
+
+        n_queries = min(options["queries"], matrix.shape[0])
+        query_rows = rng.choice(matrix.shape[0], size=n_queries, replace=False)
+        queries = matrix[query_rows]
+
+        exact = queries @ matrix.T
+        exact[np.arange(n_queries), query_rows] = -np.inf  # excloem el propi vector
+        exact_top = np.argsort(-exact, axis=1)[:, :k]
+
+        report = {"vectors": int(matrix.shape[0]), "dim": int(matrix.shape[1]), "k": k}
+        report["float32"] = {"bytes_per_vector": int(matrix.shape[1] * 4)}
+
+        for dtype in (DTYPE_FLOAT16, DTYPE_INT8):
+            encoded = [quantize(row, dtype) for row in matrix]
+            if dtype == DTYPE_INT8:
+                codes = np.vstack([np.frombuffer(data, dtype=np.int8) for data, _ in encoded])
+                scales = np.array([scale for _, scale in encoded], dtype=np.float32)
+                approx = np.vstack([int8_scores(q, codes, scales) for q in queries])
+            else:
+                decoded = np.vstack([dequantize(data, dtype, scale) for data, scale in encoded])
+                approx = queries @ decoded.T
+            approx[np.arange(n_queries), query_rows] = -np.inf
+
+            finite = np.isfinite(exact)
+            error = np.abs(approx[finite] - exact[finite])
+            approx_top = np.argsort(-approx, axis=1)[:, :k]
+            recall = np.mean([
+                len(set(a) & set(e)) / k for a, e in zip(approx_top, exact_top)
+            ])
+            report[dtype] = {
+                "bytes_per_vector": len(encoded[0][0]) + (4 if dtype == DTYPE_INT8 else 0),
+                "mean_abs_score_error": float(error.mean()),
+                "max_abs_score_error": float(error.max()),
+                f"recall@{k}": float(recall),
+            }
+
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def _load_float32(self, sample):
+        """
+        Vectors float32 de referència: l'embedding JSON antic si encara hi és,
+        o si no es recalculen amb el model a partir del text de l'Event.
+        """
+        vectors = []
+        for e in Event.objects.all().order_by("-created_at")[:sample]:
+            emb = getattr(e, "embedding", None)
+            if not emb:
+                emb = embed_text(event_text(e), use_cache=False)
+            if emb:
+                vectors.append(emb)
+        if not vectors:
+            return np.empty((0, 0), dtype=np.float32)
+        dim = len(vectors[0])
+        return np.asarray([v for v in vectors if len(v) == dim], dtype=np.float32)
@@ -0,0 +1,65 @@
+import json
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Arrencada típica d'un worker: setup de Django + càrrega de les URLs (i vistes)
+_STARTUP = (
+    "import os, django; "
+    "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings'); "
+    "django.setup(); import config.urls"
+)
+# Comportament anterior: sentence_transformers importat en carregar les vistes
+_EAGER = _STARTUP + "; import sentence_transformers"
+
+HEAVY_MODULES = ("torch", "sentence_transformers", "transformers")
+
+
+class Command(BaseCommand):
+    help = "Compara amb `python -X importtime` l'arrencada amb importació mandrosa i ansiosa del model."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=10, help="Mòduls més lents a mostrar")
+
+    def handle(self, *args, **options):
+        report = {
+            "lazy": self._measure(_STARTUP, options["top"]),
+            "eager": self._measure(_EAGER, options["top"]),
+        }
+        lazy, eager = report["lazy"], report["eager"]
+        if "total_ms" in lazy and "total_ms" in eager:
+            report["saved_ms"] = round(eager["total_ms"] - lazy["total_ms"], 1)
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def _measure(self, code, top):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=str(settings.BASE_DIR),
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            errors = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+            return {"error": errors[-1] if errors else "error"}
+
+        rows = []
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+            # El nom conserva el sagnat: cada nivell d'imbricació afegeix 2 espais
+            rows.append((name[1:].rstrip(), int(self_us), int(cumulative_us)))
+
+        top_level = [r for r in rows if not r[0].startswith(" ")]
+        modules = {name.strip() for name, _, _ in rows}
+        return {
+            "total_ms": round(sum(r[1] for r in rows) / 1000, 1),
+            "modules": len(modules),
+            "heavy_imported": sorted(m for m in modules if m.split(".")[0] in HEAVY_MODULES and "." not in m),
+            "slowest": [
+                {"module": name, "cumulative_ms": round(cum / 1000, 1)}
+                for name, _, cum in sorted(top_level, key=lambda r: -r[2])[:top]
+            ],
+        }
@@ -0,0 +1,94 @@
+import json
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from events.models import Event
+from semantic_search.services.embeddings import (
+    BACKEND_TORCH,
+    BACKEND_TORCH_INT8,
+    event_text,
+    load_model,
+)
+
+
+class Command(BaseCommand):
+    help = "Compara latència i concordança (cosinus) del backend int8 amb el model float32."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sample", type=int, default=200, help="Textos d'Event a fer servir")
+        parser.add_argument("--batch-size", type=int, default=32)
+        parser.add_argument("--k", type=int, default=10, help="k per comparar rànquings")
+        parser.add_argument(
+            "--min-cosine",
+            type=float,
+            default=0.97,
+            help="Cosinus mínim acceptable entre vectors (falla si algun queda per sota)",
+        )
+
+    def handle(self, *args, **options):
+        texts = [
+            t for t in (event_text(e) for e in Event.objects.all().order_by("-created_at")[: options["sample"]])
+            if t
+        ]
+        if len(texts) < 2:
+            raise CommandError("Calen almenys 2 Events amb text per fer el benchmark.")
+
+        report = {"texts": len(texts)}
+        vectors = {}
+        for backend in (BACKEND_TORCH, BACKEND_TORCH_INT8):
+            model = load_model(backend)
+            model.encode(texts[:4], normalize_embeddings=True)  # escalfament
+
+            single = []
+            for text in texts:
+                t0 = time.perf_counter()
+                model.encode([text], normalize_embeddings=True)
+                single.append((time.perf_counter() - t0) * 1000.0)
+
+            t0 = time.perf_counter()
+            vecs = model.encode(
+                texts,
+                batch_size=options["batch_size"],
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+            batch_s = time.perf_counter() - t0
+
+            vectors[backend] = np.asarray(vecs, dtype=np.float32)
+            report[backend] = {
+                "encode_p50_ms": round(float(np.percentile(single, 50)), 2),
+                "encode_p95_ms": round(float(np.percentile(single, 95)), 2),
+                "batch_texts_per_s": round(len(texts) / batch_s, 1),
+            }
+
+        ref, quant = vectors[BACKEND_TORCH], vectors[BACKEND_TORCH_INT8]
+        cosines = np.sum(ref * quant, axis=1)
+
+        # Concordança de rànquing: cada text com a consulta contra la resta
+        k = min(options["k"], len(texts) - 1)
+        ref_scores = ref @ ref.T
+        mixed_scores = quant @ ref.T  # consulta int8 contra embeddings desats en float32
+        np.fill_diagonal(ref_scores, -np.inf)
+        np.fill_diagonal(mixed_scores, -np.inf)
+        ref_top = np.argsort(-ref_scores, axis=1)[:, :k]
+        mixed_top = np.argsort(-mixed_scores, axis=1)[:, :k]
+        overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(ref_top, mixed_top)])
+
+        report["agreement"] = {
+            "cosine_mean": round(float(cosines.mean()), 5),
+            "cosine_min": round(float(cosines.min()), 5),
+            f"top{k}_overlap": round(float(overlap), 4),
+        }
+        report["speedup_p50"] = round(
+            report[BACKEND_TORCH]["encode_p50_ms"] / max(report[BACKEND_TORCH_INT8]["encode_p50_ms"], 1e-6), 2
+        )
+        self.stdout.write(json.dumps(report, indent=2))
+
+        if cosines.min() < options["min_cosine"]:
+            raise CommandError(
+                f"Cosinus mínim {cosines.min():.4f} per sota de {options['min_cosine']}: "
+                "el backend int8 no és compatible amb els embeddings desats."
+            )
@@ -0,0 +1,66 @@
+import json
+import time
+import tracemalloc
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from events.models import Event
+from semantic_search.services.lexical import LexicalIndex
+
+SAMPLE_QUERIES = [
+    "concert de jazz",
+    "torneig valorant",
+    "ibai",
+    "xerrada intel·ligència artificial",
+    "partit de futbol",
+    "speedrun",
+    "concierto rock directo",
+    "programació python",
+    "música clàssica",
+    "cuina",
+]
+
+
+class Command(BaseCommand):
+    help = "Mesura el temps de construcció, la memòria i la latència de consulta de l'índex BM25."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20, help="Repeticions de cada consulta")
+        parser.add_argument("--k", type=int, default=20)
+
+    def handle(self, *args, **options):
+        tracemalloc.start()
+        started = time.perf_counter()
+        index = LexicalIndex()
+        index.build()
+        build_seconds = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # Consultes de mostra + títols reals (inclouen noms propis i handles)
+        queries = list(SAMPLE_QUERIES)
+        queries += list(Event.objects.order_by("?").values_list("title", flat=True)[:20])
+
+        latencies = []
+        for _ in range(options["repeat"]):
+            for query in queries:
+                t0 = time.perf_counter()
+                index.search(query, k=options["k"])
+                latencies.append(time.perf_counter() - t0)
+        lat_ms = np.array(latencies) * 1000
+
+        report = {
+            "documents": len(index),
+            "terms": len(index._postings),
+            "build_seconds": round(build_seconds, 3),
+            "build_peak_mb": round(peak / 1e6, 2),
+            "index_mb_estimate": round(index.memory_bytes() / 1e6, 2),
+            "queries": len(latencies),
+            "latency_ms": {
+                "p50": round(float(np.percentile(lat_ms, 50)), 3),
+                "p95": round(float(np.percentile(lat_ms, 95)), 3),
+                "p99": round(float(np.percentile(lat_ms, 99)), 3),
+            },
+        }
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,294 @@
+import json
+import random
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from semantic_search.services import embeddings, lexical, vector_store
+from semantic_search.services.embeddings import QueryCache, embed_text, embed_texts, event_text, model_name
+from semantic_search.services.lexical import LexicalIndex
+from semantic_search.services.quantization import DTYPE_FLOAT16, dequantize, quantize
+from semantic_search.services.search import hybrid_rank, rank
+
+BENCH_DIR = Path(__file__).resolve().parents[2] / "benchmarks"
+DEFAULT_CORPUS = BENCH_DIR / "search_corpus.json"
+DEFAULT_BASELINE = BENCH_DIR / "search_baseline.json"
+
+# Paraules per generar events de farciment (no rellevants per a cap consulta)
+FILLER_WORDS = [
+    "directe", "sessió", "comunitat", "especial", "setmanal", "tertúlia", "repte",
+    "novetats", "preguntes", "resum", "programa", "episodi", "sorteig", "invitats",
+    "semanal", "novedades", "preguntas", "invitados", "reto", "sorteo",
+]
+FILLER_CATEGORIES = ["Altres", "Entreteniment", "Tecnologia", "Gaming", "Música"]
+
+
+@contextmanager
+def _search_path(model: str, docs, matrix, dtype: str):
+    """
+    Camí de cerca real (VectorStore + índex lèxic + cache de consultes) sobre el
+    corpus: snapshot en un directori temporal i índex BM25 del corpus en lloc
+    dels de la BD. Ho restaura tot en sortir.
+    """
+    tmp = tempfile.mkdtemp(prefix="search-bench-")
+    index = LexicalIndex()
+    for doc in docs:
+        index.add(doc)
+    index.built = True
+    index._checked_at = time.monotonic()
+
+    saved_store = vector_store._stores.pop(model, None)
+    saved_index, saved_cache = lexical._index, embeddings._query_cache
+    try:
+        with override_settings(
+            SEMANTIC_SEARCH_VECTOR_DIR=tmp,
+            SEMANTIC_SEARCH_LEXICAL=True,
+            # L'índex del corpus no s'ha de sincronitzar amb la BD
+            SEMANTIC_SEARCH_LEXICAL_REFRESH=float("inf"),
+        ):
+            vector_store.write_snapshot(
+                model,
+                [d.pk for d in docs],
+                matrix,
+                attrs=[(d.scheduled_date, d.category, d.status) for d in docs],
+                dtype=dtype,
+            )
+            lexical._index = index
+            embeddings._query_cache = QueryCache(maxsize=4096)
+            vector_store._stores.pop(model, None)
+            yield
+    finally:
+        lexical._index, embeddings._query_cache = saved_index, saved_cache
+        vector_store._stores.pop(model, None)
+        if saved_store is not None:
+            vector_store._stores[model] = saved_store
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _percentiles(latencies_ms) -> dict:
+    arr = np.asarray(latencies_ms, dtype=np.float64)
+    return {
+        "p50": round(float(np.percentile(arr, 50)), 3),
+        "p95": round(float(np.percentile(arr, 95)), 3),
+        "p99": round(float(np.percentile(arr, 99)), 3),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark de qualitat i latència del rànquing semàntic (recall@k, MRR, QPS, "
+        "p50/p95/p99) sobre un corpus etiquetat en català i castellà."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--corpus", default=str(DEFAULT_CORPUS), help="Corpus JSON etiquetat")
+        parser.add_argument(
+            "--generate",
+            type=int,
+            default=0,
+            help="Afegeix N events de farciment generats (per mesurar la latència amb més volum)",
+        )
+        parser.add_argument("--k", type=int, default=5, help="k per al recall@k")
+        parser.add_argument("--repeat", type=int, default=20, help="Repeticions de cada consulta")
+        parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Fitxer de referència")
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Desa aquest resultat com a referència en lloc de comparar-hi",
+        )
+        parser.add_argument(
+            "--max-quality-drop",
+            type=float,
+            default=0.02,
+            help="Caiguda màxima (absoluta) de recall@k o MRR respecte a la referència",
+        )
+        parser.add_argument(
+            "--max-latency-increase",
+            type=float,
+            default=0.5,
+            help="Augment màxim (relatiu) de la latència p95 respecte a la referència",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        k = options["k"]
+        corpus = self._load_corpus(Path(options["corpus"]))
+        events = list(corpus["events"])
+        events += self._filler(options["generate"], options["seed"])
+        queries = corpus["queries"]
+        keys = [e["key"] for e in events]
+        key_index = {key: i for i, key in enumerate(keys)}
+
+        # Embeddings del corpus i de les consultes (una sola vegada)
+        docs = [SimpleNamespace(pk=i, scheduled_date=None, status="Programat", **{
+            field: e.get(field, "") for field in ("title", "description", "category", "tags")
+        }) for i, e in enumerate(events)]
+        matrix = embed_texts([event_text(d) for d in docs])
+        query_vecs = embed_texts([q["text"] for q in queries])
+        relevant = [{key_index[key] for key in q["relevant"]} for q in queries]
+
+        model = model_name()
+        f16 = np.vstack([
+            dequantize(data, DTYPE_FLOAT16, scale)
+            for data, scale in (quantize(row, DTYPE_FLOAT16) for row in matrix)
+        ])
+
+        def top(scores):
+            return [int(i) for i in np.argsort(-scores, kind="stable")[:k]]
+
+        def ids(ranked):
+            return [event_id for event_id, _ in ranked]
+
+        report = {
+            "model": model,
+            "events": len(events),
+            "queries": len(queries),
+            "k": k,
+            "repeat": options["repeat"],
+            # No hi ha cap índex ANN al projecte: la cerca vectorial és exacta
+            "ann": "no disponible",
+            "backends": {},
+        }
+        repeat = options["repeat"]
+
+        # Referències fora del camí de producció (cosinus exacte en memòria)
+        report["backends"]["exact_numpy"] = self._run(
+            lambda qi, q: top(matrix @ q), query_vecs, relevant, k, repeat
+        )
+        report["backends"]["float16_storage"] = self._run(
+            lambda qi, q: top(f16 @ q), query_vecs, relevant, k, repeat
+        )
+
+        # Camí real: VectorStore (snapshot + delta) i hybrid_rank (vectorial + BM25 + RRF)
+        for dtype in ("float32", "int8"):
+            with _search_path(model, docs, matrix, dtype):
+                report["backends"][f"vector_store_{dtype}"] = self._run(
+                    lambda qi, q: ids(rank(model, q, k)), query_vecs, relevant, k, repeat
+                )
+                report["backends"][f"hybrid_{dtype}"] = self._run(
+                    lambda qi, q: ids(hybrid_rank(model, queries[qi]["text"], q, k)),
+                    query_vecs, relevant, k, repeat,
+                )
+
+        # Extrem a extrem com la vista (embedding de la consulta inclòs), amb el
+        # dtype de producció; sense cache i amb la cache de consultes
+        with _search_path(model, docs, matrix, vector_store.snapshot_dtype()):
+            def e2e(use_cache):
+                def run(qi, _):
+                    text = queries[qi]["text"]
+                    q_vec = embed_text(text, use_cache=use_cache, model=model)
+                    return ids(hybrid_rank(model, text, q_vec, k))
+                return run
+
+            report["backends"]["e2e_uncached"] = self._run(e2e(False), query_vecs, relevant, k, 1)
+            report["backends"]["e2e_cached_embeddings"] = self._run(
+                e2e(True), query_vecs, relevant, k, repeat
+            )
+
+        self.stdout.write(json.dumps(report, indent=2, ensure_ascii=False))
+
+        baseline_path = Path(options["baseline"])
+        if options["save_baseline"]:
+            baseline_path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+            self.stdout.write(self.style.SUCCESS(f"Referència desada a {baseline_path}"))
+            return
+
+        if not baseline_path.exists():
+            self.stdout.write(self.style.WARNING(
+                "No hi ha referència: executa amb --save-baseline per crear-la."
+            ))
+            return
+
+        regressions = self._compare(
+            report,
+            json.loads(baseline_path.read_text(encoding="utf-8")),
+            options["max_quality_drop"],
+            options["max_latency_increase"],
+        )
+        if regressions:
+            raise CommandError("Regressions respecte a la referència:\n - " + "\n - ".join(regressions))
+        self.stdout.write(self.style.SUCCESS("Sense regressions respecte a la referència."))
+
+    # ---- helpers ----
+
+    def _load_corpus(self, path: Path) -> dict:
+        try:
+            corpus = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError) as exc:
+            raise CommandError(f"No s'ha pogut llegir el corpus {path}: {exc}")
+        keys = {e["key"] for e in corpus.get("events", [])}
+        for q in corpus.get("queries", []):
+            missing = set(q["relevant"]) - keys
+            if missing:
+                raise CommandError(f"La consulta «{q['text']}» referencia events inexistents: {missing}")
+        if not corpus.get("queries"):
+            raise CommandError("El corpus no té consultes.")
+        return corpus
+
+    def _filler(self, n: int, seed: int) -> list[dict]:
+        rng = random.Random(seed)
+        return [
+            {
+                "key": f"filler-{i}",
+                "title": " ".join(rng.sample(FILLER_WORDS, 3)).capitalize(),
+                "description": " ".join(rng.choices(FILLER_WORDS, k=12)),
+                "category": rng.choice(FILLER_CATEGORIES),
+                "tags": ",".join(rng.sample(FILLER_WORDS, 2)),
+            }
+            for i in range(n)
+        ]
+
+    def _run(self, fn, query_vecs, relevant, k, repeat) -> dict:
+        recalls, reciprocal_ranks, latencies = [], [], []
+        started = time.perf_counter()
+        for rep in range(max(1, repeat)):
+            for qi, q in enumerate(query_vecs):
+                t0 = time.perf_counter()
+                ranked = fn(qi, q)
+                latencies.append((time.perf_counter() - t0) * 1000)
+                if rep:
+                    continue
+                hits = relevant[qi].intersection(ranked[:k])
+                recalls.append(len(hits) / len(relevant[qi]))
+                rr = 0.0
+                for position, doc in enumerate(ranked, start=1):
+                    if doc in relevant[qi]:
+                        rr = 1.0 / position
+                        break
+                reciprocal_ranks.append(rr)
+        elapsed = time.perf_counter() - started
+
+        return {
+            f"recall@{k}": round(float(np.mean(recalls)), 4),
+            "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+            "qps": round(len(latencies) / elapsed, 1) if elapsed > 0 else None,
+            "latency_ms": _percentiles(latencies),
+        }
+
+    def _compare(self, report, baseline, max_quality_drop, max_latency_increase) -> list[str]:
+        regressions = []
+        if baseline.get("k") != report["k"] or baseline.get("events") != report["events"]:
+            self.stdout.write(self.style.WARNING(
+                "La referència es va generar amb un altre k o corpus; es compara igualment."
+            ))
+        for name, current in report["backends"].items():
+            previous = baseline.get("backends", {}).get(name)
+            if not previous:
+                continue
+            for metric in (f"recall@{report['k']}", "mrr"):
+                if metric in previous and previous[metric] - current[metric] > max_quality_drop:
+                    regressions.append(
+                        f"{name}: {metric} {previous[metric]:.4f} -> {current[metric]:.4f}"
+                    )
+            old_p95 = previous.get("latency_ms", {}).get("p95")
+            new_p95 = current["latency_ms"]["p95"]
+            if old_p95 and new_p95 > old_p95 * (1 + max_latency_increase):
+                regressions.append(f"{name}: p95 {old_p95:.3f} ms -> {new_p95:.3f} ms")
+        return regressions
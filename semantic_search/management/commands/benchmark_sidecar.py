@@ -0,0 +1,77 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Simula l'arrencada d'un worker: setup de Django + primera consulta
+_WORKER_SCRIPT = r"""
+import json, os, resource, sys, time
+t0 = time.perf_counter()
+import django
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+from django.conf import settings
+settings.SEMANTIC_SEARCH_SIDECAR_SOCKET = os.environ.get("BENCH_SIDECAR_SOCKET") or None
+from semantic_search.services.embeddings import embed_text
+embed_text("concert de jazz", use_cache=False)
+elapsed = time.perf_counter() - t0
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"startup_s": elapsed, "max_rss_mb": rss_kb / 1024}))
+"""
+
+
+class Command(BaseCommand):
+    help = "Mesura temps d'arrencada i RSS de N workers amb i sense el sidecar d'embeddings."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument(
+            "--socket",
+            default=None,
+            help="Socket d'un sidecar ja arrencat (per defecte SEMANTIC_SEARCH_SIDECAR_SOCKET)",
+        )
+
+    def handle(self, *args, **options):
+        socket_path = options["socket"] or getattr(settings, "SEMANTIC_SEARCH_SIDECAR_SOCKET", None)
+        if not socket_path or not os.path.exists(socket_path):
+            raise CommandError(
+                "Arrenca primer `python manage.py run_embedding_sidecar` i indica el socket amb --socket."
+            )
+
+        report = {"workers": options["workers"]}
+        for label, sock in (("in_process", ""), ("sidecar", socket_path)):
+            report[label] = self._run_workers(options["workers"], sock)
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def _run_workers(self, count, socket_path):
+        env = dict(os.environ, BENCH_SIDECAR_SOCKET=socket_path)
+        started = time.perf_counter()
+        procs = [
+            subprocess.Popen(
+                [sys.executable, "-c", _WORKER_SCRIPT],
+                cwd=str(settings.BASE_DIR),
+                env=env,
+                stdout=subprocess.PIPE,
+                text=True,
+            )
+            for _ in range(count)
+        ]
+        results = []
+        for proc in procs:
+            out, _ = proc.communicate()
+            results.append(json.loads(out.strip().splitlines()[-1]))
+        wall = time.perf_counter() - started
+
+        startups = [r["startup_s"] for r in results]
+        rss = [r["max_rss_mb"] for r in results]
+        return {
+            "wall_s": round(wall, 2),
+            "startup_mean_s": round(sum(startups) / len(startups), 2),
+            "startup_max_s": round(max(startups), 2),
+            "rss_per_worker_mb": round(sum(rss) / len(rss), 1),
+            "rss_total_mb": round(sum(rss), 1),
+        }
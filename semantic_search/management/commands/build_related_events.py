@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from semantic_search.services.embeddings import model_name
+from semantic_search.services.related import rebuild_all
+
+
+class Command(BaseCommand):
+    help = "Recalcula els esdeveniments relacionats (veïns per embedding) de tots els Events."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--block-rows", type=int, default=1024, help="Files per bloc de la multiplicació")
+        parser.add_argument("--model", default=None, help="Model d'embeddings (per defecte, l'actiu)")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        written = rebuild_all(options["model"] or model_name(), block_rows=max(1, options["block_rows"]))
+        self.stdout.write(self.style.SUCCESS(
+            f"Relacionats recalculats: {written} events en {time.monotonic() - started:.1f}s."
+        ))
@@ -0,0 +1,56 @@
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from semantic_search.services.embeddings import model_name
+from semantic_search.services.storage import event_attrs_map, iter_embeddings
+from semantic_search.services.vector_store import delta_position, snapshot_dtype, write_snapshot
+
+
+class Command(BaseCommand):
+    help = "Compacta els embeddings dels Events en un snapshot .npy compartit pels workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dtype",
+            choices=["float32", "int8"],
+            default=None,
+            help="Format dels vectors al snapshot (per defecte SEMANTIC_SEARCH_SNAPSHOT_DTYPE)",
+        )
+        parser.add_argument("--model", default=None, help="Model d'embeddings (per defecte, l'actiu)")
+
+    def handle(self, *args, **options):
+        model = options["model"] or model_name()
+        dtype = options["dtype"] or snapshot_dtype()
+
+        # Posició del delta abans de llegir la BD: el que s'hi escrigui després
+        # es trasllada a la versió nova.
+        carry_from = delta_position(model)
+
+        ids = []
+        vectors = []
+        dim = None
+        for event_id, vec in iter_embeddings(model):
+            if dim is None:
+                dim = vec.shape[0]
+            if vec.shape[0] != dim:
+                continue
+            ids.append(event_id)
+            vectors.append(vec)
+
+        if not ids:
+            self.stdout.write(self.style.WARNING("No hi ha embeddings per compactar."))
+            return
+
+        # Atributs filtrables (data, categoria, estat) alineats amb els vectors
+        attrs_by_id = {}
+        for start in range(0, len(ids), 2000):
+            attrs_by_id.update(event_attrs_map(ids[start:start + 2000]))
+        attrs = [attrs_by_id.get(event_id) for event_id in ids]
+
+        matrix = np.vstack(vectors).astype(np.float32)
+        version = write_snapshot(
+            model, ids, matrix, attrs=attrs, carry_from=carry_from, dtype=dtype
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot {version} escrit: {len(ids)} vectors de dimensió {dim} ({dtype})."
+        ))
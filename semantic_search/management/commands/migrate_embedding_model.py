@@ -0,0 +1,105 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from semantic_search.models import EmbeddingModelState
+from semantic_search.services import profiles, registry
+
+
+class Command(BaseCommand):
+    help = (
+        "Migra els embeddings a un altre model registrat per lots, sense aturar la cerca, "
+        "i el fa actiu quan la cobertura arriba al 100%."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", nargs="?", help="Model de destí (ha de ser a SEMANTIC_SEARCH_MODELS)")
+        parser.add_argument("--status", action="store_true", help="Mostra l'estat del registre i surt")
+        parser.add_argument("--batch-size", type=int, default=64, help="Events per lot")
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Segons d'espera entre lots (per no competir amb la cerca)",
+        )
+        parser.add_argument("--no-cutover", action="store_true", help="Migra però no canvia el model actiu")
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Fa el canvi encara que la cobertura no sigui completa",
+        )
+
+    def handle(self, *args, **options):
+        if options["status"] or not options["model"]:
+            self._print_status()
+            return
+
+        model = options["model"]
+        batch_size = max(1, options["batch_size"])
+        try:
+            if registry.target_model() != model:
+                registry.start_migration(model)
+        except registry.RegistryError as exc:
+            raise CommandError(str(exc))
+
+        started = time.monotonic()
+        migrated = 0
+        # Els events nous o editats ja s'escriuen amb tots dos models (vegeu
+        # `registry.write_models`); aquí s'omplen els que hi havia abans.
+        while True:
+            ids = registry.pending_ids(model)
+            if not ids:
+                break
+            before = migrated
+            for start in range(0, len(ids), batch_size):
+                migrated += registry.migrate_batch(model, ids[start:start + batch_size], batch_size=batch_size)
+                rate = migrated / (time.monotonic() - started)
+                self.stdout.write(
+                    f"{model}: {min(start + batch_size, len(ids))}/{len(ids)} pendents ({rate:.1f} events/s)"
+                )
+                if options["pause"]:
+                    time.sleep(options["pause"])
+            covered, total = registry.coverage(model)
+            self.stdout.write(f"{model}: cobertura {covered}/{total}")
+            if migrated == before:
+                # Events sense text per embeddejar: no es pot avançar més
+                break
+
+        covered, total = registry.coverage(model)
+        if options["no_cutover"]:
+            self.stdout.write(self.style.SUCCESS(f"Migració feta ({covered}/{total}); model actiu sense canvis."))
+            return
+        if covered < total and not options["force"]:
+            raise CommandError(f"Cobertura incompleta ({covered}/{total}); no es fa el canvi de model.")
+
+        # Snapshot i relacionats del model nou abans del canvi, perquè la
+        # primera cerca ja no hagi de recórrer la BD
+        call_command("build_vector_snapshot", model=model, stdout=self.stdout)
+        call_command("build_related_events", model=model, stdout=self.stdout)
+
+        try:
+            registry.cutover(model, force=options["force"])
+        except registry.RegistryError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            f"Model actiu: {model} ({migrated} embeddings nous en {time.monotonic() - started:.1f}s)."
+        ))
+
+        # Els perfils d'usuari són per model: es recalculen amb el nou
+        if profiles.personalization_weight() > 0:
+            call_command("rebuild_user_profiles", stdout=self.stdout)
+
+    def _print_status(self):
+        self.stdout.write(f"Model actiu: {registry.active_model()}")
+        self.stdout.write(f"En migració: {registry.target_model() or '-'}")
+        states = {s.name: s for s in EmbeddingModelState.objects.all()}
+        for name in registry.registered_models():
+            state = states.get(name)
+            if state is None:
+                self.stdout.write(f"  {name}: sense estat")
+                continue
+            self.stdout.write(
+                f"  {name}: {state.get_status_display()}, cobertura {state.covered}/{state.total} "
+                f"({state.coverage:.0%})"
+            )
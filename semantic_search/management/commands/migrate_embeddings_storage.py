@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand
+
+from events.models import Event
+from semantic_search.services.embeddings import content_hash, event_text
+from semantic_search.services.storage import event_attrs_map, save_embeddings, storage_dtype
+
+
+class Command(BaseCommand):
+    help = "Converteix els embeddings JSON d'Event a la col·lecció binària EventEmbedding."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dtype",
+            choices=["float16", "int8"],
+            default=None,
+            help="Format d'emmagatzematge (per defecte SEMANTIC_SEARCH_STORAGE_DTYPE)",
+        )
+        parser.add_argument("--batch-size", type=int, default=500, help="Events per lot d'escriptura")
+        parser.add_argument(
+            "--keep-json",
+            action="store_true",
+            help="No esborra el camp JSON 'embedding' dels Events convertits",
+        )
+
+    def handle(self, *args, **options):
+        dtype = options["dtype"] or storage_dtype()
+        batch_size = max(1, options["batch_size"])
+        keep_json = options["keep_json"]
+
+        # Lectura directa de Mongo: només els documents amb embedding JSON
+        cursor = Event.objects.mongo_find(
+            {"embedding": {"$type": "array"}},
+            {"id": 1, "embedding": 1, "embedding_model": 1,
+             "title": 1, "description": 1, "category": 1, "tags": 1},
+            batch_size=batch_size,
+        )
+
+        total = 0
+        batches = {}
+        for doc in cursor:
+            model = doc.get("embedding_model")
+            vector = doc.get("embedding")
+            if not model or not vector:
+                continue
+            digest = content_hash(event_text(Event(
+                title=doc.get("title"),
+                description=doc.get("description"),
+                category=doc.get("category"),
+                tags=doc.get("tags"),
+            )))
+            batch = batches.setdefault(model, [])
+            batch.append((doc["id"], vector, digest))
+            if len(batch) >= batch_size:
+                total += self._flush(model, batch, dtype, keep_json)
+                batches[model] = []
+
+        for model, batch in batches.items():
+            total += self._flush(model, batch, dtype, keep_json)
+
+        self.stdout.write(self.style.SUCCESS(f"Embeddings convertits a {dtype}: {total}"))
+
+    def _flush(self, model, batch, dtype, keep_json):
+        if not batch:
+            return 0
+        attrs = event_attrs_map(event_id for event_id, _, _ in batch)
+        saved = save_embeddings(model, batch, dtype=dtype, attrs=attrs)
+        if not keep_json:
+            Event.objects.mongo_update_many(
+                {"id": {"$in": [event_id for event_id, _, _ in batch]}},
+                {"$set": {"embedding": None}},
+            )
+        self.stdout.write(f" - lot de {saved} embeddings ({model})")
+        return saved
@@ -0,0 +1,27 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from semantic_search.services import profiles
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula des de zero els perfils vectorials dels usuaris "
+        "(events creats, missatges de xat i creadors que segueixen)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", action="append", type=int, default=[], help="Només aquest usuari (repetible)")
+
+    def handle(self, *args, **options):
+        user_ids = options["user"] or list(get_user_model().objects.values_list("pk", flat=True))
+        started = time.monotonic()
+        written = 0
+        for user_id in user_ids:
+            if profiles.rebuild(user_id):
+                written += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Perfils recalculats: {written}/{len(user_ids)} usuaris en {time.monotonic() - started:.1f}s."
+        ))
@@ -0,0 +1,67 @@
+import os
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from semantic_search.services.embeddings import encode_local, get_model, model_name
+from semantic_search.services.executor import EmbeddingExecutor
+from semantic_search.services.registry import registered_models
+from semantic_search.services.sidecar import SidecarServer, is_supported
+
+
+class Command(BaseCommand):
+    help = "Arrenca el sidecar d'embeddings: carrega el model un sol cop i el serveix per un socket Unix."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--socket",
+            default=None,
+            help="Ruta del socket (per defecte SEMANTIC_SEARCH_SIDECAR_SOCKET)",
+        )
+
+    def handle(self, *args, **options):
+        if not is_supported():
+            raise CommandError("Aquest sistema no suporta sockets Unix.")
+
+        path = options["socket"] or getattr(settings, "SEMANTIC_SEARCH_SIDECAR_SOCKET", None)
+        if not path:
+            raise CommandError("Cal indicar --socket o SEMANTIC_SEARCH_SIDECAR_SOCKET.")
+
+        if os.path.exists(path):
+            os.unlink(path)
+
+        self.stdout.write("Carregant el model...")
+        get_model()
+
+        # Les peticions de diferents workers s'agrupen en micro-lots (un executor per model;
+        # els models registrats que no són l'actiu es carreguen a la primera petició)
+        executors = {}
+        executors_lock = threading.Lock()
+
+        def encode(model, texts):
+            if len(texts) > 1:
+                return encode_local(texts, model=model)
+            with executors_lock:
+                executor = executors.get(model)
+                if executor is None:
+                    executor = executors[model] = EmbeddingExecutor(
+                        lambda batch: encode_local(batch, model=model),
+                        window_ms=getattr(settings, "SEMANTIC_SEARCH_BATCH_WINDOW_MS", 0) or 5,
+                        max_batch=getattr(settings, "SEMANTIC_SEARCH_BATCH_MAX_SIZE", 32),
+                    )
+            futures = [executor.submit(text) for text in texts]
+            return np.vstack([f.result() for f in futures])
+
+        server = SidecarServer(path, registered_models(), encode)
+        os.chmod(path, 0o660)
+        self.stdout.write(self.style.SUCCESS(f"Sidecar d'embeddings escoltant a {path} ({model_name()})"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            if os.path.exists(path):
+                os.unlink(path)
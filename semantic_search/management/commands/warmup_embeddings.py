@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from semantic_search.services.embeddings import model_name, warmup
+
+
+class Command(BaseCommand):
+    help = "Carrega el model d'embeddings (o connecta amb el sidecar) i en fa una primera passada."
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        mode = warmup()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Embeddings preparats ({mode}, {model_name()}) en {elapsed:.2f}s"
+        ))
@@ -0,0 +1,35 @@
+# Generated by Django 4.1.13 on 2026-10-19 10:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('events', '0004_auto_20260130_1658'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventEmbedding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('embedding_model', models.CharField(db_index=True, max_length=200)),
+                ('dtype', models.CharField(choices=[('float16', 'float16'), ('int8', 'int8 (quantitzat)')], default='int8', max_length=10)),
+                ('dim', models.PositiveIntegerField()),
+                ('scale', models.FloatField(default=1.0)),
+                ('vector', models.BinaryField()),
+                ('content_hash', models.CharField(blank=True, default='', max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='embeddings', to='events.event')),
+            ],
+            options={
+                'verbose_name': "Embedding d'esdeveniment",
+                'verbose_name_plural': "Embeddings d'esdeveniments",
+                'unique_together': {('event', 'embedding_model')},
+            },
+        ),
+    ]
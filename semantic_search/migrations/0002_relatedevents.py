@@ -0,0 +1,33 @@
+# Generated by Django 4.1.13 on 2026-10-19 15:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+import djongo.models.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_auto_20260130_1658'),
+        ('semantic_search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedEvents',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('embedding_model', models.CharField(db_index=True, max_length=200)),
+                ('neighbour_ids', djongo.models.fields.JSONField(blank=True, default=list)),
+                ('neighbours', djongo.models.fields.JSONField(blank=True, default=list)),
+                ('min_score', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_sets', to='events.event')),
+            ],
+            options={
+                'verbose_name': 'Esdeveniments relacionats',
+                'verbose_name_plural': 'Esdeveniments relacionats',
+                'unique_together': {('event', 'embedding_model')},
+            },
+        ),
+    ]
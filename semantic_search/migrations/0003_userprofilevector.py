@@ -0,0 +1,34 @@
+# Generated by Django 4.1.13 on 2026-10-19 18:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('semantic_search', '0002_relatedevents'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserProfileVector',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('embedding_model', models.CharField(db_index=True, max_length=200)),
+                ('dim', models.PositiveIntegerField()),
+                ('scale', models.FloatField(default=1.0)),
+                ('vector', models.BinaryField()),
+                ('weight', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='profile_vectors', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': "Perfil vectorial d'usuari",
+                'verbose_name_plural': "Perfils vectorials d'usuaris",
+                'unique_together': {('user', 'embedding_model')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.1.13 on 2026-10-19 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('semantic_search', '0003_userprofilevector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmbeddingModelState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True)),
+                ('status', models.CharField(choices=[('active', 'Actiu'), ('migrating', 'En migració'), ('retired', 'Retirat')], db_index=True, default='migrating', max_length=10)),
+                ('covered', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('activated_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': "Model d'embeddings",
+                'verbose_name_plural': "Models d'embeddings",
+            },
+        ),
+    ]
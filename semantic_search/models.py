@@ -1,3 +1,148 @@
-from django.db import models
+from django.conf import settings
+from djongo import models
 
-# Create your models here.
+from events.models import Event
+from .services.quantization import DTYPE_CHOICES, DTYPE_INT8, dequantize
+
+
+class EventEmbedding(models.Model):
+    """
+    Embedding d'un Event guardat en binari compacte (float16 o int8 + escala).
+    Un document per (event, model) fora del document de l'Event.
+    """
+
+    event = models.ForeignKey(
+        Event,
+        on_delete=models.CASCADE,
+        related_name="embeddings",
+    )
+    embedding_model = models.CharField(max_length=200, db_index=True)
+
+    dtype = models.CharField(max_length=10, choices=DTYPE_CHOICES, default=DTYPE_INT8)
+    dim = models.PositiveIntegerField()
+    scale = models.FloatField(default=1.0)
+    vector = models.BinaryField()
+
+    # sha256 del text embeddejat (títol | descripció | categoria | etiquetes)
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = models.DjongoManager()
+
+    class Meta:
+        unique_together = ("event", "embedding_model")
+        verbose_name = "Embedding d'esdeveniment"
+        verbose_name_plural = "Embeddings d'esdeveniments"
+
+    def __str__(self) -> str:
+        return f"{self.event_id} · {self.embedding_model} ({self.dtype})"
+
+    def to_numpy(self):
+        """
+        Retorna el vector com a np.ndarray float32.
+        """
+        return dequantize(bytes(self.vector), self.dtype, self.scale)
+
+
+class RelatedEvents(models.Model):
+    """
+    Veïns més propers (per embedding) d'un Event, precalculats.
+
+    `neighbours` guarda les dades que mostra la pàgina de detall
+    (id, títol, data, categoria, estat i score) perquè n'hi hagi prou
+    amb una sola lectura per (event, model).
+    """
+
+    event = models.ForeignKey(
+        Event,
+        on_delete=models.CASCADE,
+        related_name="related_sets",
+    )
+    embedding_model = models.CharField(max_length=200, db_index=True)
+
+    neighbour_ids = models.JSONField(default=list, blank=True)
+    neighbours = models.JSONField(default=list, blank=True)
+    # Score del veí més llunyà: un Event nou més similar hi ha d'entrar
+    min_score = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = models.DjongoManager()
+
+    class Meta:
+        unique_together = ("event", "embedding_model")
+        verbose_name = "Esdeveniments relacionats"
+        verbose_name_plural = "Esdeveniments relacionats"
+
+    def __str__(self) -> str:
+        return f"{self.event_id} · {len(self.neighbour_ids)} veïns"
+
+
+class UserProfileVector(models.Model):
+    """
+    Perfil d'interessos d'un usuari: mitjana (amb decaïment temporal) dels
+    embeddings dels events que ha creat, on ha xatejat o dels creadors que segueix.
+
+    Es guarda compacte com a int8 + escala; `weight` és el pes acumulat
+    (ja decaigut fins a `updated_at`) i permet actualitzar-lo de manera incremental.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="profile_vectors",
+    )
+    embedding_model = models.CharField(max_length=200, db_index=True)
+
+    dim = models.PositiveIntegerField()
+    scale = models.FloatField(default=1.0)
+    vector = models.BinaryField()
+    weight = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("user", "embedding_model")
+        verbose_name = "Perfil vectorial d'usuari"
+        verbose_name_plural = "Perfils vectorials d'usuaris"
+
+    def __str__(self) -> str:
+        return f"{self.user_id} · {self.embedding_model} (pes {self.weight:.2f})"
+
+    def to_numpy(self):
+        return dequantize(bytes(self.vector), DTYPE_INT8, self.scale)
+
+
+class EmbeddingModelState(models.Model):
+    """
+    Estat d'un model del registre d'embeddings (vegeu `services.registry`).
+
+    Com a molt n'hi ha un d'"active" (el que fan servir les consultes) i un
+    en "migrating" (el que s'està omplint en segon pla abans del canvi).
+    """
+
+    STATUS_ACTIVE = "active"
+    STATUS_MIGRATING = "migrating"
+    STATUS_RETIRED = "retired"
+    STATUS_CHOICES = [
+        (STATUS_ACTIVE, "Actiu"),
+        (STATUS_MIGRATING, "En migració"),
+        (STATUS_RETIRED, "Retirat"),
+    ]
+
+    name = models.CharField(max_length=200, unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_MIGRATING, db_index=True)
+    # Cobertura de l'última comprovació (events amb embedding d'aquest model / total)
+    covered = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    activated_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Model d'embeddings"
+        verbose_name_plural = "Models d'embeddings"
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.status})"
+
+    @property
+    def coverage(self) -> float:
+        return self.covered / self.total if self.total else 1.0
@@ -0,0 +1,164 @@
+"""
+Backfill d'embeddings per lots, reprenible i repartible entre processos.
+
+Cada tram d'ids (pk) el processa un worker que:
+- recorre els Events amb un cursor en streaming ordenat per pk,
+- embeddeja els textos en lots (`model.encode(texts, batch_size=N)`),
+- desa cada lot amb escriptures en bloc,
+- i guarda un checkpoint (últim pk processat) després de cada lot.
+"""
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def checkpoint_dir() -> Path:
+    default = Path(settings.BASE_DIR) / "var" / "backfill"
+    return Path(getattr(settings, "SEMANTIC_SEARCH_BACKFILL_DIR", default))
+
+
+def read_json(path: Path):
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def write_json(path: Path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def split_ranges(ids: list[int], workers: int) -> list[tuple[int | None, int | None]]:
+    """
+    Reparteix una llista ordenada d'ids en trams contigus [lo, hi].
+    El primer tram no té límit inferior i l'últim no en té de superior,
+    perquè els events creats durant l'execució també quedin coberts.
+    """
+    workers = max(1, min(workers, len(ids) or 1))
+    ranges = []
+    for i in range(workers):
+        lo = None if i == 0 else ids[len(ids) * i // workers]
+        hi = None if i == workers - 1 else ids[len(ids) * (i + 1) // workers] - 1
+        ranges.append((lo, hi))
+    return ranges
+
+
+def backfill_range(
+    model: str,
+    lo: int | None,
+    hi: int | None,
+    *,
+    checkpoint: str,
+    batch_size: int = 64,
+    force: bool = False,
+    limit: int = 0,
+    label: str = "",
+    torch_threads: int = 0,
+    progress=None,
+) -> dict:
+    """
+    Embeddeja els Events amb lo <= pk <= hi. Es pot cridar en un procés fill.
+    progress: funció que rep una línia de progrés per lot (per defecte, el logger).
+    Retorna {"embedded": n, "skipped": n, "seconds": s}.
+    """
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        # Procés fill creat amb "spawn" (Windows / macOS)
+        django.setup()
+
+    from django.db import connections
+
+    from events.models import Event
+    from .embeddings import content_hash, embed_texts, event_text
+    from .storage import save_embeddings, stored_hashes
+    from .vector_store import event_attrs
+
+    if torch_threads:
+        import torch
+        torch.set_num_threads(torch_threads)
+
+    # Les connexions heretades del pare (fork) no s'han de reutilitzar
+    connections.close_all()
+
+    checkpoint_path = Path(checkpoint)
+    state = read_json(checkpoint_path) or {}
+    if state.get("model") != model:
+        state = {"model": model, "last_pk": None, "embedded": 0, "skipped": 0}
+
+    qs = Event.objects.only(
+        "id", "title", "description", "category", "tags", "scheduled_date", "status"
+    ).order_by("pk")
+    start = state["last_pk"] + 1 if state["last_pk"] is not None else lo
+    if start is not None:
+        qs = qs.filter(pk__gte=start)
+    if hi is not None:
+        qs = qs.filter(pk__lte=hi)
+
+    started = time.monotonic()
+    embedded_this_run = 0
+    batch = []
+
+    def flush():
+        nonlocal embedded_this_run
+        if not batch:
+            return
+        existing = {} if force else stored_hashes(model, [e.pk for e, _, _ in batch])
+        pending = [(e, text, digest) for e, text, digest in batch if existing.get(e.pk) != digest]
+
+        if pending:
+            vecs = embed_texts([text for _, text, _ in pending], batch_size=batch_size, model=model)
+            save_embeddings(
+                model,
+                [(e.pk, vec, digest) for (e, _, digest), vec in zip(pending, vecs)],
+                attrs={e.pk: event_attrs(e) for e, _, _ in pending},
+            )
+
+        embedded_this_run += len(pending)
+        state["embedded"] += len(pending)
+        state["skipped"] += len(batch) - len(pending)
+        state["last_pk"] = batch[-1][0].pk
+        write_json(checkpoint_path, state)
+
+        elapsed = time.monotonic() - started
+        rate = embedded_this_run / elapsed if elapsed > 0 else 0.0
+        (progress or logger.info)(
+            f"{label}pk<={state['last_pk']}: {state['embedded']} embeddings, "
+            f"{state['skipped']} sense canvis, {rate:.1f} events/s"
+        )
+        batch.clear()
+
+    def batch_full() -> bool:
+        # Amb --limit el lot no passa del que falta: mai s'embeddeja de més
+        if limit:
+            return len(batch) >= min(batch_size, limit - state["embedded"])
+        return len(batch) >= batch_size
+
+    if not (limit and state["embedded"] >= limit):
+        for e in qs.iterator(chunk_size=batch_size * 4):
+            text = event_text(e)
+            if not text:
+                continue
+            batch.append((e, text, content_hash(text)))
+            if batch_full():
+                flush()
+                if limit and state["embedded"] >= limit:
+                    break
+        else:
+            flush()
+
+    return {
+        "embedded": state["embedded"],
+        "skipped": state["skipped"],
+        "seconds": time.monotonic() - started,
+    }
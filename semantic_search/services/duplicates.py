@@ -0,0 +1,67 @@
+"""
+Detecció de quasi-duplicats en crear un Event.
+
+S'embeddeja l'esborrany i es compara (amb els vectors del VectorStore, ja en
+memòria) amb els Events del mateix creador programats dins d'una finestra
+de temps al voltant de la data de l'esborrany.
+"""
+import logging
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def find_near_duplicates(user, draft, limit: int = 3) -> list[tuple[object, float]]:
+    """
+    draft: Event no desat (títol, descripció, categoria, etiquetes i data).
+    Retorna [(Event, similitud), ...] per sobre del llindar, ordenat desc.
+    Si no hi ha snapshot o la inferència falla, retorna [] (no bloqueja la creació).
+    """
+    from events.models import Event
+    from .embeddings import embed_text, event_text, model_name
+    from .vector_store import get_store
+
+    threshold = getattr(settings, "SEMANTIC_SEARCH_DUPLICATE_THRESHOLD", 0.92)
+    window = timedelta(days=getattr(settings, "SEMANTIC_SEARCH_DUPLICATE_WINDOW_DAYS", 7))
+    if not user or not getattr(user, "pk", None) or not draft.scheduled_date:
+        return []
+
+    model = model_name()
+    store = get_store(model)
+    if not store.available:
+        return []
+
+    candidate_ids = list(
+        Event.objects.filter(
+            creator=user,
+            scheduled_date__gte=draft.scheduled_date - window,
+            scheduled_date__lte=draft.scheduled_date + window,
+        ).values_list("id", flat=True)
+    )
+    vectors = [(event_id, store.vector_of(event_id)) for event_id in candidate_ids]
+    vectors = [(event_id, vec) for event_id, vec in vectors if vec is not None]
+    if not vectors:
+        return []
+
+    try:
+        # Els esborranys no passen per la cache de consultes
+        q = np.asarray(embed_text(event_text(draft), use_cache=False, model=model), dtype=np.float32)
+    except Exception:
+        logger.exception("No s'ha pogut embeddejar l'esborrany per detectar duplicats.")
+        return []
+    if q.shape != (store.dim,):
+        return []
+
+    ids = [event_id for event_id, _ in vectors]
+    scores = np.stack([vec for _, vec in vectors]) @ q
+    matches = sorted(
+        ((event_id, float(score)) for event_id, score in zip(ids, scores) if score >= threshold),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:limit]
+
+    events = Event.objects.in_bulk([event_id for event_id, _ in matches])
+    return [(events[event_id], score) for event_id, score in matches if event_id in events]
@@ -1,28 +1,378 @@
+import hashlib
+import logging
+import re
+import sqlite3
 import threading
-from sentence_transformers import SentenceTransformer
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
 
-_MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
 _lock = threading.Lock()
-_model = None
+# nom del model -> instància carregada (durant una migració n'hi pot haver dos)
+_models = {}
 
 
-def get_model():
-    global _model
-    if _model is None:
+def get_model(name: str | None = None):
+    """
+    Carrega el model (per defecte, l'actiu del registre) a la primera crida.
+    sentence_transformers (i torch) s'importen aquí i no a nivell de mòdul,
+    perquè les comandes, els tests i els workers que no fan cap cerca no
+    paguin aquesta importació.
+    """
+    name = name or model_name()
+    model = _models.get(name)
+    if model is None:
         with _lock:
-            if _model is None:
-                _model = SentenceTransformer(_MODEL_NAME)
-    return _model
+            model = _models.get(name)
+            if model is None:
+                threads = getattr(settings, "SEMANTIC_SEARCH_TORCH_THREADS", 0)
+                if threads:
+                    import torch
+                    torch.set_num_threads(threads)
+                model = _models[name] = load_model(inference_backend(), name)
+    return model
+
+
+BACKEND_TORCH = "torch"
+BACKEND_TORCH_INT8 = "torch-int8"
+INFERENCE_BACKENDS = (BACKEND_TORCH, BACKEND_TORCH_INT8)
+
+
+def inference_backend() -> str:
+    backend = getattr(settings, "SEMANTIC_SEARCH_INFERENCE_BACKEND", BACKEND_TORCH)
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Backend d'inferència desconegut: {backend}")
+    return backend
+
+
+def load_model(backend: str = BACKEND_TORCH, name: str | None = None):
+    """
+    Carrega el model amb el backend indicat:
+
+    - "torch": PyTorch en precisió completa (float32).
+    - "torch-int8": quantització dinàmica int8 de les capes Linear del
+      transformer (pesos int8, activacions quantitzades al vol). Els vectors
+      són compatibles, dins d'una tolerància, amb els desats en float32, per
+      això el nom del model (i els embeddings existents) no canvien.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    name = name or model_name()
+    if backend == BACKEND_TORCH_INT8:
+        import torch
+
+        # La quantització dinàmica només té kernels de CPU
+        model = SentenceTransformer(name, device="cpu")
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return SentenceTransformer(name)
+
+
+def warmup() -> str:
+    """
+    Prepara la inferència abans de la primera cerca: amb sidecar n'obre la
+    connexió; si no, carrega el model i fa una primera passada.
+    Retorna "sidecar" o "local".
+    """
+    if _encode_via_sidecar(["warmup"], model_name()) is not None:
+        return "sidecar"
+    encode_local(["warmup"])
+    return "local"
+
+
+_executors = {}
+_executor_lock = threading.Lock()
+
+
+def get_executor(model: str | None = None):
+    """
+    Executor de micro-lots compartit (un per model), o None si està desactivat
+    (SEMANTIC_SEARCH_BATCH_WINDOW_MS = 0).
+    """
+    window_ms = getattr(settings, "SEMANTIC_SEARCH_BATCH_WINDOW_MS", 0)
+    if not window_ms:
+        return None
+    model = model or model_name()
+    executor = _executors.get(model)
+    if executor is None:
+        with _executor_lock:
+            executor = _executors.get(model)
+            if executor is None:
+                from .executor import EmbeddingExecutor
+                executor = _executors[model] = EmbeddingExecutor(
+                    lambda texts: embed_texts(texts, model=model),
+                    window_ms=window_ms,
+                    max_batch=getattr(settings, "SEMANTIC_SEARCH_BATCH_MAX_SIZE", 32),
+                )
+    return executor
+
+
+def _encode_one(text: str, model: str) -> np.ndarray:
+    executor = get_executor(model)
+    if executor is not None:
+        return executor.submit(text).result()
+    return embed_texts([text], model=model)[0]
+
+
+# ==========================
+#   SIDECAR (opcional)
+# ==========================
+
+_sidecar_client = None
+_sidecar_retry_at = 0.0
+# Després d'un error, segons abans de tornar a provar el sidecar
+SIDECAR_RETRY_SECONDS = 5.0
+
+
+def _get_sidecar_client():
+    global _sidecar_client
+    path = getattr(settings, "SEMANTIC_SEARCH_SIDECAR_SOCKET", None)
+    if not path or time.monotonic() < _sidecar_retry_at:
+        return None
+    if _sidecar_client is None:
+        from .sidecar import SidecarClient, is_supported
+        if not is_supported():
+            return None
+        _sidecar_client = SidecarClient(
+            path,
+            timeout=getattr(settings, "SEMANTIC_SEARCH_SIDECAR_TIMEOUT", 5.0),
+        )
+    return _sidecar_client
+
+
+def _encode_via_sidecar(texts: list[str], model: str):
+    """
+    Encoda al sidecar si està configurat. Retorna None si no hi és o falla
+    (i llavors es fa la inferència en procés).
+    """
+    global _sidecar_retry_at
+    client = _get_sidecar_client()
+    if client is None:
+        return None
+    from .sidecar import SidecarUnavailable
+    try:
+        return client.encode(model, texts)
+    except SidecarUnavailable:
+        logger.warning("Sidecar d'embeddings no disponible; inferència en procés.")
+        _sidecar_retry_at = time.monotonic() + SIDECAR_RETRY_SECONDS
+        return None
+
+
+# ==========================
+#   CACHE DE CONSULTES
+# ==========================
+
+def normalize_query(text: str) -> str:
+    """
+    Forma canònica d'una consulta per a la cache: NFC, minúscules i espais simples.
+    """
+    text = unicodedata.normalize("NFC", text or "")
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class _DiskTier:
+    """
+    Nivell persistent opcional (SQLite) que sobreviu als reinicis.
+    """
 
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), timeout=5, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_vectors ("
+            " model TEXT NOT NULL, text TEXT NOT NULL, vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, text))"
+        )
+        self._conn.commit()
 
-def embed_text(text: str) -> list[float]:
+    def get(self, model: str, text: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vector FROM query_vectors WHERE model = ? AND text = ?",
+                (model, text),
+            ).fetchone()
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32)
+
+    def put(self, model: str, text: str, vec: np.ndarray):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_vectors (model, text, vector) VALUES (?, ?, ?)",
+                (model, text, vec.astype(np.float32).tobytes()),
+            )
+            self._conn.commit()
+
+
+class QueryCache:
+    """
+    Cache LRU acotada de vectors de consulta, clau (model, text normalitzat).
+
+    Diversos models poden conviure (p. ex. durant un canvi de model o una
+    comparació): cada entrada és del seu model i les antigues surten per LRU.
+    """
+
+    def __init__(self, maxsize: int = 1024, disk_path=None):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = _DiskTier(disk_path) if disk_path else None
+
+    def get(self, model: str, text: str):
+        key = (model, text)
+        with self._lock:
+            vec = self._data.get(key)
+            if vec is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return vec
+
+        if self._disk is not None:
+            vec = self._disk.get(model, text)
+            if vec is not None:
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    self._store(key, vec)
+                return vec
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, model: str, text: str, vec: np.ndarray):
+        with self._lock:
+            self._store((model, text), vec)
+        if self._disk is not None:
+            self._disk.put(model, text, vec)
+
+    def _store(self, key: tuple, vec: np.ndarray):
+        self._data[key] = vec
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.disk_hits = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+            }
+
+
+_query_cache = None
+_query_cache_lock = threading.Lock()
+
+
+def get_query_cache() -> QueryCache:
+    global _query_cache
+    if _query_cache is None:
+        with _query_cache_lock:
+            if _query_cache is None:
+                _query_cache = QueryCache(
+                    maxsize=getattr(settings, "SEMANTIC_SEARCH_QUERY_CACHE_SIZE", 1024),
+                    disk_path=getattr(settings, "SEMANTIC_SEARCH_QUERY_CACHE_PATH", None),
+                )
+    return _query_cache
+
+
+def embed_text(text: str, use_cache: bool = True, model: str | None = None) -> list[float]:
+    """
+    Vector d'una consulta amb `model` (per defecte l'actiu). Qui també cerca
+    hi ha de passar el mateix model que fa servir per al VectorStore.
+    """
     text = (text or "").strip()
     if not text:
         return []
-    model = get_model()
-    vec = model.encode([text], normalize_embeddings=True)[0]
+    model = model or model_name()
+
+    cache = get_query_cache() if use_cache else None
+    key = normalize_query(text)
+    if cache is not None:
+        cached = cache.get(model, key)
+        if cached is not None:
+            return cached.tolist()
+
+    # La forma normalitzada només és la clau: s'embeddeja el text original
+    vec = _encode_one(text, model)
+    if cache is not None:
+        cache.put(model, key, np.asarray(vec, dtype=np.float32))
     return vec.tolist()
 
 
+def embed_texts(texts: list[str], batch_size: int = 32, model: str | None = None) -> np.ndarray:
+    """
+    Embeddings normalitzats d'una llista de textos en lots (matriu N x D float32).
+    Aprofita el batching del model; no passa per la cache de consultes.
+    """
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+    model = model or model_name()
+    vecs = _encode_via_sidecar(list(texts), model)
+    if vecs is not None:
+        return vecs
+    return encode_local(texts, batch_size=batch_size, model=model)
+
+
+def encode_local(texts: list[str], batch_size: int = 32, model: str | None = None) -> np.ndarray:
+    """
+    Inferència en aquest procés (és el que fa servir el sidecar).
+    """
+    model = get_model(model)
+    vecs = model.encode(
+        list(texts),
+        batch_size=batch_size,
+        normalize_embeddings=True,
+        convert_to_numpy=True,
+        show_progress_bar=False,
+    )
+    return np.asarray(vecs, dtype=np.float32)
+
+
 def model_name() -> str:
-    return _MODEL_NAME
+    """
+    Model actiu del registre (vegeu `registry`): el que fan servir les consultes.
+    """
+    from .registry import active_model
+    return active_model()
+
+
+def query_cache_stats() -> dict:
+    """
+    Comptadors de la cache de consultes (mida, encerts, errades).
+    """
+    return get_query_cache().stats()
+
+
+def event_text(event) -> str:
+    """
+    Text que s'embeddeja per a un Event: títol | descripció | categoria | etiquetes.
+    """
+    return " | ".join([
+        (event.title or "").strip(),
+        (event.description or "").strip(),
+        (event.category or "").strip(),
+        (event.tags or "").strip(),
+    ]).strip()
+
+
+def content_hash(text: str) -> str:
+    """
+    Hash (sha256) del text embeddejat, per detectar contingut sense canvis.
+    """
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
@@ -0,0 +1,69 @@
+"""
+Executor de micro-lots per a `embed_text`.
+
+Les crides concurrents que arriben dins d'una finestra curta (p. ex. 5 ms o
+32 textos) s'agrupen en una sola crida a `model.encode`, executada en un
+fil dedicat. Cada crida rep un Future amb el seu vector.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class EmbeddingExecutor:
+    def __init__(self, encode_fn, window_ms: float = 5.0, max_batch: int = 32):
+        """
+        encode_fn: funció list[str] -> matriu (N x D) de vectors normalitzats
+        """
+        self.encode_fn = encode_fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="semantic-embed-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def _collect(self) -> list[tuple[str, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Textos repetits dins del mateix lot només s'encoden un cop
+            unique = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                vecs = self.encode_fn(unique)
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+
+            by_text = dict(zip(unique, vecs))
+            for text, future in batch:
+                future.set_result(by_text[text])
+            self.batches += 1
+            self.items += len(batch)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch": (self.items / self.batches) if self.batches else 0.0,
+        }
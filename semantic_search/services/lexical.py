@@ -0,0 +1,297 @@
+"""
+Índex invertit local amb BM25 sobre títol, descripció i etiquetes.
+
+Complementa la cerca vectorial en els casos on el cosinus falla: noms propis,
+handles d'streamers, etiquetes exactes. L'índex viu en memòria (un per
+procés) i es construeix en un fil de fons a partir de la primera cerca;
+mentre no està llest, la cerca és només vectorial. Després es manté al dia:
+
+- al procés que desa l'Event, via signals (`update_event` / `remove_event`);
+- als altres workers, consultant periòdicament els Events amb `updated_at`
+  posterior a l'última sincronització (SEMANTIC_SEARCH_LEXICAL_REFRESH).
+
+Els Events eliminats en un altre procés es descarten en hidratar els resultats
+i desapareixen de l'índex a la propera reconstrucció.
+"""
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Pes de cada camp en la freqüència del terme (BM25F simplificat)
+FIELD_WEIGHTS = {"title": 3, "tags": 2, "description": 1}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Minúscules, sense accents, separat per tot el que no és alfanumèric.
+    "@Ibai_Llanos" -> ["ibai", "llanos"]; "Cançó" -> ["canco"]
+    """
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return [t for t in _TOKEN_RE.findall(text) if len(t) > 1 or t.isdigit()]
+
+
+def event_terms(event) -> Counter:
+    """
+    Freqüències ponderades dels termes d'un Event.
+    """
+    terms = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        for token in tokenize(getattr(event, field, "") or ""):
+            terms[token] += weight
+    return terms
+
+
+class _DocAttrs:
+    """
+    Atributs mínims per aplicar Facets sense carregar l'Event.
+    """
+
+    __slots__ = ("scheduled_date", "category", "status")
+
+    def __init__(self, scheduled_date, category, status):
+        self.scheduled_date = scheduled_date
+        self.category = category
+        self.status = status
+
+
+class LexicalIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = {}   # terme -> {event_id: tf ponderada}
+        self._doc_terms = {}  # event_id -> Counter (per poder treure'l)
+        self._doc_len = {}    # event_id -> longitud ponderada
+        self._attrs = {}      # event_id -> _DocAttrs
+        self._total_len = 0
+        self.built = False
+        self.synced_at = None
+        self._checked_at = 0.0
+        # Només un fil sincronitza; els altres cerquen amb l'estat actual
+        self._sync_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    # ---- manteniment ----
+
+    def add(self, event):
+        terms = event_terms(event)
+        with self._lock:
+            self._remove(event.pk)
+            if not terms:
+                return
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[event.pk] = tf
+            length = sum(terms.values())
+            self._doc_terms[event.pk] = terms
+            self._doc_len[event.pk] = length
+            self._attrs[event.pk] = _DocAttrs(event.scheduled_date, event.category, event.status)
+            self._total_len += length
+
+    def remove(self, event_id: int):
+        with self._lock:
+            self._remove(event_id)
+
+    def _remove(self, event_id: int):
+        terms = self._doc_terms.pop(event_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            docs = self._postings.get(term)
+            if docs is not None:
+                docs.pop(event_id, None)
+                if not docs:
+                    del self._postings[term]
+        self._total_len -= self._doc_len.pop(event_id)
+        self._attrs.pop(event_id, None)
+
+    def set_attrs(self, event):
+        with self._lock:
+            if event.pk in self._attrs:
+                self._attrs[event.pk] = _DocAttrs(event.scheduled_date, event.category, event.status)
+
+    def build(self, chunk_size: int = 2000):
+        """
+        (Re)construeix l'índex llegint els Events en streaming.
+        """
+        from django.utils import timezone
+
+        from events.models import Event
+
+        started = timezone.now()
+        fresh = LexicalIndex()
+        qs = Event.objects.only(*FIELD_WEIGHTS, "scheduled_date", "category", "status").order_by()
+        for event in qs.iterator(chunk_size=chunk_size):
+            fresh.add(event)
+
+        with self._lock:
+            self._postings = fresh._postings
+            self._doc_terms = fresh._doc_terms
+            self._doc_len = fresh._doc_len
+            self._attrs = fresh._attrs
+            self._total_len = fresh._total_len
+            self.built = True
+            self.synced_at = started
+            self._checked_at = time.monotonic()
+
+    def sync(self):
+        """
+        Aplica els Events modificats (en qualsevol procés) des de l'última sincronització.
+        """
+        from django.utils import timezone
+
+        from events.models import Event
+
+        interval = getattr(settings, "SEMANTIC_SEARCH_LEXICAL_REFRESH", 30)
+        if not self.built:
+            self.build()
+            return
+        if time.monotonic() - self._checked_at < interval:
+            return
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            started = timezone.now()
+            self._checked_at = time.monotonic()
+            qs = Event.objects.filter(updated_at__gte=self.synced_at).only(
+                *FIELD_WEIGHTS, "scheduled_date", "category", "status"
+            )
+            for event in qs:
+                self.add(event)
+            self.synced_at = started
+        finally:
+            self._sync_lock.release()
+
+    # ---- consulta ----
+
+    def search(self, query: str, k: int = 20, facets=None) -> list[tuple[int, float]]:
+        """
+        Retorna [(event_id, score BM25), ...] ordenat desc.
+        """
+        tokens = set(tokenize(query))
+        if not tokens or k <= 0:
+            return []
+
+        with self._lock:
+            n_docs = len(self._doc_len)
+            if not n_docs:
+                return []
+            avg_len = self._total_len / n_docs
+            scores = Counter()
+            for term in tokens:
+                docs = self._postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                for event_id, tf in docs.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_len[event_id] / avg_len)
+                    scores[event_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+            if facets:
+                scores = Counter({
+                    event_id: score for event_id, score in scores.items()
+                    if facets.matches(self._attrs[event_id])
+                })
+
+        return [(event_id, float(score)) for event_id, score in scores.most_common(k)]
+
+    def memory_bytes(self) -> int:
+        """
+        Estimació (aproximada) de la memòria de les estructures de l'índex.
+        """
+        import sys
+
+        with self._lock:
+            total = sys.getsizeof(self._postings)
+            for term, docs in self._postings.items():
+                total += sys.getsizeof(term) + sys.getsizeof(docs)
+            for terms in self._doc_terms.values():
+                total += sys.getsizeof(terms)
+            total += sys.getsizeof(self._doc_terms) + sys.getsizeof(self._doc_len)
+            total += sys.getsizeof(self._attrs) + len(self._attrs) * sys.getsizeof(_DocAttrs(None, None, None))
+        return total
+
+
+def reciprocal_rank_fusion(rankings, k: int = 60, limit: int = 20) -> list[tuple[int, float]]:
+    """
+    Fusiona diverses llistes [(event_id, score)] per posició: sum(1 / (k + rank)).
+    No depèn de l'escala dels scores (cosinus vs BM25).
+    """
+    fused = Counter()
+    for ranking in rankings:
+        for rank, (event_id, _) in enumerate(ranking, start=1):
+            fused[event_id] += 1.0 / (k + rank)
+    return [(event_id, float(score)) for event_id, score in fused.most_common(limit)]
+
+
+_index = None
+_index_lock = threading.Lock()
+_build_thread = None
+
+
+def _build_in_background(index: LexicalIndex):
+    from django.db import connection
+
+    try:
+        index.build()
+    except Exception:
+        # Es tornarà a intentar a la propera cerca
+        logger.exception("No s'ha pogut construir l'índex lèxic")
+    finally:
+        connection.close()
+
+
+def get_index() -> LexicalIndex | None:
+    """
+    Índex compartit (per procés), sincronitzat a demanda. Retorna None mentre
+    la primera construcció (en un fil de fons) no ha acabat: cap cerca no
+    l'espera.
+    """
+    global _index, _build_thread
+    with _index_lock:
+        if _index is None:
+            _index = LexicalIndex()
+        index = _index
+        if not index.built:
+            if _build_thread is None or not _build_thread.is_alive():
+                _build_thread = threading.Thread(
+                    target=_build_in_background, args=(index,), name="lexical-index-build", daemon=True
+                )
+                _build_thread.start()
+            return None
+    index.sync()
+    return index
+
+
+def lexical_enabled() -> bool:
+    return getattr(settings, "SEMANTIC_SEARCH_LEXICAL", True)
+
+
+def update_event(event):
+    """
+    Reindexa un Event (només si l'índex ja existeix en aquest procés).
+    """
+    if _index is not None and _index.built:
+        _index.add(event)
+
+
+def update_event_attrs(event):
+    if _index is not None and _index.built:
+        _index.set_attrs(event)
+
+
+def remove_event(event_id: int):
+    if _index is not None and _index.built:
+        _index.remove(event_id)
@@ -0,0 +1,103 @@
+"""
+Temps per fase de la cerca (embed, candidats, puntuació, hidratació).
+
+Cada petició fa servir un PhaseTimer; en acabar, els temps es reporten a la
+capçalera `Server-Timing` i s'acumulen en histogrames per procés que exposa
+l'endpoint de mètriques (format de text de Prometheus).
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+# Límits superiors dels buckets (ms)
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PhaseTimer:
+    def __init__(self):
+        self.durations = {}  # fase -> ms (acumulats)
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - t0) * 1000)
+
+    def add(self, name: str, ms: float):
+        self.durations[name] = self.durations.get(name, 0.0) + ms
+
+    def finish(self) -> dict:
+        self.durations["total"] = (time.perf_counter() - self._started) * 1000
+        return self.durations
+
+    def server_timing(self) -> str:
+        """
+        Valor de la capçalera Server-Timing: "embed;dur=12.3, scoring;dur=0.8, ..."
+        """
+        return ", ".join(f"{name};dur={ms:.2f}" for name, ms in self.durations.items())
+
+
+@contextmanager
+def phase(timer, name: str):
+    """
+    Com `timer.phase(name)`, però admet timer=None (sense instrumentació).
+    """
+    if timer is None:
+        yield
+    else:
+        with timer.phase(name):
+            yield
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # l'últim és +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, ms: float):
+        for i, upper in enumerate(self.buckets):
+            if ms <= upper:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += ms
+        self.count += 1
+
+
+_histograms = {}
+_lock = threading.Lock()
+
+
+def observe(durations: dict):
+    with _lock:
+        for name, ms in durations.items():
+            _histograms.setdefault(name, Histogram()).observe(ms)
+
+
+def render_prometheus() -> str:
+    """
+    Histogrames en format de text de Prometheus (acumulats, en segons).
+    """
+    metric = "semantic_search_phase_seconds"
+    lines = [
+        f"# HELP {metric} Temps de cada fase de la cerca semàntica (per procés).",
+        f"# TYPE {metric} histogram",
+    ]
+    with _lock:
+        for name in sorted(_histograms):
+            hist = _histograms[name]
+            cumulative = 0
+            for upper, count in zip(hist.buckets, hist.counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{phase="{name}",le="{upper / 1000:g}"}} {cumulative}')
+            cumulative += hist.counts[-1]
+            lines.append(f'{metric}_bucket{{phase="{name}",le="+Inf"}} {cumulative}')
+            lines.append(f'{metric}_sum{{phase="{name}"}} {hist.total / 1000:.6f}')
+            lines.append(f'{metric}_count{{phase="{name}"}} {hist.count}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,260 @@
+"""
+Perfil vectorial per usuari per personalitzar la cerca semàntica.
+
+El perfil és la mitjana, amb decaïment exponencial (mitja vida
+SEMANTIC_SEARCH_PROFILE_HALF_LIFE_DAYS), dels embeddings de:
+
+- els events que l'usuari ha creat (pes WEIGHT_CREATED),
+- els events on ha escrit al xat (WEIGHT_CHAT per missatge),
+- els events dels creadors que segueix (WEIGHT_FOLLOW repartit entre ells).
+
+Es manté de manera incremental: cada interacció nova fa decaure el perfil
+fins ara i hi suma el vector nou. Els canvis que no es poden desfer
+incrementalment (deixar de seguir algú) reconstrueixen el perfil en segon pla.
+
+A l'hora de cercar, el vector de la consulta es combina amb el perfil
+(`blend`); el perfil es llegeix d'una cache per procés per no afegir cap
+consulta a la BD en el camí calent.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .quantization import DTYPE_INT8, quantize
+
+logger = logging.getLogger(__name__)
+
+WEIGHT_CREATED = 1.0
+WEIGHT_CHAT = 0.3
+WEIGHT_FOLLOW = 1.0
+# Events recents d'un creador que representen el seu contingut en seguir-lo
+FOLLOW_SAMPLE = 20
+
+_update_lock = threading.Lock()
+
+
+def _half_life_seconds() -> float:
+    return getattr(settings, "SEMANTIC_SEARCH_PROFILE_HALF_LIFE_DAYS", 30) * 86400
+
+
+def _decay(since, until) -> float:
+    """
+    Factor de decaïment entre dos instants (1.0 si until <= since).
+    """
+    elapsed = (until - since).total_seconds()
+    if elapsed <= 0:
+        return 1.0
+    return 0.5 ** (elapsed / _half_life_seconds())
+
+
+def add_interaction(user_id: int, vectors, weight: float, at=None) -> bool:
+    """
+    Suma al perfil d'un usuari la mitjana de `vectors` amb pes `weight`.
+    Retorna False si no hi ha cap vector.
+    """
+    from semantic_search.models import UserProfileVector
+    from .embeddings import model_name
+
+    vectors = [np.asarray(v, dtype=np.float32) for v in vectors if v is not None]
+    if not vectors or weight <= 0:
+        return False
+    vec = np.mean(vectors, axis=0)
+    model = model_name()
+    at = at or timezone.now()
+
+    with _update_lock:
+        profile = UserProfileVector.objects.filter(user_id=user_id, embedding_model=model).first()
+        if profile is None or profile.dim != vec.shape[0]:
+            mean, total = vec, weight
+            if profile is None:
+                profile = UserProfileVector(user_id=user_id, embedding_model=model)
+        else:
+            factor = _decay(profile.updated_at, at)
+            old_weight = profile.weight * factor
+            total = old_weight + weight
+            mean = (profile.to_numpy() * old_weight + vec * weight) / total
+        _store(profile, mean, total, max(at, profile.updated_at or at))
+    _cache.invalidate(user_id)
+    return True
+
+
+def _store(profile, mean, weight, updated_at):
+    data, scale = quantize(mean, DTYPE_INT8)
+    profile.dim = int(mean.shape[0])
+    profile.vector = data
+    profile.scale = scale
+    profile.weight = float(weight)
+    profile.updated_at = updated_at
+    profile.save()
+
+
+def rebuild(user_id: int) -> bool:
+    """
+    Recalcula el perfil des de zero a partir de l'historial de l'usuari.
+    """
+    from chat.models import ChatMessage
+    from events.models import Event
+    from semantic_search.models import UserProfileVector
+    from users.models import Follow
+    from .embeddings import model_name
+    from .vector_store import get_store
+
+    model = model_name()
+    store = get_store(model)
+    now = timezone.now()
+
+    # (event_id, pes, instant)
+    items = [
+        (event_id, WEIGHT_CREATED, created_at)
+        for event_id, created_at in Event.objects.filter(creator_id=user_id).values_list("id", "created_at")
+    ]
+    items += [
+        (event_id, WEIGHT_CHAT, created_at)
+        for event_id, created_at in ChatMessage.objects.filter(
+            user_id=user_id, is_deleted=False
+        ).values_list("event_id", "created_at")
+    ]
+    for following_id, followed_at in Follow.objects.filter(follower_id=user_id).values_list(
+        "following_id", "created_at"
+    ):
+        event_ids = list(
+            Event.objects.filter(creator_id=following_id)
+            .order_by("-created_at")
+            .values_list("id", flat=True)[:FOLLOW_SAMPLE]
+        )
+        if event_ids:
+            share = WEIGHT_FOLLOW / len(event_ids)
+            items += [(event_id, share, followed_at) for event_id in event_ids]
+
+    total = 0.0
+    acc = None
+    for event_id, weight, at in items:
+        vec = store.vector_of(event_id)
+        if vec is None:
+            continue
+        w = weight * _decay(at, now)
+        acc = vec * w if acc is None else acc + vec * w
+        total += w
+
+    with _update_lock:
+        profile = UserProfileVector.objects.filter(user_id=user_id, embedding_model=model).first()
+        if acc is None or total <= 0:
+            if profile is not None:
+                profile.delete()
+        else:
+            _store(profile or UserProfileVector(user_id=user_id, embedding_model=model), acc / total, total, now)
+    _cache.invalidate(user_id)
+    return acc is not None
+
+
+def rebuild_many(user_ids) -> int:
+    from django.db import close_old_connections
+
+    close_old_connections()
+    return sum(1 for user_id in user_ids if rebuild(user_id))
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def enqueue_rebuild(user_id: int):
+    """
+    Encua la reconstrucció del perfil d'un usuari (en segon pla, per lots).
+    """
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                from .reembed_queue import ReembedWorker
+                _worker = ReembedWorker(
+                    delay=getattr(settings, "SEMANTIC_SEARCH_REEMBED_DELAY", 2.0),
+                    batch_size=getattr(settings, "SEMANTIC_SEARCH_REEMBED_BATCH_SIZE", 32),
+                    process=rebuild_many,
+                    name="semantic-profiles",
+                )
+    _worker.enqueue(user_id)
+
+
+# ==========================
+#   CONSULTA
+# ==========================
+
+class _ProfileCache:
+    """
+    Cache LRU per procés de perfils normalitzats (o None si l'usuari no en té).
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int):
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                return False, None
+            self._data.move_to_end(user_id)
+            return True, entry[1]
+
+    def put(self, user_id: int, value):
+        with self._lock:
+            self._data[user_id] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._data.pop(user_id, None)
+
+
+_cache = _ProfileCache()
+
+
+def personalization_weight() -> float:
+    return getattr(settings, "SEMANTIC_SEARCH_PERSONALIZATION_WEIGHT", 0.2)
+
+
+def get_profile(user_id: int):
+    """
+    (vector normalitzat, versió) del perfil d'un usuari, o None.
+    La versió (timestamp de l'última actualització) forma part de la clau de cache de resultats.
+    """
+    from semantic_search.models import UserProfileVector
+    from .embeddings import model_name
+
+    found, value = _cache.get(user_id)
+    if found:
+        return value
+
+    profile = UserProfileVector.objects.filter(
+        user_id=user_id, embedding_model=model_name()
+    ).first()
+    value = None
+    if profile is not None:
+        vec = profile.to_numpy()
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            value = (vec / norm, profile.updated_at.timestamp())
+    _cache.put(user_id, value)
+    return value
+
+
+def blend(query_vec, profile_vec, weight: float):
+    """
+    normalitza((1 - weight) * consulta + weight * perfil)
+    """
+    q = np.asarray(query_vec, dtype=np.float32)
+    if profile_vec is None or weight <= 0 or q.shape != profile_vec.shape:
+        return q
+    mixed = (1.0 - weight) * q + weight * profile_vec
+    norm = np.linalg.norm(mixed)
+    return mixed / norm if norm > 0 else q
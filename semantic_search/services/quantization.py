@@ -0,0 +1,54 @@
+"""
+Codificació compacta dels embeddings: float16 o int8 amb escala per vector.
+
+- float16: 2 bytes per dimensió, escala = 1.0
+- int8: 1 byte per dimensió; x ≈ codi * escala, amb escala = max|x| / 127
+"""
+import numpy as np
+
+DTYPE_FLOAT16 = "float16"
+DTYPE_INT8 = "int8"
+
+DTYPE_CHOICES = [
+    (DTYPE_FLOAT16, "float16"),
+    (DTYPE_INT8, "int8 (quantitzat)"),
+]
+
+_INT8_MAX = 127.0
+
+
+def quantize(vec, dtype: str = DTYPE_INT8) -> tuple[bytes, float]:
+    """
+    Converteix un vector float a bytes. Retorna (bytes, escala).
+    """
+    v = np.asarray(vec, dtype=np.float32)
+    if dtype == DTYPE_FLOAT16:
+        return v.astype("<f2").tobytes(), 1.0
+    if dtype == DTYPE_INT8:
+        codes, scales = quantize_rows(v.reshape(1, -1))
+        return codes[0].tobytes(), float(scales[0])
+    raise ValueError(f"Tipus d'emmagatzematge desconegut: {dtype}")
+
+
+def dequantize(data: bytes, dtype: str, scale: float = 1.0) -> np.ndarray:
+    """
+    Operació inversa de `quantize`: retorna un vector float32.
+    """
+    if dtype == DTYPE_FLOAT16:
+        return np.frombuffer(data, dtype="<f2").astype(np.float32)
+    if dtype == DTYPE_INT8:
+        return np.frombuffer(data, dtype=np.int8).astype(np.float32) * np.float32(scale)
+    raise ValueError(f"Tipus d'emmagatzematge desconegut: {dtype}")
+
+
+def quantize_rows(matrix) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Quantitza una matriu (N x D) a int8 fila a fila.
+    Retorna (codis int8 N x D, escales float32 N).
+    """
+    m = np.asarray(matrix, dtype=np.float32)
+    scales = np.abs(m).max(axis=1) / _INT8_MAX if m.size else np.zeros(m.shape[0], dtype=np.float32)
+    scales = scales.astype(np.float32)
+    safe = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    codes = np.clip(np.rint(m / safe[:, None]), -_INT8_MAX, _INT8_MAX).astype(np.int8)
+    return codes, scales
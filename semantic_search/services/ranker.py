@@ -3,7 +3,7 @@ import numpy as np
 
 def cosine_top_k(query_vec: list[float], items: list[tuple[object, list[float]]], k: int = 20):
     """
-    items: [(event_obj, embedding_list), ...]
+    items: [(event_obj, embedding_list), ...] (també accepta np.ndarray)
     Retorna [(event_obj, score), ...] ordenat desc.
     """
     if not query_vec:
@@ -15,7 +15,7 @@ def cosine_top_k(query_vec: list[float], items: list[tuple[object, list[float]]]
 
     scored = []
     for obj, emb in items:
-        if not emb:
+        if emb is None or len(emb) == 0:
             continue
         v = np.array(emb, dtype=np.float32)
         if v.shape != q.shape or np.linalg.norm(v) == 0:
@@ -25,3 +25,21 @@ def cosine_top_k(query_vec: list[float], items: list[tuple[object, list[float]]]
 
     scored.sort(key=lambda x: x[1], reverse=True)
     return scored[:k]
+
+
+def int8_scores(query_vec, codes, scales, block_rows: int = 4096) -> np.ndarray:
+    """
+    Producte escalar de la consulta contra vectors quantitzats int8.
+
+    codes: matriu int8 (N x D), pot ser un np.memmap
+    scales: escala per fila (N)
+    Es processa per blocs per no materialitzar mai la matriu sencera en float32.
+    """
+    q = np.asarray(query_vec, dtype=np.float32)
+    n = codes.shape[0]
+    out = np.empty(n, dtype=np.float32)
+    for start in range(0, n, block_rows):
+        end = min(start + block_rows, n)
+        out[start:end] = codes[start:end].astype(np.float32) @ q
+    out *= np.asarray(scales, dtype=np.float32)
+    return out
@@ -0,0 +1,159 @@
+"""
+Worker local en segon pla que re-embeddeja els Events modificats per lots.
+
+Els signals hi encuen ids d'Event; el worker espera una petita finestra
+(SEMANTIC_SEARCH_REEMBED_DELAY) per agrupar canvis, torna a llegir els
+events, descarta els que tenen el mateix hash de contingut i embeddeja la
+resta amb una sola crida a `model.encode`.
+
+La cua viu en memòria: si el procés s'atura amb feina pendent, la propera
+execució de `backfill_event_embeddings` la recupera (compara hashes).
+"""
+import logging
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ReembedWorker:
+    """
+    Cua d'ids amb un fil que els processa per lots. `process` rep la llista
+    d'ids d'un lot (per defecte `process_events`).
+    """
+
+    def __init__(self, delay: float = 2.0, batch_size: int = 32, process=None, name: str = "semantic-reembed"):
+        self.delay = delay
+        self.batch_size = batch_size
+        self.process = process or process_events
+        self.name = name
+        self._pending = {}  # dict com a conjunt ordenat d'ids
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def enqueue(self, event_id: int):
+        with self._cond:
+            self._pending[event_id] = None
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name=self.name,
+                    daemon=True,
+                )
+                self._thread.start()
+            self._cond.notify()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def _take_batch(self) -> list[int]:
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+        # Finestra d'agrupació: deixem arribar més canvis abans d'embeddejar
+        threading.Event().wait(self.delay)
+        with self._cond:
+            ids = list(self._pending)[: self.batch_size]
+            for event_id in ids:
+                del self._pending[event_id]
+        return ids
+
+    def _run(self):
+        while True:
+            ids = self._take_batch()
+            try:
+                self.process(ids)
+            except Exception:
+                logger.exception("No s'han pogut processar els events %s (%s)", ids, self.name)
+
+
+def _embed_changed(model: str, events: dict, texts: dict):
+    """
+    Embeddeja amb `model` els events el hash dels quals no coincideix amb el desat.
+    Retorna (hashes desats abans, [(event_id, text, hash)] embeddejats, vectors, desats).
+    """
+    from .embeddings import embed_texts
+    from .storage import save_embeddings, stored_hashes
+    from .vector_store import event_attrs
+
+    existing = stored_hashes(model, events.keys())
+    pending = [
+        (event_id, text, digest)
+        for event_id, (text, digest) in texts.items()
+        if existing.get(event_id) != digest
+    ]
+    if not pending:
+        return existing, [], [], 0
+
+    vecs = embed_texts([text for _, text, _ in pending], model=model)
+    saved = save_embeddings(
+        model,
+        [(event_id, vec, digest) for (event_id, _, digest), vec in zip(pending, vecs)],
+        attrs={event_id: event_attrs(events[event_id]) for event_id, _, _ in pending},
+    )
+    return existing, pending, vecs, saved
+
+
+def process_events(event_ids: list[int]) -> int:
+    """
+    Re-embeddeja (si el contingut ha canviat) els events indicats.
+    Retorna quants embeddings s'han desat per al model actiu.
+    """
+    from django.db import close_old_connections
+
+    from events.models import Event
+    from .embeddings import content_hash, event_text, model_name
+    from . import profiles, related
+    from .registry import write_models
+
+    close_old_connections()
+    events = Event.objects.in_bulk(event_ids)
+    texts = {}
+    for event_id, e in events.items():
+        text = event_text(e)
+        if text:
+            texts[event_id] = (text, content_hash(text))
+
+    # Durant una migració també s'escriu el model nou, perquè la cobertura
+    # no retrocedeixi amb els events que es creen o s'editen mentrestant
+    active = model_name()
+    for model in write_models():
+        if model != active:
+            _embed_changed(model, events, texts)
+    existing, pending, vecs, saved = _embed_changed(active, events, texts)
+    if not pending:
+        return 0
+
+    # Els veïns que depenen d'aquests vectors s'han de recalcular
+    for event_id, _, _ in pending:
+        related.enqueue(event_id)
+
+    # Primer embedding d'un event: compta com a interacció "creat" del seu creador
+    if profiles.personalization_weight() > 0:
+        for (event_id, _, _), vec in zip(pending, vecs):
+            if event_id not in existing:
+                e = events[event_id]
+                profiles.add_interaction(e.creator_id, [vec], profiles.WEIGHT_CREATED, at=e.created_at)
+    return saved
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_worker() -> ReembedWorker:
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = ReembedWorker(
+                    delay=getattr(settings, "SEMANTIC_SEARCH_REEMBED_DELAY", 2.0),
+                    batch_size=getattr(settings, "SEMANTIC_SEARCH_REEMBED_BATCH_SIZE", 32),
+                )
+    return _worker
+
+
+def enqueue(event_id: int):
+    get_worker().enqueue(event_id)
@@ -0,0 +1,230 @@
+"""
+Registre de models d'embeddings amb migració en segon pla.
+
+Cada model té els seus embeddings (`EventEmbedding.embedding_model`) i el seu
+VectorStore. Les consultes fan servir sempre el model actiu; mentre un model
+nou està "en migració":
+
+- els events nous o editats s'embeddegen amb tots dos models (`write_models`),
+- `migrate_batch` omple per lots els events que encara no tenen embedding
+  del model nou (els que en tenen són "frescos"),
+- `cutover` el fa actiu, només quan la cobertura és del 100%.
+
+L'estat es guarda a `EmbeddingModelState`; cada procés el rellegeix com a
+molt cada SEMANTIC_SEARCH_REGISTRY_REFRESH segons, de manera que tots els
+workers canvien de model sense reiniciar-se.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+
+class RegistryError(Exception):
+    """Operació no permesa sobre el registre (model desconegut, cobertura incompleta...)."""
+
+
+def default_model() -> str:
+    """
+    Model actiu quan el registre encara no té cap estat desat.
+    """
+    return getattr(settings, "SEMANTIC_SEARCH_MODEL", DEFAULT_MODEL)
+
+
+def registered_models() -> list[str]:
+    models = list(getattr(settings, "SEMANTIC_SEARCH_MODELS", None) or [])
+    if default_model() not in models:
+        models.insert(0, default_model())
+    return models
+
+
+# ==========================
+#   ESTAT (cache per procés)
+# ==========================
+
+_state = None  # (caduca, actiu, en migració)
+_state_lock = threading.Lock()
+
+
+def _load_state() -> tuple[str, str | None]:
+    from semantic_search.models import EmbeddingModelState
+
+    active, target = None, None
+    try:
+        for name, status in EmbeddingModelState.objects.exclude(
+            status=EmbeddingModelState.STATUS_RETIRED
+        ).values_list("name", "status"):
+            if status == EmbeddingModelState.STATUS_ACTIVE:
+                active = name
+            else:
+                target = name
+    except DatabaseError:
+        # Taula encara no creada (migracions pendents): model per defecte
+        logger.debug("Registre d'embeddings no disponible", exc_info=True)
+    return active or default_model(), target
+
+
+def _current() -> tuple[str, str | None]:
+    global _state
+    state = _state
+    if state is None or state[0] < time.monotonic():
+        with _state_lock:
+            state = _state
+            if state is None or state[0] < time.monotonic():
+                active, target = _load_state()
+                ttl = getattr(settings, "SEMANTIC_SEARCH_REGISTRY_REFRESH", 10)
+                state = _state = (time.monotonic() + ttl, active, target)
+    return state[1], state[2]
+
+
+def invalidate():
+    global _state
+    with _state_lock:
+        _state = None
+
+
+def active_model() -> str:
+    return _current()[0]
+
+
+def target_model() -> str | None:
+    """
+    Model en migració, o None.
+    """
+    return _current()[1]
+
+
+def write_models() -> list[str]:
+    """
+    Models on s'han d'escriure els embeddings nous: l'actiu i, si n'hi ha, el de migració.
+    """
+    active, target = _current()
+    return [active] if target is None or target == active else [active, target]
+
+
+# ==========================
+#   MIGRACIÓ
+# ==========================
+
+def start_migration(name: str):
+    """
+    Marca `name` com a model en migració (i retira qualsevol altra migració a mitges).
+    """
+    from semantic_search.models import EmbeddingModelState
+
+    if name not in registered_models():
+        raise RegistryError(f"Model no registrat a SEMANTIC_SEARCH_MODELS: {name}")
+    if name == active_model():
+        raise RegistryError(f"{name} ja és el model actiu.")
+
+    _ensure_active_row()
+    EmbeddingModelState.objects.filter(status=EmbeddingModelState.STATUS_MIGRATING).exclude(
+        name=name
+    ).update(status=EmbeddingModelState.STATUS_RETIRED)
+    state, _ = EmbeddingModelState.objects.get_or_create(name=name)
+    state.status = EmbeddingModelState.STATUS_MIGRATING
+    state.save()
+    invalidate()
+
+
+def _ensure_active_row():
+    """
+    Desa explícitament el model actiu per defecte perquè el canvi sigui reversible.
+    """
+    from semantic_search.models import EmbeddingModelState
+
+    active = active_model()
+    if not EmbeddingModelState.objects.filter(status=EmbeddingModelState.STATUS_ACTIVE).exists():
+        EmbeddingModelState.objects.update_or_create(
+            name=active,
+            defaults={"status": EmbeddingModelState.STATUS_ACTIVE, "activated_at": timezone.now()},
+        )
+
+
+def _embedded_ids(name: str) -> set[int]:
+    from semantic_search.models import EventEmbedding
+
+    return set(EventEmbedding.objects.filter(embedding_model=name).values_list("event_id", flat=True))
+
+
+def coverage(name: str) -> tuple[int, int]:
+    """
+    (events amb embedding de `name`, events totals). Desa el resultat a l'estat del model.
+    """
+    from events.models import Event
+    from semantic_search.models import EmbeddingModelState
+
+    all_ids = set(Event.objects.values_list("id", flat=True))
+    covered = len(all_ids & _embedded_ids(name))
+    EmbeddingModelState.objects.filter(name=name).update(
+        covered=covered, total=len(all_ids), updated_at=timezone.now()
+    )
+    return covered, len(all_ids)
+
+
+def pending_ids(name: str, limit: int | None = None) -> list[int]:
+    """
+    Events (per pk) que encara no tenen embedding de `name`.
+    """
+    from events.models import Event
+
+    done = _embedded_ids(name)
+    ids = [pk for pk in Event.objects.order_by("pk").values_list("id", flat=True) if pk not in done]
+    return ids[:limit] if limit else ids
+
+
+def migrate_batch(name: str, event_ids: list[int], batch_size: int = 32) -> int:
+    """
+    Embeddeja amb `name` els events indicats i els desa (amb els atributs del snapshot).
+    """
+    from events.models import Event
+    from .embeddings import content_hash, embed_texts, event_text
+    from .storage import save_embeddings
+    from .vector_store import event_attrs
+
+    events = Event.objects.only(
+        "id", "title", "description", "category", "tags", "scheduled_date", "status"
+    ).in_bulk(event_ids)
+    pending = [(e, event_text(e)) for e in events.values()]
+    pending = [(e, text) for e, text in pending if text]
+    if not pending:
+        return 0
+
+    vecs = embed_texts([text for _, text in pending], batch_size=batch_size, model=name)
+    return save_embeddings(
+        name,
+        [(e.pk, vec, content_hash(text)) for (e, text), vec in zip(pending, vecs)],
+        attrs={e.pk: event_attrs(e) for e, _ in pending},
+    )
+
+
+def cutover(name: str, force: bool = False):
+    """
+    Fa actiu `name`. Sense `force`, només si tots els events en tenen embedding.
+    L'anterior queda retirat (amb els seus embeddings, per poder tornar-hi).
+    """
+    from semantic_search.models import EmbeddingModelState
+
+    if name not in registered_models():
+        raise RegistryError(f"Model no registrat a SEMANTIC_SEARCH_MODELS: {name}")
+    covered, total = coverage(name)
+    if covered < total and not force:
+        raise RegistryError(f"Cobertura incompleta per a {name}: {covered}/{total} events.")
+
+    _ensure_active_row()
+    EmbeddingModelState.objects.filter(status=EmbeddingModelState.STATUS_ACTIVE).exclude(
+        name=name
+    ).update(status=EmbeddingModelState.STATUS_RETIRED)
+    state, _ = EmbeddingModelState.objects.get_or_create(name=name)
+    state.status = EmbeddingModelState.STATUS_ACTIVE
+    state.activated_at = timezone.now()
+    state.save()
+    invalidate()
+    logger.info("Model d'embeddings actiu: %s (%s/%s events)", name, covered, total)
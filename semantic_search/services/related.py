@@ -0,0 +1,273 @@
+"""
+"Esdeveniments relacionats": veïns més propers per embedding, precalculats.
+
+Els candidats són només els Events programats o en directe. Cada Event té un
+document RelatedEvents amb els seus RELATED_COUNT veïns (dades ja
+desnormalitzades), de manera que la pàgina de detall fa una sola lectura.
+
+- `rebuild_all`: recàlcul complet per blocs de matrius (comanda
+  `build_related_events`, després d'un backfill o periòdicament).
+- `recompute`: recàlcul incremental quan canvia el vector o l'estat d'uns
+  Events concrets; només es toquen els veïnatges afectats.
+"""
+import logging
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+RELATED_COUNT = 10
+# Estats dels Events que poden aparèixer com a relacionats
+CANDIDATE_STATUSES = ("Programat", "En Directe")
+# Events propers (de tots) que es revisen quan un candidat canvia
+PROBE_SIZE = 100
+
+
+def _payload(event, score: float) -> dict:
+    return {
+        "id": event.pk,
+        "title": event.title,
+        "scheduled_date": event.scheduled_date.isoformat() if event.scheduled_date else None,
+        "category": event.category,
+        "status": event.status,
+        "score": round(float(score), 4),
+    }
+
+
+def _save(model: str, neighbours_by_event: dict[int, list[tuple[int, float]]]):
+    """
+    Desa en bloc els veïns: {event_id: [(veí, score), ...]}.
+    """
+    from events.models import Event
+    from semantic_search.models import RelatedEvents
+
+    wanted = {n for ranked in neighbours_by_event.values() for n, _ in ranked}
+    events = Event.objects.only(
+        "id", "title", "scheduled_date", "category", "status"
+    ).in_bulk(list(wanted))
+
+    objs = []
+    for event_id, ranked in neighbours_by_event.items():
+        ranked = [(n, score) for n, score in ranked if n in events][:RELATED_COUNT]
+        objs.append(RelatedEvents(
+            event_id=event_id,
+            embedding_model=model,
+            neighbour_ids=[n for n, _ in ranked],
+            neighbours=[_payload(events[n], score) for n, score in ranked],
+            min_score=ranked[-1][1] if len(ranked) >= RELATED_COUNT else -1.0,
+        ))
+
+    RelatedEvents.objects.filter(
+        embedding_model=model, event_id__in=list(neighbours_by_event)
+    ).delete()
+    if objs:
+        RelatedEvents.objects.bulk_create(objs)
+
+
+# ==========================
+#   RECÀLCUL COMPLET
+# ==========================
+
+def rebuild_all(model: str, block_rows: int = 1024, save_batch: int = 500) -> int:
+    """
+    Recalcula els veïns de tots els Events amb embedding.
+    Retorna quants documents s'han escrit.
+    """
+    from events.models import Event
+    from .storage import iter_embeddings
+
+    candidate_ids = set(
+        Event.objects.filter(status__in=CANDIDATE_STATUSES).values_list("id", flat=True)
+    )
+
+    ids, vectors = [], []
+    for event_id, vec in iter_embeddings(model):
+        if vectors and vec.shape != vectors[0].shape:
+            continue
+        ids.append(event_id)
+        vectors.append(vec)
+    if not ids:
+        return 0
+
+    ids = np.asarray(ids, dtype=np.int64)
+    matrix = np.vstack(vectors).astype(np.float32)
+    is_candidate = np.isin(ids, list(candidate_ids))
+    cand_ids = ids[is_candidate]
+    cand_matrix = matrix[is_candidate]
+
+    written = 0
+    pending = {}
+    k = min(RELATED_COUNT, max(cand_ids.shape[0] - 1, 0))
+    for start in range(0, ids.shape[0], block_rows):
+        block_ids = ids[start:start + block_rows]
+        scores = matrix[start:start + block_rows] @ cand_matrix.T
+        # Un Event no és relacionat de si mateix
+        scores[block_ids[:, None] == cand_ids[None, :]] = -np.inf
+        for row, event_id in enumerate(block_ids):
+            if k <= 0:
+                pending[int(event_id)] = []
+                continue
+            top = np.argpartition(-scores[row], k - 1)[:k]
+            top = top[np.argsort(-scores[row][top], kind="stable")]
+            pending[int(event_id)] = [
+                (int(cand_ids[i]), float(scores[row][i]))
+                for i in top if np.isfinite(scores[row][i])
+            ]
+        if len(pending) >= save_batch:
+            _save(model, pending)
+            written += len(pending)
+            pending = {}
+
+    if pending:
+        _save(model, pending)
+        written += len(pending)
+    return written
+
+
+# ==========================
+#   RECÀLCUL INCREMENTAL
+# ==========================
+
+_index_ready = False
+
+
+def _ensure_index():
+    """
+    Índex multikey sobre neighbour_ids per trobar qui té un Event com a veí.
+    """
+    global _index_ready
+    if not _index_ready:
+        from semantic_search.models import RelatedEvents
+        RelatedEvents.objects.mongo_create_index("neighbour_ids")
+        _index_ready = True
+
+
+def affected_by(model: str, changed_ids) -> set[int]:
+    """
+    Events el veïnatge dels quals pot canviar si canvien `changed_ids`:
+    ells mateixos, els que els tenen com a veí i, per als candidats, els
+    PROBE_SIZE Events més propers en què ara entrarien al top.
+    """
+    from events.models import Event
+    from semantic_search.models import RelatedEvents
+    from .vector_store import get_store
+
+    _ensure_index()
+    changed_ids = set(changed_ids)
+    affected = set(changed_ids)
+
+    for doc in RelatedEvents.objects.mongo_find(
+        {"embedding_model": model, "neighbour_ids": {"$in": list(changed_ids)}},
+        {"event_id": 1},
+    ):
+        affected.add(doc["event_id"])
+
+    store = get_store(model)
+    candidates = Event.objects.filter(
+        pk__in=list(changed_ids), status__in=CANDIDATE_STATUSES
+    ).values_list("id", flat=True)
+    for event_id in candidates:
+        vec = store.vector_of(event_id)
+        if vec is None:
+            continue
+        probe = [(n, score) for n, score in store.search(vec, k=PROBE_SIZE) if n != event_id]
+        current = dict(RelatedEvents.objects.filter(
+            embedding_model=model, event_id__in=[n for n, _ in probe]
+        ).values_list("event_id", "min_score"))
+        for n, score in probe:
+            if n not in current or score > current[n]:
+                affected.add(n)
+    return affected
+
+
+def recompute(event_ids) -> int:
+    """
+    Recalcula els veïns afectats pels canvis d'`event_ids` amb el VectorStore.
+    Retorna quants documents s'han reescrit.
+    """
+    from django.db import close_old_connections
+
+    from semantic_search.models import RelatedEvents
+    from .embeddings import model_name
+    from .vector_store import Facets, get_store
+
+    close_old_connections()
+    model = model_name()
+    store = get_store(model)
+    if not store.available:
+        logger.info("Sense snapshot de vectors: no es recalculen els relacionats.")
+        return 0
+
+    facets = Facets(statuses=CANDIDATE_STATUSES)
+    neighbours, gone = {}, []
+    for event_id in affected_by(model, event_ids):
+        vec = store.vector_of(event_id)
+        if vec is None:
+            gone.append(event_id)
+            continue
+        ranked = store.search(vec, k=RELATED_COUNT + 1, facets=facets)
+        neighbours[event_id] = [(n, s) for n, s in ranked if n != event_id][:RELATED_COUNT]
+
+    if gone:
+        RelatedEvents.objects.filter(embedding_model=model, event_id__in=gone).delete()
+    if neighbours:
+        _save(model, neighbours)
+    return len(neighbours)
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def enqueue(event_id: int):
+    """
+    Encua el recàlcul dels veïns afectats per un Event (en segon pla, per lots).
+    """
+    global _worker
+    if not getattr(settings, "SEMANTIC_SEARCH_RELATED_AUTO", True):
+        return
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                from .reembed_queue import ReembedWorker
+                _worker = ReembedWorker(
+                    delay=getattr(settings, "SEMANTIC_SEARCH_REEMBED_DELAY", 2.0),
+                    batch_size=getattr(settings, "SEMANTIC_SEARCH_REEMBED_BATCH_SIZE", 32),
+                    process=recompute,
+                    name="semantic-related",
+                )
+    _worker.enqueue(event_id)
+
+
+# ==========================
+#   LECTURA
+# ==========================
+
+def related_for(event, limit: int = RELATED_COUNT) -> list[dict]:
+    """
+    Veïns precalculats d'un Event (una lectura indexada per (event, model)).
+    Descarta els que ja han passat encara que el recàlcul no hagi arribat.
+    """
+    from semantic_search.models import RelatedEvents
+    from .embeddings import model_name
+
+    doc = RelatedEvents.objects.filter(
+        event_id=event.pk, embedding_model=model_name()
+    ).only("neighbours").first()
+    if doc is None:
+        return []
+
+    now = timezone.now()
+    items = []
+    for item in doc.neighbours or []:
+        scheduled = parse_datetime(item["scheduled_date"]) if item.get("scheduled_date") else None
+        if item.get("status") == "Programat" and scheduled and scheduled < now:
+            continue
+        items.append({**item, "scheduled_date": scheduled})
+        if len(items) >= limit:
+            break
+    return items
@@ -0,0 +1,70 @@
+"""
+Cerca semàntica amb filtres: candidats del VectorStore (o recorregut complet
+si encara no hi ha snapshot) restringits per Facets abans de puntuar, i
+fusionats amb els resultats de l'índex BM25 (vegeu `lexical`).
+"""
+from django.conf import settings
+
+from . import lexical
+from .metrics import phase
+from .ranker import cosine_top_k
+from .storage import iter_embeddings
+from .vector_store import Facets, get_store
+
+
+def rank(
+    model: str,
+    query_vec,
+    k: int,
+    facets: Facets | None = None,
+    timer=None,
+) -> list[tuple[int, float]]:
+    """
+    Retorna [(event_id, score), ...] dels k events més similars que passen els filtres.
+    """
+    store = get_store(model)
+    if store.available:
+        return store.search(query_vec, k=k, facets=facets, timer=timer)
+
+    # Sense snapshot: els filtres es resolen a la BD i només es puntuen aquests ids
+    with phase(timer, "candidates"):
+        allowed = None
+        if facets:
+            from events.models import Event
+            allowed = set(facets.filter_queryset(Event.objects.all()).values_list("id", flat=True))
+        items = [
+            (event_id, vec) for event_id, vec in iter_embeddings(model)
+            if allowed is None or event_id in allowed
+        ]
+    with phase(timer, "scoring"):
+        return cosine_top_k(query_vec, items, k=k)
+
+
+def hybrid_rank(
+    model: str,
+    query: str,
+    query_vec,
+    k: int,
+    facets: Facets | None = None,
+    timer=None,
+) -> list[tuple[int, float]]:
+    """
+    Top-k vectorial + top-k BM25 fusionats amb reciprocal rank fusion.
+    Retorna [(event_id, score fusionat), ...]; sense índex lèxic (desactivat o
+    encara en construcció), el rànquing vectorial.
+    """
+    vector = rank(model, query_vec, k, facets, timer=timer)
+    if not lexical.lexical_enabled():
+        return vector
+
+    with phase(timer, "candidates"):
+        index = lexical.get_index()
+        if index is None:
+            return vector
+        keyword = index.search(query, k=k, facets=facets)
+    with phase(timer, "scoring"):
+        return lexical.reciprocal_rank_fusion(
+            [vector, keyword],
+            k=getattr(settings, "SEMANTIC_SEARCH_RRF_K", 60),
+            limit=k,
+        )
@@ -0,0 +1,175 @@
+"""
+Servei d'embeddings fora de procés (sidecar) sobre un socket Unix local.
+
+Un sol procés (`python manage.py run_embedding_sidecar`) carrega el model i
+atén les peticions de tots els workers de Django, que així no han de
+carregar torch ni els pesos del model.
+
+Protocol binari (little-endian), diverses peticions per connexió:
+
+    petició:   u16 len(model) + model utf-8
+               u32 n_textos, i per a cada text: u32 len + text utf-8
+    resposta:  u8 estat (0 = ok)
+               ok:    u32 n, u32 dim, n * dim float32
+               error: u32 len + missatge utf-8
+"""
+import socket
+import socketserver
+import struct
+import threading
+
+import numpy as np
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_U32x2 = struct.Struct("<II")
+
+MAX_TEXTS = 1024
+MAX_TEXT_BYTES = 64 * 1024
+
+
+class SidecarUnavailable(Exception):
+    """El sidecar no respon o ha retornat un error."""
+
+
+def is_supported() -> bool:
+    return hasattr(socket, "AF_UNIX")
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError("Connexió tancada")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def encode_request(model: str, texts: list[str]) -> bytes:
+    model_bytes = model.encode("utf-8")
+    parts = [_U16.pack(len(model_bytes)), model_bytes, _U32.pack(len(texts))]
+    for text in texts:
+        data = text.encode("utf-8")
+        parts.append(_U32.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def read_request(sock: socket.socket) -> tuple[str, list[str]]:
+    (model_len,) = _U16.unpack(_recv_exact(sock, _U16.size))
+    model = _recv_exact(sock, model_len).decode("utf-8")
+    (count,) = _U32.unpack(_recv_exact(sock, _U32.size))
+    if count > MAX_TEXTS:
+        raise ValueError("Massa textos en una petició")
+    texts = []
+    for _ in range(count):
+        (size,) = _U32.unpack(_recv_exact(sock, _U32.size))
+        if size > MAX_TEXT_BYTES:
+            raise ValueError("Text massa llarg")
+        texts.append(_recv_exact(sock, size).decode("utf-8"))
+    return model, texts
+
+
+# ==========================
+#   SERVIDOR
+# ==========================
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        sock = self.request
+        while True:
+            try:
+                model, texts = read_request(sock)
+            except (ConnectionError, OSError):
+                return
+            except ValueError as exc:
+                self._send_error(str(exc))
+                return
+
+            if model not in self.server.models:
+                self._send_error(f"Model no servit: {model}")
+                continue
+            try:
+                vecs = self.server.encode(model, texts)
+            except Exception as exc:  # l'error es retorna al client
+                self._send_error(str(exc))
+                continue
+
+            vecs = np.ascontiguousarray(vecs, dtype="<f4")
+            n, dim = (vecs.shape if vecs.ndim == 2 else (0, 0))
+            sock.sendall(_U8.pack(STATUS_OK) + _U32x2.pack(n, dim) + vecs.tobytes())
+
+    def _send_error(self, message: str):
+        data = message.encode("utf-8")
+        try:
+            self.request.sendall(_U8.pack(STATUS_ERROR) + _U32.pack(len(data)) + data)
+        except OSError:
+            pass
+
+
+class SidecarServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, models, encode):
+        """
+        models: noms dels models que es poden demanar
+        encode: funció (model, list[str]) -> matriu (N x D) float32 (en procés)
+        """
+        self.models = set(models)
+        self.encode = encode
+        super().__init__(path, _Handler)
+
+
+# ==========================
+#   CLIENT
+# ==========================
+
+class SidecarClient:
+    """
+    Client amb una connexió persistent per fil.
+    """
+
+    def __init__(self, path: str, timeout: float = 5.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _socket(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def encode(self, model: str, texts: list[str]) -> np.ndarray:
+        try:
+            sock = self._socket()
+            sock.sendall(encode_request(model, texts))
+            (status,) = _U8.unpack(_recv_exact(sock, _U8.size))
+            if status != STATUS_OK:
+                (size,) = _U32.unpack(_recv_exact(sock, _U32.size))
+                message = _recv_exact(sock, size).decode("utf-8", "replace")
+                raise SidecarUnavailable(message)
+            n, dim = _U32x2.unpack(_recv_exact(sock, _U32x2.size))
+            data = _recv_exact(sock, n * dim * 4)
+        except (OSError, ConnectionError) as exc:
+            self._close()
+            raise SidecarUnavailable(str(exc)) from exc
+        return np.frombuffer(data, dtype="<f4").reshape(n, dim).astype(np.float32)
@@ -0,0 +1,132 @@
+"""
+Lectura i escriptura dels embeddings a la col·lecció EventEmbedding.
+"""
+from django.conf import settings
+
+from events.result_cache import bump_data_version
+from semantic_search.models import EventEmbedding
+from .quantization import quantize
+from .vector_store import append_upsert
+
+
+def storage_dtype() -> str:
+    return getattr(settings, "SEMANTIC_SEARCH_STORAGE_DTYPE", "int8")
+
+
+def save_embeddings(model: str, rows, dtype: str | None = None, attrs=None) -> int:
+    """
+    Desa en bloc els embeddings d'un model.
+
+    rows: [(event_id, vector, content_hash), ...]
+    attrs: {event_id: (scheduled_date, category, status)} per als filtres del snapshot
+    Cada document és un upsert per (event, model) dins d'un sol bulk_write:
+    dos escriptors alhora no es trepitgen i l'event no es queda mai sense
+    embedding desat. Afegeix els vectors al delta log del snapshot.
+    Retorna quants n'ha desat.
+    """
+    dtype = dtype or storage_dtype()
+    objs = []
+    for event_id, vector, digest in rows:
+        if vector is None or len(vector) == 0:
+            continue
+        data, scale = quantize(vector, dtype)
+        objs.append(EventEmbedding(
+            event_id=event_id,
+            embedding_model=model,
+            dtype=dtype,
+            dim=len(vector),
+            scale=scale,
+            vector=data,
+            content_hash=digest or "",
+        ))
+    if not objs:
+        return 0
+
+    _upsert(objs)
+
+    attrs = attrs or {}
+    for event_id, vector, _ in rows:
+        if vector is not None and len(vector):
+            append_upsert(model, event_id, vector, attrs.get(event_id))
+
+    # Les escriptures directes no envien signals: els resultats de cerca en cache queden vells
+    bump_data_version()
+    return len(objs)
+
+
+def _reserve_ids(count: int) -> list:
+    """
+    Ids autoincrementals de djongo (col·lecció `__schema__`) per als documents
+    que els upserts puguin crear. Els que no es facin servir queden com a forats.
+    """
+    from pymongo import ReturnDocument
+
+    auto = EventEmbedding.objects.mongo_database["__schema__"].find_one_and_update(
+        {"name": EventEmbedding._meta.db_table, "auto": {"$exists": True}},
+        {"$inc": {"auto.seq": count}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not auto:
+        return [None] * count
+    last = auto["auto"]["seq"]
+    return list(range(last - count + 1, last + 1))
+
+
+def _upsert(objs):
+    """
+    Un UpdateOne amb upsert per (event, model). `$set` conserva l'id dels
+    documents existents; els nous el prenen de `_reserve_ids`.
+    """
+    from django.db import connections
+    from pymongo import UpdateOne
+    from pymongo.errors import BulkWriteError
+
+    connection = connections[EventEmbedding.objects.db]
+    fields = [f for f in EventEmbedding._meta.concrete_fields if not f.primary_key]
+    ops = []
+    for obj, new_id in zip(objs, _reserve_ids(len(objs))):
+        update = {"$set": {f.column: f.get_db_prep_save(f.pre_save(obj, add=True), connection) for f in fields}}
+        if new_id is not None:
+            update["$setOnInsert"] = {"id": new_id}
+        ops.append(UpdateOne({"event_id": obj.event_id, "embedding_model": obj.embedding_model}, update, upsert=True))
+    try:
+        EventEmbedding.objects.mongo_bulk_write(ops, ordered=False)
+    except BulkWriteError as exc:
+        # Dos upserts del mateix document alhora: el perdedor xoca amb l'índex
+        # únic i, reintentat, ja troba el document i l'actualitza
+        errors = exc.details.get("writeErrors", [])
+        if not errors or any(error.get("code") != 11000 for error in errors):
+            raise
+        EventEmbedding.objects.mongo_bulk_write([ops[error["index"]] for error in errors], ordered=False)
+
+
+def event_attrs_map(event_ids) -> dict[int, tuple]:
+    """
+    {event_id: (scheduled_date, category, status)} llegit en una sola consulta.
+    """
+    from events.models import Event
+
+    rows = Event.objects.filter(pk__in=list(event_ids)).values_list(
+        "id", "scheduled_date", "category", "status"
+    )
+    return {event_id: (scheduled, category, status) for event_id, scheduled, category, status in rows}
+
+
+def iter_embeddings(model: str, chunk_size: int = 2000):
+    """
+    Recorre (event_id, vector float32) de tots els embeddings d'un model.
+    """
+    qs = EventEmbedding.objects.filter(embedding_model=model).order_by()
+    for emb in qs.iterator(chunk_size=chunk_size):
+        yield emb.event_id, emb.to_numpy()
+
+
+def stored_hashes(model: str, event_ids=None) -> dict[int, str]:
+    """
+    {event_id: content_hash} dels embeddings desats per a un model
+    (opcionalment només per a `event_ids`).
+    """
+    qs = EventEmbedding.objects.filter(embedding_model=model)
+    if event_ids is not None:
+        qs = qs.filter(event_id__in=list(event_ids))
+    return dict(qs.values_list("event_id", "content_hash"))
@@ -0,0 +1,732 @@
+"""
+Snapshot en disc dels embeddings, compartit entre workers via np.memmap.
+
+Estructura del directori (un per model d'embeddings):
+
+    <SEMANTIC_SEARCH_VECTOR_DIR>/<slug del model>/
+        CURRENT            -> nom de la versió activa (p. ex. "v000003")
+        .lock              -> bloqueig entre processos per al delta i el canvi de versió
+        v000003/
+            meta.json      -> versió, model, dimensió, nombre de vectors i
+                              taules de codis de categoria i estat
+            ids.npy        -> ids d'Event (int64) ordenats ascendentment
+            vectors.npy    -> matriu float32 (N x D) alineada amb ids, o bé
+            codes.npy      -> matriu int8 (N x D) + scales.npy (escala per fila)
+            scheduled.npy  -> scheduled_date en segons Unix (int64)
+            category.npy   -> codi de categoria (uint8)
+            status.npy     -> codi d'estat (uint8)
+            delta.log      -> registres afegits des de l'última compactació
+
+Cada worker obre els .npy només lectura (mmap), de manera que les pàgines es
+comparteixen a través de la page cache del sistema operatiu. Els canvis
+recents s'afegeixen a delta.log (append-only) fins que la propera
+compactació (`build_vector_snapshot`) genera una versió nova.
+
+Les columnes d'atributs permeten aplicar filtres (data, categoria, estat)
+com a màscares booleanes abans del producte escalar.
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from events.models import CATEGORY_CHOICES, STATUS_CHOICES
+from .metrics import phase
+from .quantization import DTYPE_INT8, quantize_rows
+from .ranker import int8_scores
+
+SNAPSHOT_FORMAT = 2
+
+OP_UPSERT = 1
+OP_DELETE = 2
+OP_ATTRS = 3  # només canvien els atributs (p. ex. l'estat); el vector es manté
+
+UNKNOWN_TS = np.iinfo(np.int64).min
+UNKNOWN_CODE = 255
+
+_CURRENT = "CURRENT"
+_DELTA = "delta.log"
+_KEEP_VERSIONS = 2
+_LOCK = ".lock"
+
+_write_lock = threading.Lock()
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _root() -> Path:
+    default = Path(settings.BASE_DIR) / "var" / "vectors"
+    return Path(getattr(settings, "SEMANTIC_SEARCH_VECTOR_DIR", default))
+
+
+def model_dir(model: str) -> Path:
+    """
+    Directori del snapshot d'un model (nom del model -> slug segur per a fitxers).
+    """
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model).strip("_")
+    return _root() / slug
+
+
+def delta_dtype(dim: int) -> np.dtype:
+    """
+    Registre de mida fixa del delta log: id d'Event, operació, atributs i vector.
+    """
+    return np.dtype([
+        ("id", "<i8"),
+        ("op", "u1"),
+        ("category", "u1"),
+        ("status", "u1"),
+        ("scheduled", "<i8"),
+        ("vec", "<f4", (dim,)),
+    ])
+
+
+def event_attrs(event) -> tuple:
+    """
+    Atributs filtrables d'un Event: (scheduled_date, category, status).
+    """
+    return (event.scheduled_date, event.category, event.status)
+
+
+class _Codes:
+    """
+    Taules de codis (categoria i estat) d'una versió del snapshot.
+    """
+
+    def __init__(self, categories: list[str], statuses: list[str]):
+        self.categories = list(categories)
+        self.statuses = list(statuses)
+        self._cat = {c: i for i, c in enumerate(self.categories)}
+        self._status = {s: i for i, s in enumerate(self.statuses)}
+
+    @classmethod
+    def current(cls) -> "_Codes":
+        return cls([c for c, _ in CATEGORY_CHOICES], [s for s, _ in STATUS_CHOICES])
+
+    @classmethod
+    def from_meta(cls, meta: dict) -> "_Codes":
+        return cls(meta.get("categories", []), meta.get("statuses", []))
+
+    def category(self, value) -> int:
+        return self._cat.get(value, UNKNOWN_CODE)
+
+    def status(self, value) -> int:
+        return self._status.get(value, UNKNOWN_CODE)
+
+    def encode(self, attrs) -> tuple[int, int, int]:
+        """
+        (scheduled_date, category, status) -> (segons Unix, codi categoria, codi estat)
+        """
+        if attrs is None:
+            return UNKNOWN_TS, UNKNOWN_CODE, UNKNOWN_CODE
+        scheduled, category, status = attrs
+        ts = int(scheduled.timestamp()) if scheduled else UNKNOWN_TS
+        return ts, self.category(category), self.status(status)
+
+    def remap_to(self, other: "_Codes") -> tuple[np.ndarray, np.ndarray]:
+        """
+        Taules de traducció de codis d'aquesta versió a una altra.
+        """
+        cat = np.full(256, UNKNOWN_CODE, dtype=np.uint8)
+        for i, c in enumerate(self.categories):
+            cat[i] = other.category(c)
+        status = np.full(256, UNKNOWN_CODE, dtype=np.uint8)
+        for i, s in enumerate(self.statuses):
+            status[i] = other.status(s)
+        return cat, status
+
+
+class Facets:
+    """
+    Filtres aplicats com a màscares abans de puntuar.
+
+    - categories / statuses: conjunts de valors (p. ex. {"Gaming"})
+    - date_from / date_to: datetimes (inclusius) sobre scheduled_date
+    """
+
+    def __init__(self, categories=None, statuses=None, date_from=None, date_to=None):
+        self.categories = set(categories or [])
+        self.statuses = set(statuses or [])
+        self.date_from = date_from
+        self.date_to = date_to
+
+    def __bool__(self) -> bool:
+        return bool(self.categories or self.statuses or self.date_from or self.date_to)
+
+    def matches(self, event) -> bool:
+        """
+        Mateixos filtres aplicats a un Event ja carregat (verificació final).
+        """
+        if self.categories and event.category not in self.categories:
+            return False
+        if self.statuses and event.status not in self.statuses:
+            return False
+        if self.date_from and (not event.scheduled_date or event.scheduled_date < self.date_from):
+            return False
+        if self.date_to and (not event.scheduled_date or event.scheduled_date > self.date_to):
+            return False
+        return True
+
+    def filter_queryset(self, qs):
+        if self.categories:
+            qs = qs.filter(category__in=self.categories)
+        if self.statuses:
+            qs = qs.filter(status__in=self.statuses)
+        if self.date_from:
+            qs = qs.filter(scheduled_date__gte=self.date_from)
+        if self.date_to:
+            qs = qs.filter(scheduled_date__lte=self.date_to)
+        return qs
+
+    def mask(self, codes: _Codes, scheduled, category, status) -> np.ndarray:
+        n = scheduled.shape[0]
+        mask = np.ones(n, dtype=bool)
+        if self.categories:
+            wanted = [codes.category(c) for c in self.categories]
+            mask &= np.isin(category, wanted)
+        if self.statuses:
+            wanted = [codes.status(s) for s in self.statuses]
+            mask &= np.isin(status, wanted)
+        if self.date_from:
+            mask &= scheduled >= int(self.date_from.timestamp())
+        if self.date_to:
+            mask &= (scheduled <= int(self.date_to.timestamp())) & (scheduled != UNKNOWN_TS)
+        return mask
+
+
+def _lock_file(fh):
+    try:
+        import fcntl
+    except ImportError:  # Windows
+        import msvcrt
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+    else:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+
+
+def _unlock_file(fh):
+    try:
+        import fcntl
+    except ImportError:
+        import msvcrt
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def _store_lock(base: Path):
+    """
+    Exclusió entre fils i entre processos (workers, cua de re-embedding,
+    compactació) sobre el directori d'un model: cap registre del delta pot
+    caure a la versió antiga entre la còpia del delta i el canvi de CURRENT.
+    """
+    with _write_lock:
+        with open(base / _LOCK, "a+b") as fh:
+            _lock_file(fh)
+            try:
+                yield
+            finally:
+                _unlock_file(fh)
+
+
+def _read_current(base: Path) -> str | None:
+    try:
+        return (base / _CURRENT).read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _read_meta(version_dir: Path) -> dict:
+    return json.loads((version_dir / "meta.json").read_text(encoding="utf-8"))
+
+
+# ==========================
+#   ESCRIPTURA
+# ==========================
+
+def snapshot_dtype() -> str:
+    return getattr(settings, "SEMANTIC_SEARCH_SNAPSHOT_DTYPE", "int8")
+
+
+def delta_position(model: str) -> tuple[str | None, int]:
+    """
+    (versió activa, mida actual en bytes del seu delta log).
+    Es llegeix abans de consultar la BD per poder compactar sense perdre canvis.
+    """
+    base = model_dir(model)
+    version = _read_current(base)
+    if not version:
+        return None, 0
+    try:
+        return version, (base / version / _DELTA).stat().st_size
+    except FileNotFoundError:
+        return version, 0
+
+
+def _next_version(base: Path, current: str | None) -> str:
+    numbers = [int(p.name[1:]) for p in base.iterdir() if p.is_dir() and re.fullmatch(r"v\d{6}", p.name)]
+    if current:
+        numbers.append(int(current[1:]))
+    return f"v{max(numbers, default=0) + 1:06d}"
+
+
+def write_snapshot(
+    model: str,
+    ids,
+    vectors,
+    attrs=None,
+    carry_from: tuple[str | None, int] | None = None,
+    dtype: str | None = None,
+) -> str:
+    """
+    Escriu una versió nova del snapshot i la fa activa.
+
+    - ids: iterable d'ids d'Event
+    - vectors: matriu (N x D) amb els embeddings normalitzats
+    - attrs: llista (alineada amb ids) de (scheduled_date, category, status)
+    - carry_from: (versió, offset) del delta log abans de llegir la BD (vegeu
+      `delta_position`); None copia tot el delta de la versió activa
+    - dtype: "float32" o "int8" (per defecte SEMANTIC_SEARCH_SNAPSHOT_DTYPE)
+
+    Els registres del delta log escrits a partir de `carry_from` (és a dir,
+    mentre es llegia la BD) es copien a la versió nova abans de l'intercanvi,
+    per no perdre canvis concurrents. El número de versió i la còpia del delta
+    es decideixen dins de `_store_lock` a partir del CURRENT d'aquell moment:
+    si una altra compactació ha canviat de versió mentrestant, també se'n
+    copia el delta sencer. Retorna el nom de la versió.
+    """
+    base = model_dir(model)
+    base.mkdir(parents=True, exist_ok=True)
+    dtype = dtype or snapshot_dtype()
+    codes = _Codes.current()
+
+    ids = np.asarray(ids, dtype=np.int64)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim != 2 or vectors.shape[0] != ids.shape[0]:
+        raise ValueError("ids i vectors han de tenir el mateix nombre de files.")
+    if attrs is None:
+        attrs = [None] * ids.shape[0]
+    encoded = np.array([codes.encode(a) for a in attrs], dtype=np.int64).reshape(-1, 3)
+
+    order = np.argsort(ids, kind="stable")
+    ids = ids[order]
+    vectors = vectors[order]
+    encoded = encoded[order]
+
+    # Directori temporal únic: dues compactacions alhora no comparteixen res
+    tmp_dir = Path(tempfile.mkdtemp(prefix=".build-", dir=base))
+
+    np.save(tmp_dir / "ids.npy", ids)
+    if dtype == DTYPE_INT8:
+        q_codes, scales = quantize_rows(vectors)
+        np.save(tmp_dir / "codes.npy", q_codes)
+        np.save(tmp_dir / "scales.npy", scales)
+    else:
+        dtype = "float32"
+        np.save(tmp_dir / "vectors.npy", vectors)
+    np.save(tmp_dir / "scheduled.npy", encoded[:, 0])
+    np.save(tmp_dir / "category.npy", encoded[:, 1].astype(np.uint8))
+    np.save(tmp_dir / "status.npy", encoded[:, 2].astype(np.uint8))
+    (tmp_dir / _DELTA).touch()
+    meta = {
+        "format": SNAPSHOT_FORMAT,
+        "model": model,
+        "dim": int(vectors.shape[1]),
+        "dtype": dtype,
+        "count": int(ids.shape[0]),
+        "categories": codes.categories,
+        "statuses": codes.statuses,
+    }
+
+    with _store_lock(base):
+        previous = _read_current(base)
+        version = _next_version(base, previous)
+        meta["version"] = version
+        (tmp_dir / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp_dir, base / version)
+
+        carried, offset = carry_from or (previous, 0)
+        if carried != previous:
+            # Una altra compactació ha canviat de versió mentre es llegia la BD
+            if carried:
+                _carry_over_delta(base / carried, base / version, offset, codes)
+            offset = 0
+        if previous:
+            _carry_over_delta(base / previous, base / version, offset, codes)
+
+        current_tmp = base / f"{_CURRENT}.tmp"
+        current_tmp.write_text(version, encoding="utf-8")
+        os.replace(current_tmp, base / _CURRENT)
+
+    _prune_old_versions(base, keep=version)
+    return version
+
+
+def _carry_over_delta(old_dir: Path, new_dir: Path, offset: int, new_codes: _Codes):
+    """
+    Copia al delta nou els registres de l'antic escrits a partir d'`offset`.
+
+    Si l'id ja és al snapshot nou el registre és redundant però no incorrecte:
+    el delta sempre té prioritat i conté el valor més recent.
+    """
+    old_delta = old_dir / _DELTA
+    try:
+        old_meta = _read_meta(old_dir)
+        size = old_delta.stat().st_size
+    except (FileNotFoundError, KeyError, ValueError):
+        return
+    if old_meta.get("format") != SNAPSHOT_FORMAT:
+        return
+
+    dtype = delta_dtype(old_meta["dim"])
+    offset -= offset % dtype.itemsize
+    if size <= offset:
+        return
+    with open(old_delta, "rb") as fh:
+        fh.seek(offset)
+        data = fh.read(size - offset)
+    records = np.frombuffer(data[: len(data) - len(data) % dtype.itemsize], dtype=dtype).copy()
+    if records.size == 0:
+        return
+
+    # Els codis es tradueixen per si han canviat les choices entre versions
+    cat_map, status_map = _Codes.from_meta(old_meta).remap_to(new_codes)
+    records["category"] = cat_map[records["category"]]
+    records["status"] = status_map[records["status"]]
+
+    with open(new_dir / _DELTA, "ab") as fh:
+        fh.write(records.tobytes())
+
+
+def _prune_old_versions(base: Path, keep: str):
+    versions = sorted(p for p in base.iterdir() if p.is_dir() and re.fullmatch(r"v\d{6}", p.name))
+    for old in versions[:-_KEEP_VERSIONS]:
+        if old.name == keep:
+            continue
+        # En Windows un worker encara pot tenir el fitxer mapat: ho ignorem
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def _append_record(model: str, event_id: int, op: int, vector=None, attrs=None) -> bool:
+    base = model_dir(model)
+    if not base.is_dir():
+        return False
+    with _store_lock(base):
+        version = _read_current(base)
+        if not version:
+            return False
+        version_dir = base / version
+        meta = _read_meta(version_dir)
+        if meta.get("format") != SNAPSHOT_FORMAT:
+            return False
+        dim = meta["dim"]
+
+        record = np.zeros(1, dtype=delta_dtype(dim))
+        record["id"] = event_id
+        record["op"] = op
+        ts, category, status = _Codes.from_meta(meta).encode(attrs)
+        record["scheduled"] = ts
+        record["category"] = category
+        record["status"] = status
+        if vector is not None:
+            vec = np.asarray(vector, dtype=np.float32)
+            if vec.shape != (dim,):
+                return False
+            record["vec"] = vec
+
+        # Una sola escriptura en mode append per registre
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0)
+        fd = os.open(version_dir / _DELTA, flags)
+        try:
+            os.write(fd, record.tobytes())
+        finally:
+            os.close(fd)
+    return True
+
+
+def append_upsert(model: str, event_id: int, vector, attrs=None) -> bool:
+    """
+    Afegeix (o substitueix) el vector d'un Event al delta log del model.
+    attrs: (scheduled_date, category, status), vegeu `event_attrs`.
+    Retorna False si encara no hi ha cap snapshot per aquest model.
+    """
+    return _append_record(model, event_id, OP_UPSERT, vector, attrs)
+
+
+def append_attrs(model: str, event_id: int, attrs) -> bool:
+    """
+    Actualitza només els atributs filtrables d'un Event (sense tornar a embeddejar).
+    """
+    return _append_record(model, event_id, OP_ATTRS, attrs=attrs)
+
+
+def append_delete(model: str, event_id: int) -> bool:
+    """
+    Marca un Event com a eliminat al delta log del model.
+    """
+    return _append_record(model, event_id, OP_DELETE)
+
+
+# ==========================
+#   LECTURA
+# ==========================
+
+class VectorStore:
+    """
+    Vista de només lectura del snapshot actiu d'un model + delta log.
+
+    Es recarrega sola quan canvia CURRENT (nova compactació) i llegeix de
+    manera incremental els registres nous del delta log.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self.base = model_dir(model)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.version = None
+        self.dim = 0
+        self.codes = _Codes.current()
+        self.ids = np.empty(0, dtype=np.int64)
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+        self.scales = None
+        self.scheduled = np.empty(0, dtype=np.int64)
+        self.category = np.empty(0, dtype=np.uint8)
+        self.status = np.empty(0, dtype=np.uint8)
+        self._attrs_copied = False
+        self._hidden = np.empty(0, dtype=bool)
+        self._delta_offset = 0
+        # event_id -> (vector, scheduled, category, status)
+        self._delta = {}
+
+    @property
+    def available(self) -> bool:
+        self.refresh()
+        return self.version is not None
+
+    def refresh(self):
+        with self._lock:
+            version = _read_current(self.base)
+            if version != self.version:
+                self._load(version)
+            if self.version is not None:
+                self._read_delta()
+
+    def _load(self, version: str | None):
+        self._reset()
+        if not version:
+            return
+        version_dir = self.base / version
+        try:
+            meta = _read_meta(version_dir)
+            if meta.get("format") != SNAPSHOT_FORMAT:
+                # Snapshot antic: cal tornar a executar build_vector_snapshot
+                return
+            ids = np.load(version_dir / "ids.npy", mmap_mode="r")
+            if meta.get("dtype") == DTYPE_INT8:
+                vectors = np.load(version_dir / "codes.npy", mmap_mode="r")
+                scales = np.load(version_dir / "scales.npy", mmap_mode="r")
+            else:
+                vectors = np.load(version_dir / "vectors.npy", mmap_mode="r")
+                scales = None
+            scheduled = np.load(version_dir / "scheduled.npy", mmap_mode="r")
+            category = np.load(version_dir / "category.npy", mmap_mode="r")
+            status = np.load(version_dir / "status.npy", mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return
+        self.version = version
+        self.dim = int(meta["dim"])
+        self.codes = _Codes.from_meta(meta)
+        self.ids = ids
+        self.vectors = vectors
+        self.scales = scales
+        self.scheduled = scheduled
+        self.category = category
+        self.status = status
+        self._hidden = np.zeros(ids.shape[0], dtype=bool)
+
+    def _read_delta(self):
+        path = self.base / self.version / _DELTA
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            return
+        dtype = delta_dtype(self.dim)
+        # Només registres complets
+        end = size - (size % dtype.itemsize)
+        if end <= self._delta_offset:
+            return
+
+        with open(path, "rb") as fh:
+            fh.seek(self._delta_offset)
+            records = np.frombuffer(fh.read(end - self._delta_offset), dtype=dtype)
+        self._delta_offset = end
+
+        for rec in records:
+            self._apply(rec)
+
+    def _apply(self, rec):
+        event_id = int(rec["id"])
+        attrs = (int(rec["scheduled"]), int(rec["category"]), int(rec["status"]))
+        row = self._row_of(event_id)
+
+        if rec["op"] == OP_ATTRS:
+            if event_id in self._delta:
+                self._delta[event_id] = (self._delta[event_id][0],) + attrs
+            elif row is not None and not self._hidden[row]:
+                self._set_base_attrs(row, attrs)
+            return
+
+        if row is not None:
+            self._hidden[row] = True
+        if rec["op"] == OP_UPSERT:
+            self._delta[event_id] = (np.array(rec["vec"], dtype=np.float32),) + attrs
+        else:
+            self._delta.pop(event_id, None)
+
+    def _set_base_attrs(self, row: int, attrs):
+        # Còpia en escriptura: les columnes mapades són només lectura
+        if not self._attrs_copied:
+            self.scheduled = np.array(self.scheduled)
+            self.category = np.array(self.category)
+            self.status = np.array(self.status)
+            self._attrs_copied = True
+        self.scheduled[row], self.category[row], self.status[row] = attrs
+
+    def _row_of(self, event_id: int) -> int | None:
+        row = int(np.searchsorted(self.ids, event_id))
+        if row < self.ids.shape[0] and self.ids[row] == event_id:
+            return row
+        return None
+
+    def vector_of(self, event_id: int):
+        """
+        Vector (float32) d'un Event, o None si no és al snapshot ni al delta.
+        """
+        self.refresh()
+        with self._lock:
+            entry = self._delta.get(event_id)
+            if entry is not None:
+                return entry[0]
+            row = self._row_of(event_id)
+            if row is None or self._hidden[row]:
+                return None
+            vec = np.asarray(self.vectors[row], dtype=np.float32)
+            if self.scales is not None:
+                vec = vec * np.float32(self.scales[row])
+            return vec
+
+    def __len__(self) -> int:
+        return int(self.ids.shape[0] - self._hidden.sum()) + len(self._delta)
+
+    def search(
+        self,
+        query_vec,
+        k: int = 20,
+        facets: Facets | None = None,
+        timer=None,
+    ) -> list[tuple[int, float]]:
+        """
+        Retorna [(event_id, score), ...] ordenat desc per similitud cosinus.
+        Amb `facets`, només es puntuen les files que passen els filtres.
+        timer: PhaseTimer opcional (fases "candidates" i "scoring").
+        """
+        with phase(timer, "candidates"):
+            self.refresh()
+            if self.version is None or k <= 0:
+                return []
+
+            q = np.asarray(query_vec, dtype=np.float32)
+            if q.shape != (self.dim,) or not np.any(q):
+                return []
+
+            with self._lock:
+                codes = self.codes
+                ids, vectors, scales = self.ids, self.vectors, self.scales
+                scheduled, category, status = self.scheduled, self.category, self.status
+                hidden = self._hidden.copy() if self._hidden.any() else None
+                delta = dict(self._delta)
+
+            mask = None if hidden is None else ~hidden
+            if facets:
+                facet_mask = facets.mask(codes, scheduled, category, status)
+                mask = facet_mask if mask is None else (mask & facet_mask)
+
+            delta_keep = None
+            if delta and facets:
+                entries = list(delta.values())
+                delta_keep = facets.mask(
+                    codes,
+                    np.array([e[1] for e in entries], dtype=np.int64),
+                    np.array([e[2] for e in entries], dtype=np.uint8),
+                    np.array([e[3] for e in entries], dtype=np.uint8),
+                )
+
+        with phase(timer, "scoring"):
+            if mask is None:
+                scores = self._score(q, vectors, scales)
+            elif mask.sum() * 2 < mask.shape[0]:
+                # Filtre selectiu: només es llegeixen i puntuen les files que passen
+                rows = np.flatnonzero(mask)
+                ids = ids[rows]
+                scores = self._score(
+                    q, vectors[rows], None if scales is None else scales[rows]
+                )
+            else:
+                scores = np.where(mask, self._score(q, vectors, scales), -np.inf).astype(np.float32)
+
+            if delta:
+                delta_ids = np.fromiter(delta.keys(), dtype=np.int64, count=len(delta))
+                delta_scores = (np.stack([e[0] for e in delta.values()]) @ q).astype(np.float32)
+                if delta_keep is not None:
+                    delta_scores = np.where(delta_keep, delta_scores, -np.inf).astype(np.float32)
+                ids = np.concatenate([ids, delta_ids])
+                scores = np.concatenate([scores, delta_scores])
+
+            return _top_k(ids, scores, k)
+
+    @staticmethod
+    def _score(q, vectors, scales) -> np.ndarray:
+        if scales is not None:
+            return int8_scores(q, vectors, scales)
+        return np.asarray(vectors @ q, dtype=np.float32)
+
+
+def _top_k(ids: np.ndarray, scores: np.ndarray, k: int) -> list[tuple[int, float]]:
+    valid = np.isfinite(scores)
+    if not valid.all():
+        ids, scores = ids[valid], scores[valid]
+    if scores.shape[0] == 0:
+        return []
+    if scores.shape[0] > k:
+        part = np.argpartition(-scores, k - 1)[:k]
+    else:
+        part = np.arange(scores.shape[0])
+    order = part[np.argsort(-scores[part], kind="stable")]
+    return [(int(ids[i]), float(scores[i])) for i in order]
+
+
+def get_store(model: str) -> VectorStore:
+    """
+    Instància compartida (per procés) del VectorStore d'un model.
+    """
+    store = _stores.get(model)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(model)
+            if store is None:
+                store = VectorStore(model)
+                _stores[model] = store
+    return store
@@ -0,0 +1,148 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from chat.models import ChatMessage
+from events.models import Event
+from users.models import Follow
+from .services import lexical, profiles, related
+from .services.embeddings import content_hash, event_text, model_name
+from .services.reembed_queue import enqueue
+from .services.registry import write_models
+from .services.storage import stored_hashes
+from .services.vector_store import append_attrs, append_delete, event_attrs, get_store
+
+# Camps que formen el text embeddejat (vegeu `event_text`)
+CONTENT_FIELDS = {"title", "description", "category", "tags"}
+# Camps filtrables del snapshot (vegeu `event_attrs`)
+ATTR_FIELDS = {"scheduled_date", "category", "status"}
+
+
+@receiver(post_save, sender=Event)
+def reembed_on_change(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """
+    Encua el re-embedding d'un Event només si el seu contingut ha canviat.
+
+    Els saves amb update_fields que no toquen el contingut (p. ex. els canvis
+    d'estat d'`auto_update_statuses` o el re-desat del thumbnail) no fan cap
+    consulta ni inferència.
+    """
+    if raw or not getattr(settings, "SEMANTIC_SEARCH_AUTO_REEMBED", True):
+        return
+    if update_fields is not None and not CONTENT_FIELDS.intersection(update_fields):
+        return
+
+    text = event_text(instance)
+    if not text:
+        return
+    if not created:
+        stored = stored_hashes(model_name(), [instance.pk]).get(instance.pk)
+        if stored == content_hash(text):
+            return
+
+    event_id = instance.pk
+    transaction.on_commit(lambda: enqueue(event_id))
+
+
+@receiver(post_save, sender=Event)
+def sync_vector_attrs(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """
+    Actualitza els atributs filtrables (data, categoria, estat) del snapshot.
+
+    No hi ha inferència: només s'afegeix un registre al delta log, de manera
+    que els canvis d'estat es reflecteixen als filtres immediatament. Com que
+    l'estat decideix qui pot ser "relacionat", també s'encua el recàlcul dels
+    veïnatges afectats.
+    """
+    if raw or created:
+        return
+    if update_fields is not None and not ATTR_FIELDS.intersection(update_fields):
+        return
+
+    event_id = instance.pk
+    attrs = event_attrs(instance)
+
+    def apply():
+        for model in write_models():
+            append_attrs(model, event_id, attrs)
+        related.enqueue(event_id)
+
+    transaction.on_commit(apply)
+
+
+@receiver(post_save, sender=Event)
+def sync_lexical_index(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """
+    Manté l'índex BM25 d'aquest procés (els altres workers se sincronitzen
+    per `updated_at`, vegeu `LexicalIndex.sync`).
+    """
+    if raw:
+        return
+    if update_fields is None or lexical.FIELD_WEIGHTS.keys() & set(update_fields):
+        transaction.on_commit(lambda: lexical.update_event(instance))
+    elif ATTR_FIELDS.intersection(update_fields):
+        transaction.on_commit(lambda: lexical.update_event_attrs(instance))
+
+
+@receiver(post_delete, sender=Event)
+def drop_vector_on_delete(sender, instance, **kwargs):
+    """
+    Treu l'Event eliminat del snapshot (delta log) fins a la propera compactació.
+    """
+    for model in write_models():
+        append_delete(model, instance.pk)
+    lexical.remove_event(instance.pk)
+    related.enqueue(instance.pk)
+
+
+# ==========================
+#   PERFILS D'USUARI
+# ==========================
+
+@receiver(post_save, sender=ChatMessage)
+def profile_on_chat(sender, instance, created, raw=False, **kwargs):
+    """
+    Escriure al xat d'un event acosta el perfil de l'usuari a aquest event.
+    """
+    if raw or not created or profiles.personalization_weight() <= 0:
+        return
+    user_id, event_id = instance.user_id, instance.event_id
+
+    def apply():
+        vec = get_store(model_name()).vector_of(event_id)
+        profiles.add_interaction(user_id, [vec], profiles.WEIGHT_CHAT)
+
+    transaction.on_commit(apply)
+
+
+@receiver(post_save, sender=Follow)
+def profile_on_follow(sender, instance, created, raw=False, **kwargs):
+    """
+    Seguir un creador suma al perfil la mitjana dels seus events recents.
+    """
+    if raw or not created or profiles.personalization_weight() <= 0:
+        return
+    follower_id, following_id = instance.follower_id, instance.following_id
+
+    def apply():
+        store = get_store(model_name())
+        event_ids = Event.objects.filter(creator_id=following_id).order_by(
+            "-created_at"
+        ).values_list("id", flat=True)[:profiles.FOLLOW_SAMPLE]
+        profiles.add_interaction(
+            follower_id, [store.vector_of(event_id) for event_id in event_ids], profiles.WEIGHT_FOLLOW
+        )
+
+    transaction.on_commit(apply)
+
+
+@receiver(post_delete, sender=Follow)
+def profile_on_unfollow(sender, instance, **kwargs):
+    """
+    Deixar de seguir no es pot desfer de manera incremental: es reconstrueix el perfil.
+    """
+    if profiles.personalization_weight() <= 0:
+        return
+    follower_id = instance.follower_id
+    transaction.on_commit(lambda: profiles.enqueue_rebuild(follower_id))
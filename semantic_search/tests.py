@@ -1,3 +1,220 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
 
-# Create your tests here.
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from semantic_search.services import profiles, vector_store
+from semantic_search.services.lexical import LexicalIndex, reciprocal_rank_fusion, tokenize
+from semantic_search.services.vector_store import Facets, VectorStore
+
+
+MODEL = "test-model"
+
+
+def _unit(*values):
+    vec = np.array(values, dtype=np.float32)
+    return vec / np.linalg.norm(vec)
+
+
+# ==========================
+#   VECTOR STORE
+# ==========================
+
+class VectorStoreTests(SimpleTestCase):
+    """
+    Snapshot + delta log en un directori temporal (sense BD).
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.override = override_settings(SEMANTIC_SEARCH_VECTOR_DIR=self.tmp)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _snapshot(self, dtype="float32", carry_from=None):
+        ids = [3, 1, 2]
+        vectors = np.stack([_unit(0, 0, 1), _unit(1, 0, 0), _unit(0, 1, 0)])
+        return vector_store.write_snapshot(MODEL, ids, vectors, carry_from=carry_from, dtype=dtype)
+
+    def test_search_returns_nearest_first(self):
+        self._snapshot()
+        store = VectorStore(MODEL)
+        results = store.search(_unit(1, 0.1, 0), k=2)
+        self.assertEqual([event_id for event_id, _ in results], [1, 2])
+        self.assertEqual(len(store), 3)
+
+    def test_int8_snapshot_keeps_order(self):
+        self._snapshot(dtype="int8")
+        store = VectorStore(MODEL)
+        self.assertEqual(store.search(_unit(0, 0, 1), k=1)[0][0], 3)
+
+    def test_append_without_snapshot_is_ignored(self):
+        self.assertFalse(vector_store.append_upsert(MODEL, 1, _unit(1, 0, 0)))
+
+    def test_delta_upsert_replaces_snapshot_vector(self):
+        self._snapshot()
+        store = VectorStore(MODEL)
+        self.assertTrue(vector_store.append_upsert(MODEL, 1, _unit(0, 0, 1)))
+        self.assertTrue(vector_store.append_upsert(MODEL, 7, _unit(0, 1, 0)))
+
+        ranked = [event_id for event_id, _ in store.search(_unit(0, 0, 1), k=2)]
+        self.assertCountEqual(ranked, [1, 3])
+        np.testing.assert_allclose(store.vector_of(1), _unit(0, 0, 1), atol=1e-6)
+        self.assertEqual(len(store), 4)
+
+    def test_delta_delete_hides_event(self):
+        self._snapshot()
+        store = VectorStore(MODEL)
+        self.assertTrue(vector_store.append_delete(MODEL, 1))
+
+        self.assertNotIn(1, [event_id for event_id, _ in store.search(_unit(1, 0, 0), k=3)])
+        self.assertIsNone(store.vector_of(1))
+        self.assertEqual(len(store), 2)
+
+    def test_compaction_carries_over_concurrent_delta(self):
+        self._snapshot()
+        vector_store.append_upsert(MODEL, 8, _unit(1, 1, 0))
+        # Els registres escrits mentre es llegeix la BD passen a la versió nova
+        position = vector_store.delta_position(MODEL)
+        vector_store.append_upsert(MODEL, 9, _unit(1, 0, 1))
+        vector_store.append_delete(MODEL, 2)
+
+        version = self._snapshot(carry_from=position)
+        store = VectorStore(MODEL)
+        store.refresh()
+        self.assertEqual(store.version, version)
+        self.assertIsNotNone(store.vector_of(9))
+        self.assertIsNone(store.vector_of(8))
+        self.assertIsNone(store.vector_of(2))
+
+    def test_overlapping_compactions(self):
+        self._snapshot()
+        # La primera compactació llegeix la posició i, mentre llegeix la BD,
+        # una altra fa una versió nova
+        position = vector_store.delta_position(MODEL)
+        vector_store.append_upsert(MODEL, 8, _unit(1, 1, 0))
+        other = self._snapshot(carry_from=vector_store.delta_position(MODEL))
+        vector_store.append_upsert(MODEL, 9, _unit(1, 0, 1))
+
+        version = self._snapshot(carry_from=position)
+        self.assertNotEqual(version, other)
+        store = VectorStore(MODEL)
+        store.refresh()
+        self.assertEqual(store.version, version)
+        self.assertIsNotNone(store.vector_of(8))
+        self.assertIsNotNone(store.vector_of(9))
+
+    def test_store_follows_new_version(self):
+        self._snapshot()
+        store = VectorStore(MODEL)
+        store.refresh()
+        first = store.version
+        vector_store.write_snapshot(MODEL, [5], _unit(1, 0, 0).reshape(1, -1), dtype="float32")
+        self.assertEqual([event_id for event_id, _ in store.search(_unit(1, 0, 0), k=5)], [5])
+        self.assertNotEqual(store.version, first)
+
+
+# ==========================
+#   ÍNDEX LÈXIC
+# ==========================
+
+class _Doc:
+    def __init__(self, pk, title="", description="", tags="", category="Gaming", status="Programat"):
+        self.pk = pk
+        self.title = title
+        self.description = description
+        self.tags = tags
+        self.category = category
+        self.status = status
+        self.scheduled_date = None
+
+
+class LexicalIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = LexicalIndex()
+        self.index.add(_Doc(1, title="Torneig de Minecraft", description="Construccions en directe"))
+        self.index.add(_Doc(2, title="Xerrada", description="Parlem de Minecraft i d'altres jocs"))
+        self.index.add(_Doc(3, title="Concert acústic", tags="música, cançó", category="Música"))
+
+    def test_tokenize_strips_accents_and_symbols(self):
+        self.assertEqual(tokenize("@Ibai_Llanos"), ["ibai", "llanos"])
+        self.assertEqual(tokenize("Cançó"), ["canco"])
+
+    def test_title_outweighs_description(self):
+        results = self.index.search("minecraft")
+        self.assertEqual([event_id for event_id, _ in results], [1, 2])
+        self.assertGreater(results[0][1], results[1][1])
+
+    def test_accent_insensitive_match_on_tags(self):
+        self.assertEqual([event_id for event_id, _ in self.index.search("canco")], [3])
+
+    def test_remove_and_reindex(self):
+        self.index.remove(1)
+        self.assertEqual([event_id for event_id, _ in self.index.search("minecraft")], [2])
+        self.index.add(_Doc(2, title="Xerrada sobre Roblox"))
+        self.assertEqual(self.index.search("minecraft"), [])
+        self.assertEqual(len(self.index), 2)
+
+    def test_facets_filter_results(self):
+        facets = Facets(categories=["Música"])
+        self.assertEqual(self.index.search("minecraft", facets=facets), [])
+        self.assertEqual([event_id for event_id, _ in self.index.search("concert", facets=facets)], [3])
+
+
+class ReciprocalRankFusionTests(SimpleTestCase):
+    def test_shared_results_rank_first(self):
+        vector = [(1, 0.9), (2, 0.8), (3, 0.7)]
+        keyword = [(3, 12.0), (4, 8.0)]
+        fused = reciprocal_rank_fusion([vector, keyword], k=60, limit=10)
+        self.assertEqual(fused[0][0], 3)
+        self.assertAlmostEqual(fused[0][1], 1 / 63 + 1 / 61)
+        self.assertEqual({event_id for event_id, _ in fused}, {1, 2, 3, 4})
+
+    def test_ignores_score_scale_and_respects_limit(self):
+        fused = reciprocal_rank_fusion([[(5, 1000.0), (6, 0.1)]], limit=1)
+        self.assertEqual(fused, [(5, 1 / 61)])
+
+
+# ==========================
+#   PERFILS
+# ==========================
+
+class ProfileTests(SimpleTestCase):
+    def test_blend_moves_query_towards_profile(self):
+        q = _unit(1, 0, 0)
+        mixed = profiles.blend(q, _unit(0, 1, 0), 0.2)
+        self.assertAlmostEqual(float(np.linalg.norm(mixed)), 1.0, places=6)
+        self.assertGreater(mixed[1], 0)
+        self.assertGreater(mixed[0], mixed[1])
+
+    def test_blend_without_profile_or_weight_returns_query(self):
+        q = _unit(1, 0, 0)
+        np.testing.assert_array_equal(profiles.blend(q, None, 0.2), q)
+        np.testing.assert_array_equal(profiles.blend(q, _unit(0, 1, 0), 0), q)
+        np.testing.assert_array_equal(profiles.blend(q, _unit(0, 1), 0.2), q)
+
+    @override_settings(SEMANTIC_SEARCH_PROFILE_HALF_LIFE_DAYS=30)
+    def test_decay_halves_every_half_life(self):
+        now = datetime(2024, 1, 31, tzinfo=dt_timezone.utc)
+        self.assertAlmostEqual(profiles._decay(now - timedelta(days=30), now), 0.5)
+        self.assertEqual(profiles._decay(now, now - timedelta(days=1)), 1.0)
+
+    def test_profile_cache_expires_and_evicts(self):
+        cache = profiles._ProfileCache(maxsize=2, ttl=60)
+        cache.put(1, None)
+        self.assertEqual(cache.get(1), (True, None))
+        cache.put(2, "b")
+        cache.put(3, "c")
+        self.assertEqual(cache.get(1), (False, None))
+        cache.invalidate(3)
+        self.assertEqual(cache.get(3), (False, None))
+
+        expired = profiles._ProfileCache(ttl=-1)
+        expired.put(1, "a")
+        self.assertEqual(expired.get(1), (False, None))
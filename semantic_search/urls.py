@@ -1,8 +1,10 @@
 from django.urls import path
-from .views import semantic_search
+from .views import search_metrics, semantic_search, semantic_search_api
 
 app_name = "semantic_search"
 
 urlpatterns = [
     path("semantic/", semantic_search, name="semantic"),
+    path("semantic/api/", semantic_search_api, name="semantic_api"),
+    path("semantic/metrics/", search_metrics, name="metrics"),
 ]
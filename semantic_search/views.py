@@ -1,36 +1,220 @@
+from django.conf import settings
+from django.core import signing
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
 from django.shortcuts import render
-from django.utils import timezone
 
 from events.models import Event
+from events.result_cache import get_or_compute
+from .forms import SemanticSearchForm
+from .services import metrics, profiles
 from .services.embeddings import embed_text, model_name
-from .services.ranker import cosine_top_k
+from .services.metrics import PhaseTimer, phase
+from .services.search import hybrid_rank
 
+MAX_RESULTS = 20
+# Els filtres ja s'apliquen abans de puntuar; el marge només cobreix
+# atributs que hagin canviat després de l'última actualització del snapshot
+FACET_OVERFETCH = 2
+
+# API JSON: profunditat del rànquing que es pot paginar i mida de pàgina
+API_MAX_DEPTH = 200
+API_DEFAULT_LIMIT = 20
+API_MAX_LIMIT = 50
+_CURSOR_SALT = "semantic_search.api.cursor"
 
-def semantic_search(request):
-    q = (request.GET.get("q") or "").strip()
 
-    # Checkbox: si ve future=0 -> "not future", però el document el fa servir com "només futurs".
-    # Implementació coherent amb el template del document:
-    only_future = (request.GET.get("future", "1") == "0")
+def _hydrate(ranked, facets, limit=MAX_RESULTS):
+    """
+    Converteix [(event_id, score)] en [(Event, score)] amb una sola consulta.
+    """
+    events = Event.objects.in_bulk([event_id for event_id, _ in ranked])
 
     results = []
-    if q:
-        q_vec = embed_text(q)
+    for event_id, score in ranked:
+        e = events.get(event_id)
+        if e is None:
+            continue
+        if facets and not facets.matches(e):
+            continue
+        results.append((e, score))
+        if len(results) >= limit:
+            break
+    return results
+
+
+def _ranked(form, q, k, user=None, timer=None):
+    """
+    Rànquing [(event_id, score)] de la consulta, compartit via la cache de resultats.
+    Per a usuaris amb perfil, el vector de la consulta es combina amb el perfil.
+    """
+    facets = form.facets()
+    # El mateix model per a la consulta i per al VectorStore, encara que el
+    # registre canviï de model actiu mentre es calcula
+    model = model_name()
+    profile = None
+    weight = profiles.personalization_weight()
+    if user is not None and user.is_authenticated and weight > 0:
+        with phase(timer, "personalization"):
+            profile = profiles.get_profile(user.pk)
+    params = {
+        "q": q,
+        "k": k,
+        "model": model,
+        "category": form.cleaned_data.get("category"),
+        "status": form.cleaned_data.get("status"),
+        "date_from": form.cleaned_data.get("date_from"),
+        "date_to": form.cleaned_data.get("date_to"),
+        "future": form.only_future,
+        # Els rànquings personalitzats només es comparteixen per (usuari, versió del perfil)
+        "profile": (user.pk, profile[1]) if profile else None,
+    }
+
+    computed = False
+
+    def compute():
+        nonlocal computed
+        computed = True
+        with phase(timer, "embed"):
+            q_vec = embed_text(q, model=model)
+        if profile is not None:
+            with phase(timer, "personalization"):
+                q_vec = profiles.blend(q_vec, profile[0], weight)
+        return hybrid_rank(model, q, q_vec, k, facets, timer=timer)
+
+    ranked = get_or_compute("semantic_search", params, compute)
+    if timer is not None and not computed:
+        # Encert de cache: cap fase de càlcul
+        timer.add("cache", 0.0)
+    return ranked, facets
 
-        qs = Event.objects.all()
-        if only_future:
-            qs = qs.filter(scheduled_date__gte=timezone.now())
 
-        items = []
-        for e in qs:
-            items.append((e, getattr(e, "embedding", None)))
+def semantic_search(request):
+    form = SemanticSearchForm(request.GET or None)
 
-        results = cosine_top_k(q_vec, items, k=20)
+    q = ""
+    only_future = False
+    results = []
+    if form.is_valid():
+        q = (form.cleaned_data.get("q") or "").strip()
+        only_future = form.only_future
+
+    if q:
+        has_facets = bool(form.facets())
+        k = MAX_RESULTS * FACET_OVERFETCH if has_facets else MAX_RESULTS
+        # El rànquing (ids + scores) es comparteix; la hidratació és per petició
+        ranked, facets = _ranked(form, q, k, user=request.user)
+        results = _hydrate(ranked, facets)
 
     context = {
+        "form": form,
         "query": q,
         "results": results,  # [(Event, score)]
         "only_future": only_future,
         "embedding_model": model_name(),
     }
     return render(request, "semantic_search/search.html", context)
+
+
+# ==========================
+#   API JSON
+# ==========================
+
+def _json_error(message: str, *, status: int = 400) -> JsonResponse:
+    return JsonResponse({"success": False, "error": message}, status=status)
+
+
+def _parse_paging(request, q):
+    """
+    (offset, limit) a partir de ?cursor= (opac, signat) o ?offset= i ?limit=.
+    """
+    try:
+        limit = int(request.GET.get("limit") or API_DEFAULT_LIMIT)
+    except ValueError:
+        raise ValueError("El paràmetre 'limit' ha de ser un enter.")
+    limit = max(1, min(limit, API_MAX_LIMIT))
+
+    cursor = request.GET.get("cursor")
+    if cursor:
+        try:
+            data = signing.loads(cursor, salt=_CURSOR_SALT)
+        except signing.BadSignature:
+            raise ValueError("Cursor invàlid.")
+        if data.get("q") != q:
+            raise ValueError("El cursor no correspon a aquesta consulta.")
+        return int(data["o"]), limit
+
+    try:
+        offset = int(request.GET.get("offset") or 0)
+    except ValueError:
+        raise ValueError("El paràmetre 'offset' ha de ser un enter.")
+    return max(0, offset), limit
+
+
+def _serialize_result(event, score) -> dict:
+    return {
+        "id": event.pk,
+        "title": event.title,
+        "url": event.get_absolute_url(),
+        "category": event.category,
+        "status": event.status,
+        "scheduled_date": event.scheduled_date.isoformat() if event.scheduled_date else None,
+        "score": round(float(score), 4),
+    }
+
+
+def semantic_search_api(request):
+    """
+    Cerca semàntica en JSON, paginada sobre el rànquing (fins a API_MAX_DEPTH).
+
+    Paràmetres: q, category, status, date_from, date_to, future=0 (només futurs),
+    limit, i offset o cursor. La capçalera Server-Timing desglossa el temps en
+    embed, candidates, scoring i hydration.
+    """
+    timer = PhaseTimer()
+    form = SemanticSearchForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({"success": False, "errors": form.errors}, status=400)
+
+    q = (form.cleaned_data.get("q") or "").strip()
+    if not q:
+        return _json_error("Falta el paràmetre 'q'.")
+    try:
+        offset, limit = _parse_paging(request, q)
+    except ValueError as exc:
+        return _json_error(str(exc))
+
+    ranked, facets = _ranked(form, q, API_MAX_DEPTH, user=request.user, timer=timer)
+    page = ranked[offset:offset + limit]
+    with timer.phase("hydration"):
+        results = _hydrate(page, facets, limit=limit)
+
+    next_offset = offset + limit if offset + limit < len(ranked) else None
+    payload = {
+        "success": True,
+        "query": q,
+        "embedding_model": model_name(),
+        "offset": offset,
+        "limit": limit,
+        "total_ranked": len(ranked),
+        "results": [_serialize_result(e, score) for e, score in results],
+        "next_offset": next_offset,
+        "next_cursor": (
+            signing.dumps({"q": q, "o": next_offset}, salt=_CURSOR_SALT)
+            if next_offset is not None else None
+        ),
+    }
+
+    durations = timer.finish()
+    metrics.observe(durations)
+    response = JsonResponse(payload)
+    response["Server-Timing"] = timer.server_timing()
+    return response
+
+
+def search_metrics(request):
+    """
+    Histogrames de temps per fase (format Prometheus). Només per a INTERNAL_IPS.
+    """
+    if request.META.get("REMOTE_ADDR") not in getattr(settings, "INTERNAL_IPS", []):
+        return HttpResponseForbidden("Accés restringit.")
+    return HttpResponse(metrics.render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
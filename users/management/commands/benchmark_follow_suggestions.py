@@ -0,0 +1,91 @@
+import json
+import time
+import tracemalloc
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from events.models import CATEGORY_CHOICES
+from users.suggestions import FollowGraph, MemoryBudgetError, memory_budget_mb
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesura la construcció del graf de seguiments i el càlcul de suggeriments "
+        "sobre un graf sintètic (sense BD), amb el pressupost de memòria per blocs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100_000)
+        parser.add_argument("--edges", type=int, default=2_000_000)
+        parser.add_argument("--memory-mb", type=int, default=None, help="Pressupost total: graf + blocs (per defecte FOLLOW_SUGGESTIONS_MEMORY_MB)")
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=20_000,
+            help="Files a puntuar (0 = totes); el temps total s'extrapola",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        n, m = options["users"], options["edges"]
+        memory_mb = options["memory_mb"] or memory_budget_mb()
+        rng = np.random.default_rng(options["seed"])
+
+        # Graf amb popularitat molt desigual (pocs creadors amb molts seguidors)
+        src = rng.integers(0, n, m, dtype=np.int32)
+        dst = np.minimum((n * rng.random(m, dtype=np.float32) ** 3).astype(np.int32), n - 1)
+        creators = rng.random(n) < 0.1
+        categories = np.zeros((n, len(CATEGORY_CHOICES)), dtype=np.float32)
+        categories[creators, rng.integers(0, len(CATEGORY_CHOICES), creators.sum())] = rng.integers(
+            1, 10, creators.sum()
+        )
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        graph = FollowGraph(n, src, dst, categories)
+        build_seconds = time.perf_counter() - started
+        _, build_peak = tracemalloc.get_traced_memory()
+        del src, dst
+        tracemalloc.reset_peak()
+
+        rows_limit = options["rows"] or n
+        scored = 0
+        block_peaks = []
+        started = time.perf_counter()
+        peak = 0
+        try:
+            for start, end in graph.blocks(memory_mb):
+                end = min(end, start + rows_limit - scored)
+                tracemalloc.reset_peak()
+                base, _ = tracemalloc.get_traced_memory()
+                graph.suggest_block(start, end, memory_mb=memory_mb)
+                _, block_peak = tracemalloc.get_traced_memory()
+                block_peaks.append(block_peak - base)
+                peak = max(peak, block_peak)
+                scored += end - start
+                if scored >= rows_limit:
+                    break
+        except MemoryBudgetError as exc:
+            raise CommandError(str(exc))
+        score_seconds = time.perf_counter() - started
+        tracemalloc.stop()
+
+        report = {
+            "users": n,
+            "edges": graph.edges,
+            "graph_mb": round(graph.memory_bytes() / 1e6, 1),
+            "build_seconds": round(build_seconds, 3),
+            "build_peak_mb": round(build_peak / 1e6, 1),
+            "memory_budget_mb": memory_mb,
+            "blocks": len(block_peaks),
+            "block_peak_mb_max": round(max(block_peaks) / 1e6, 1) if block_peaks else 0,
+            # Pic total del càlcul (graf + bloc), comparable amb el pressupost
+            "peak_mb": round(peak / 1e6, 1),
+            "within_budget": max(build_peak, peak) <= memory_mb * 1024 * 1024,
+            "rows_scored": scored,
+            "score_seconds": round(score_seconds, 3),
+            "rows_per_second": round(scored / score_seconds, 1) if score_seconds else None,
+            "estimated_total_seconds": round(n * score_seconds / scored, 1) if scored else None,
+        }
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,33 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from users import stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula les estadístiques de perfil (seguidors, seguits, events per estat) "
+        "i corregeix les que no coincideixen. Millor en hores tranquil·les: un $inc "
+        "concurrent entre el recompte i l'escriptura es perdria."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", action="append", type=int, default=[], help="Només aquest usuari (repetible)")
+        parser.add_argument("--dry-run", action="store_true", help="Només mostra les diferències, sense desar-les")
+
+    def handle(self, *args, **options):
+        user_ids = options["user"] or list(get_user_model().objects.values_list("pk", flat=True))
+        started = time.monotonic()
+        fixed = 0
+        for user_id in user_ids:
+            drift = stats.reconcile(user_id, dry_run=options["dry_run"])
+            if drift:
+                fixed += 1
+                for field, (stored, real) in drift.items():
+                    self.stdout.write(f"  usuari {user_id}: {field} {stored} -> {real}")
+        verb = "amb diferències" if options["dry_run"] else "corregits"
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(user_ids)} usuaris revisats, {fixed} {verb} en {time.monotonic() - started:.1f}s."
+        ))
@@ -0,0 +1,25 @@
+# Generated by Django 4.1.13 on 2026-10-19 22:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import djongo.models.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_delete_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('followers', models.IntegerField(default=0)),
+                ('following', models.IntegerField(default=0)),
+                ('events_by_status', djongo.models.fields.JSONField(default=dict)),
+            ],
+        ),
+    ]
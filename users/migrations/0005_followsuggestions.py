@@ -0,0 +1,24 @@
+# Generated by Django 4.1.13 on 2026-10-19 23:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import djongo.models.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_profilestats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowSuggestions',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='follow_suggestions', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('suggestions', djongo.models.fields.JSONField(default=list)),
+                ('computed_at', models.FloatField(blank=True, null=True)),
+            ],
+        ),
+    ]
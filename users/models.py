@@ -32,3 +32,46 @@ class Follow(models.Model):
 
     def __str__(self):
         return f'{self.follower} -> {self.following}'
+
+
+class ProfileStats(models.Model):
+    """
+    Comptadors desnormalitzats del perfil (vegeu `users.stats`): seguidors,
+    seguits i events per estat. Es mantenen amb `$inc` atòmics als signals
+    de Follow i Event, i `reconcile_profile_stats` els recalcula.
+    La clau primària és l'usuari perquè els upserts no necessitin cap id.
+    """
+    user = models.OneToOneField(
+        'CustomUser',
+        primary_key=True,
+        related_name='stats',
+        on_delete=models.CASCADE
+    )
+    followers = models.IntegerField(default=0)
+    following = models.IntegerField(default=0)
+    events_by_status = models.JSONField(default=dict)  # {estat: nombre}
+
+    objects = models.DjongoManager()
+
+    def __str__(self):
+        return f'Estadístiques de {self.user_id}'
+
+
+class FollowSuggestions(models.Model):
+    """
+    "A qui seguir" precalculat (vegeu `users.suggestions`): llista ordenada de
+    {"user_id", "score", "reason", "mutual"} i quan s'ha calculat (timestamp).
+    """
+    user = models.OneToOneField(
+        'CustomUser',
+        primary_key=True,
+        related_name='follow_suggestions',
+        on_delete=models.CASCADE
+    )
+    suggestions = models.JSONField(default=list)
+    computed_at = models.FloatField(null=True, blank=True)
+
+    objects = models.DjongoManager()
+
+    def __str__(self):
+        return f'Suggeriments de {self.user_id}'
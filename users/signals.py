@@ -0,0 +1,30 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import stats
+from .models import CustomUser, Follow
+
+
+# ==========================
+#   ESTADÍSTIQUES DE PERFIL
+# ==========================
+
+@receiver(post_save, sender=Follow)
+def stats_on_follow(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    follower_id, following_id = instance.follower_id, instance.following_id
+    transaction.on_commit(lambda: stats.follow_changed(follower_id, following_id, 1))
+
+
+@receiver(post_delete, sender=Follow)
+def stats_on_unfollow(sender, instance, **kwargs):
+    follower_id, following_id = instance.follower_id, instance.following_id
+    transaction.on_commit(lambda: stats.follow_changed(follower_id, following_id, -1))
+
+
+@receiver(post_delete, sender=CustomUser)
+def stats_on_user_delete(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: stats.user_deleted(user_id))
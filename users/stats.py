@@ -0,0 +1,143 @@
+"""
+Estadístiques de perfil desnormalitzades (`ProfileStats`).
+
+Amb djongo, cada `count()` sobre Follow o Event és una agregació completa.
+En lloc d'això, cada usuari té un document amb els comptadors ja fets:
+
+- followers / following: +1 / -1 en crear o esborrar un Follow,
+- events_by_status: +1 / -1 per estat en crear, esborrar o canviar
+  d'estat un Event.
+
+Tot són `$inc` atòmics, així que no cal llegir res per escriure. Només fan
+upsert (el document es crea sol el primer cop) els increments positius: un
+decrement arriba després d'esborrar (un Follow, un Event o l'usuari sencer) i
+no ha de recrear el document d'un usuari que ja no existeix. Llegir les estadístiques d'un perfil
+és una sola consulta per clau. `reconcile` les recalcula des de zero.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _inc(ops: dict):
+    """
+    {user_id: {camp: delta}} en un sol bulk_write. Si algun delta és negatiu
+    l'operació no fa upsert (sense document no hi ha res a decrementar).
+    """
+    from pymongo import UpdateOne
+
+    from .models import ProfileStats
+
+    requests = [
+        UpdateOne({"user_id": user_id}, {"$inc": fields}, upsert=all(d > 0 for d in fields.values()))
+        for user_id, fields in ops.items() if fields
+    ]
+    if requests:
+        ProfileStats.objects.mongo_bulk_write(requests, ordered=False)
+
+
+def _status_field(status: str) -> str:
+    return f"events_by_status.{status}"
+
+
+# ==========================
+#   ESCRIPTURA (des dels signals)
+# ==========================
+
+def follow_changed(follower_id: int, following_id: int, delta: int):
+    _inc({
+        follower_id: {"following": delta},
+        following_id: {"followers": delta},
+    })
+
+
+def event_created(creator_id: int, status: str):
+    _inc({creator_id: {_status_field(status): 1}})
+
+
+def event_deleted(creator_id: int, status: str):
+    _inc({creator_id: {_status_field(status): -1}})
+
+
+def event_status_changed(creator_id: int, old: str, new: str):
+    if old == new:
+        return
+    _inc({creator_id: {_status_field(old): -1, _status_field(new): 1}})
+
+
+# ==========================
+#   LECTURA
+# ==========================
+
+def get_stats(user_id: int) -> dict:
+    """
+    {"followers", "following", "events": {estat: n}, "events_total"} d'un usuari
+    (una sola lectura per clau; zeros si encara no té document).
+    """
+    from .models import ProfileStats
+
+    doc = ProfileStats.objects.mongo_find_one({"user_id": user_id}) or {}
+    events = {status: count for status, count in (doc.get("events_by_status") or {}).items() if count}
+    return {
+        "followers": doc.get("followers") or 0,
+        "following": doc.get("following") or 0,
+        "events": events,
+        "events_total": sum(events.values()),
+    }
+
+
+def followers_count(user_id: int) -> int:
+    return get_stats(user_id)["followers"]
+
+
+def user_deleted(user_id: int):
+    """
+    Esborra el document d'un usuari eliminat (per si algun `$inc` posterior
+    a la cascada l'hagués tornat a crear).
+    """
+    from .models import ProfileStats
+
+    ProfileStats.objects.mongo_delete_one({"user_id": user_id})
+
+
+# ==========================
+#   RECONCILIACIÓ
+# ==========================
+
+def compute(user_id: int) -> dict:
+    """
+    Valors reals (amb consultes de recompte), per comparar o corregir.
+    """
+    from collections import Counter
+
+    from events.models import Event
+
+    from .models import Follow
+
+    by_status = Counter(Event.objects.filter(creator_id=user_id).values_list("status", flat=True))
+    return {
+        "followers": Follow.objects.filter(following_id=user_id).count(),
+        "following": Follow.objects.filter(follower_id=user_id).count(),
+        "events_by_status": dict(by_status),
+    }
+
+
+def reconcile(user_id: int, dry_run: bool = False) -> dict:
+    """
+    Recalcula les estadístiques d'un usuari i les desa si no coincideixen.
+    Retorna {camp: (desat, real)} de les diferències trobades.
+    """
+    from .models import ProfileStats
+
+    real = compute(user_id)
+    doc = ProfileStats.objects.mongo_find_one({"user_id": user_id}) or {}
+    stored = {
+        "followers": doc.get("followers") or 0,
+        "following": doc.get("following") or 0,
+        "events_by_status": {k: v for k, v in (doc.get("events_by_status") or {}).items() if v},
+    }
+    drift = {field: (stored[field], real[field]) for field in real if stored[field] != real[field]}
+    if drift and not dry_run:
+        ProfileStats.objects.mongo_update_one({"user_id": user_id}, {"$set": real}, upsert=True)
+        logger.info("Estadístiques de l'usuari %s corregides: %s", user_id, drift)
+    return drift
@@ -0,0 +1,561 @@
+"""
+"A qui seguir": suggeriments de creadors calculats per lots amb matrius disperses.
+
+El graf de seguiments és una matriu d'adjacència A (N x N, CSR): A[u, v] = 1
+si u segueix v. Per a cada usuari u es combinen tres senyals:
+
+- amics d'amics: (A @ A)[u, w] = quants dels que segueix u segueixen w,
+- co-seguiment: usuaris semblants a u (S = A' @ A.T, comparteixen seguits; A'
+  sense els creadors massa populars i ponderada per IDF), dels quals es
+  queden els FOLLOW_SUGGESTIONS_SIMILAR més semblants, i llavors S @ A,
+- afinitat de categoria: gustos de u (categories dels events dels creadors que
+  segueix, P = A @ Q) per la distribució de categories de w (Q[w]).
+
+Els dos primers es normalitzen pel màxim de cada fila abans de ponderar-los
+(FOLLOW_SUGGESTIONS_WEIGHTS). Es descarta u mateix i els que ja segueix, i es
+guarden els FOLLOW_SUGGESTIONS_COUNT millors (`FollowSuggestions`).
+
+Memòria: de A només es guarda el patró (índexs int32, sense valors ni A.T),
+que compta dins de FOLLOW_SUGGESTIONS_MEMORY_MB; els productes es fan per
+blocs de files amb el que en queda, de mida adaptativa segons una cota dels
+valors no nuls que generarà cada fila. Si el graf sol no hi cap, el càlcul
+s'atura amb MemoryBudgetError en lloc de continuar fora del pressupost.
+"""
+import logging
+import time
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Bytes per valor no nul en els productes (índex + valor + temporals de scipy)
+BYTES_PER_NNZ = 24
+# Arestes per tros en els recorreguts sencers de A
+EDGE_CHUNK = 1_000_000
+
+DEFAULT_WEIGHTS = {"fof": 1.0, "cofollow": 1.0, "category": 0.5}
+
+
+def suggestions_count() -> int:
+    return getattr(settings, "FOLLOW_SUGGESTIONS_COUNT", 20)
+
+
+def memory_budget_mb() -> int:
+    return getattr(settings, "FOLLOW_SUGGESTIONS_MEMORY_MB", 512)
+
+
+def _weights() -> dict:
+    return {**DEFAULT_WEIGHTS, **getattr(settings, "FOLLOW_SUGGESTIONS_WEIGHTS", {})}
+
+
+class MemoryBudgetError(Exception):
+    """El graf carregat no cap dins de FOLLOW_SUGGESTIONS_MEMORY_MB."""
+
+
+class FollowGraph:
+    """
+    Graf de seguiments amb índexs contigus 0..n-1 i les matrius del càlcul.
+
+    `src`, `dst`: arestes (u segueix v) ja en índexs. `categories`: matriu
+    n x K amb el nombre d'events de cada usuari per categoria (o None).
+
+    De A només es guarda el patró CSR (`indptr`, `indices`): tots els valors
+    serien 1. Els productes amb A expandeixen files (`_expand`) i el
+    co-seguiment recorre A per a cada bloc (`_cofollow`), sense cap còpia de A.T.
+    """
+
+    def __init__(self, n: int, src: np.ndarray, dst: np.ndarray, categories: np.ndarray | None = None):
+        from scipy import sparse
+
+        self.n = n
+        # Les dades (int8) només serveixen per ordenar i treure duplicats
+        A = sparse.coo_matrix((np.ones(len(src), dtype=np.int8), (src, dst)), shape=(n, n)).tocsr()
+        A.sum_duplicates()
+        self.indptr, self.indices = A.indptr, A.indices
+        del A
+
+        self.outdeg = np.diff(self.indptr).astype(np.float32)
+        # Per trossos: bincount passa els índexs a int64 (una còpia de tot A)
+        indeg = np.zeros(n, dtype=np.int64)
+        for lo in range(0, len(self.indices), EDGE_CHUNK):
+            indeg += np.bincount(self.indices[lo:lo + EDGE_CHUNK], minlength=n)
+        self.indeg = indeg.astype(np.float32)
+
+        # Co-seguiment: els creadors massa populars no diuen res de la semblança
+        cap = getattr(settings, "FOLLOW_SUGGESTIONS_POPULAR_CAP", 10000)
+        idf = np.log((n + 1) / (self.indeg + 1)).astype(np.float32)
+        self.cofollow_weight = np.where(self.indeg <= cap, idf, 0.0).astype(np.float32)
+
+        # Afinitat de categoria: Q (creadors), files de norma 1; els gustos (P)
+        # es calculen per bloc
+        if categories is not None and categories.size:
+            self.Q = _normalize_rows(categories.astype(np.float32))
+        else:
+            self.Q = None
+
+        # Popularitat per als usuaris sense cap senyal (no segueixen ningú)
+        popular = np.argsort(-self.indeg, kind="stable")[: 4 * suggestions_count()]
+        self.popular = popular[self.indeg[popular] > 0]
+
+    @property
+    def edges(self) -> int:
+        return len(self.indices)
+
+    def memory_bytes(self) -> int:
+        """
+        Memòria que el graf ocupa durant tot el càlcul (patró de A i vectors per usuari).
+        """
+        arrays = (self.indptr, self.indices, self.Q, self.outdeg, self.indeg, self.cofollow_weight, self.popular)
+        return sum(arr.nbytes for arr in arrays if arr is not None)
+
+    def entry_budget(self, memory_mb: int | None = None) -> float:
+        """
+        Valors no nuls que caben als productes d'un bloc: el pressupost menys el graf.
+        """
+        total = (memory_mb or memory_budget_mb()) * 1024 * 1024
+        resident = self.memory_bytes()
+        if resident >= total:
+            raise MemoryBudgetError(
+                f"El graf de seguiments ({resident / 2**20:.1f} MB) no cap al pressupost "
+                f"de {total / 2**20:.1f} MB (FOLLOW_SUGGESTIONS_MEMORY_MB)."
+            )
+        return (total - resident) / BYTES_PER_NNZ
+
+    # ---------- Recorreguts de A ----------
+
+    def _row_chunks(self, edges: int = EDGE_CHUNK):
+        """
+        Rangs de files (inici, final) amb com a molt `edges` arestes (o una sola fila).
+        """
+        start = 0
+        while start < self.n:
+            end = int(np.searchsorted(self.indptr, self.indptr[start] + edges, side="right")) - 1
+            end = min(max(end, start + 1), self.n)
+            yield start, end
+            start = end
+
+    def _row_sums(self, values: np.ndarray) -> np.ndarray:
+        """
+        A @ values (suma dels valors dels seguits de cada fila), per trossos d'arestes.
+        """
+        out = np.zeros(self.n, dtype=np.float64)
+        for start, end in self._row_chunks():
+            lo, hi = self.indptr[start], self.indptr[end]
+            rows = np.repeat(np.arange(end - start), np.diff(self.indptr[start:end + 1]))
+            out[start:end] = np.bincount(rows, weights=values[self.indices[lo:hi]], minlength=end - start)
+        return out
+
+    def _block(self, start: int, end: int):
+        """
+        Files [start, end) de A com a matriu float32 (amb els uns explícits).
+        """
+        from scipy import sparse
+
+        lo, hi = self.indptr[start], self.indptr[end]
+        return sparse.csr_matrix(
+            (np.ones(hi - lo, dtype=np.float32), self.indices[lo:hi], self.indptr[start:end + 1] - lo),
+            shape=(end - start, self.n),
+        )
+
+    def _expand(self, block, limit: float):
+        """
+        block @ A sense valors de A: cada valor no nul (i, v, x) de `block` suma x
+        a totes les columnes de la fila v de A. Es fa per trossos de files de com
+        a molt `limit` entrades abans de sumar duplicats.
+        """
+        from scipy import sparse
+
+        deg = np.diff(self.indptr)
+        sizes = deg[block.indices]
+        cumulative = np.concatenate(([0], np.cumsum(sizes)))[block.indptr]
+        parts = []
+        start = 0
+        rows = block.shape[0]
+        while start < rows:
+            end = int(np.searchsorted(cumulative, cumulative[start] + limit, side="right")) - 1
+            end = min(max(end, start + 1), rows)
+            lo, hi = block.indptr[start], block.indptr[end]
+            followed, lens = block.indices[lo:hi], sizes[lo:hi]
+            offsets = np.cumsum(lens) - lens
+            positions = np.arange(int(lens.sum()), dtype=np.int64)
+            positions += np.repeat(self.indptr[followed] - offsets, lens)
+            part = sparse.csr_matrix(
+                (
+                    np.repeat(block.data[lo:hi].astype(np.float32), lens),
+                    self.indices[positions],
+                    cumulative[start:end + 1] - cumulative[start],
+                ),
+                shape=(end - start, self.n),
+            )
+            del positions
+            part.sum_duplicates()
+            parts.append(part)
+            start = end
+        if len(parts) == 1:
+            return parts[0]
+        return sparse.vstack(parts, format="csr")
+
+    def _cofollow(self, start: int, end: int):
+        """
+        S = A' @ A.T de les files [start, end) (A' = A amb els pesos de
+        co-seguiment). Recorre A per trossos: cada aresta w -> v amb v seguit
+        pel bloc suma pes(v) a (u, w) per a cada u del bloc que segueix v.
+        """
+        from scipy import sparse
+
+        rows = end - start
+        lo, hi = self.indptr[start], self.indptr[end]
+        cols = self.indices[lo:hi]
+        owners = np.repeat(np.arange(rows, dtype=np.int32), np.diff(self.indptr[start:end + 1]))
+        weights = self.cofollow_weight[cols]
+        keep = weights > 0
+        order = np.argsort(cols[keep], kind="stable")
+        cols, owners, weights = cols[keep][order], owners[keep][order], weights[keep][order]
+        # Transposada del bloc: seguit -> usuaris del bloc que el segueixen
+        followed, first, counts = np.unique(cols, return_index=True, return_counts=True)
+        slot = np.full(self.n, -1, dtype=np.int32)
+        slot[followed] = np.arange(len(followed), dtype=np.int32)
+
+        total = int(np.dot(self.indeg[followed].astype(np.int64), counts))
+        u = np.empty(total, dtype=np.int32)
+        w = np.empty(total, dtype=np.int32)
+        x = np.empty(total, dtype=np.float32)
+        filled = 0
+        for r0, r1 in self._row_chunks():
+            e0, e1 = self.indptr[r0], self.indptr[r1]
+            hit = slot[self.indices[e0:e1]]
+            edges = np.flatnonzero(hit >= 0)
+            if not len(edges):
+                continue
+            hit = hit[edges]
+            followers = np.searchsorted(self.indptr, e0 + edges, side="right") - 1
+            lens = counts[hit]
+            size = int(lens.sum())
+            positions = np.arange(size, dtype=np.int64)
+            positions += np.repeat(first[hit] - (np.cumsum(lens) - lens), lens)
+            u[filled:filled + size] = owners[positions]
+            w[filled:filled + size] = np.repeat(followers, lens)
+            x[filled:filled + size] = weights[positions]
+            filled += size
+        return sparse.coo_matrix((x, (u, w)), shape=(rows, self.n)).tocsr()
+
+    # ---------- Blocs ----------
+
+    def blocks(self, memory_mb: int | None = None):
+        """
+        Rangs de files (inici, final) la cota de valors no nuls dels quals cap al
+        pressupost, descomptant-ne el que ja ocupa el graf (MemoryBudgetError si
+        el graf sol no hi cap).
+        """
+        budget = self.entry_budget(memory_mb)
+        # Cota per fila: suma de sortides dels seguits (A @ A) + suma de
+        # seguidors dels seguits no populars (A' @ A.T)
+        cost = self._row_sums(self.outdeg)
+        cost += self._row_sums(np.where(self.cofollow_weight > 0, self.indeg, 0.0))
+        cost += 1.0
+        cumulative = np.cumsum(cost)
+        start = 0
+        while start < self.n:
+            base = cumulative[start - 1] if start else 0.0
+            end = int(np.searchsorted(cumulative, base + budget, side="right"))
+            end = max(end, start + 1)  # una fila sola sempre hi cap
+            yield start, min(end, self.n)
+            start = end
+
+    def _similar(self, S, start: int, k: int):
+        """
+        Usuaris més semblants a cada fila del bloc (top-k de S, sense un mateix).
+        """
+        from scipy import sparse
+
+        indptr = [0]
+        indices = []
+        data = []
+        for i in range(S.shape[0]):
+            lo, hi = S.indptr[i], S.indptr[i + 1]
+            cols, vals = S.indices[lo:hi], S.data[lo:hi]
+            keep = cols != start + i
+            cols, vals = cols[keep], vals[keep]
+            if len(vals) > k:
+                top = np.argpartition(-vals, k)[:k]
+                cols, vals = cols[top], vals[top]
+            indices.append(cols)
+            data.append(vals)
+            indptr.append(indptr[-1] + len(cols))
+        return sparse.csr_matrix(
+            (
+                np.concatenate(data) if data else np.empty(0, np.float32),
+                np.concatenate(indices) if indices else np.empty(0, np.int32),
+                np.array(indptr),
+            ),
+            shape=S.shape,
+        )
+
+    def suggest_block(
+        self,
+        start: int,
+        end: int,
+        top_n: int | None = None,
+        similar: int | None = None,
+        memory_mb: int | None = None,
+    ):
+        """
+        Suggeriments de les files [start, end): llista de (fila, [(columna, puntuació, motiu, mutus)]).
+        """
+        top_n = top_n or suggestions_count()
+        similar = similar or getattr(settings, "FOLLOW_SUGGESTIONS_SIMILAR", 50)
+        weights = _weights()
+        limit = self.entry_budget(memory_mb)
+
+        from scipy import sparse
+
+        A_b = self._block(start, end)
+        rows = end - start
+        fof = self._expand(A_b, limit)
+        S = self._cofollow(start, end)
+        nearest = self._similar(S, start, similar)
+        del S
+        cofollow = self._expand(nearest, limit)
+        fof_scaled = _scale_rows(fof, weights["fof"])
+        cofollow_scaled = _scale_rows(cofollow, weights["cofollow"])
+
+        # Puntuació combinada, sense un mateix ni els que ja segueix
+        own = sparse.csr_matrix(
+            (np.ones(rows, dtype=np.float32), (np.arange(rows), np.arange(start, end))),
+            shape=(rows, self.n),
+        )
+        excluded = (A_b + own).tocsr()
+        excluded.data[:] = 1.0
+        total = (fof_scaled + cofollow_scaled).tocsr()
+        total = (total - total.multiply(excluded)).tocsr()
+        total.eliminate_zeros()
+        total.sort_indices()
+
+        category = np.zeros(total.nnz, dtype=np.float32)
+        if self.Q is not None and total.nnz:
+            P_b = _normalize_rows(np.asarray(A_b @ self.Q, dtype=np.float32))
+            row_of = np.repeat(np.arange(rows), np.diff(total.indptr))
+            # Per trossos: nnz x K de cop no cabria al pressupost
+            for lo in range(0, total.nnz, 1_000_000):
+                hi = lo + 1_000_000
+                category[lo:hi] = weights["category"] * np.einsum(
+                    "ij,ij->i", self.Q[total.indices[lo:hi]], P_b[row_of[lo:hi]]
+                )
+            total.data += category
+
+        results = []
+        for i in range(rows):
+            lo, hi = total.indptr[i], total.indptr[i + 1]
+            u = start + i
+            if hi == lo:
+                followed = A_b.indices[A_b.indptr[i]:A_b.indptr[i + 1]]
+                results.append((u, self._popular(u, followed, top_n)))
+                continue
+            cols, vals = total.indices[lo:hi], total.data[lo:hi]
+            n = min(top_n, len(vals))
+            top = np.argpartition(-vals, n - 1)[:n]
+            top = top[np.argsort(-vals[top], kind="stable")]
+            parts = np.vstack([
+                _row_values(fof_scaled, i, cols[top]),
+                _row_values(cofollow_scaled, i, cols[top]),
+                category[lo:hi][top],
+            ])
+            reasons = np.argmax(parts, axis=0)
+            mutual = _row_values(fof, i, cols[top])
+            results.append((u, [
+                (int(c), round(float(v), 4), REASONS[int(r)], int(m))
+                for c, v, r, m in zip(cols[top], vals[top], reasons, mutual)
+            ]))
+        return results
+
+    def _popular(self, u, followed, top_n):
+        """
+        Sense cap senyal (no segueix ningú, o només gent sense seguits): els més seguits.
+        """
+        cols = self.popular[(self.popular != u) & ~np.isin(self.popular, followed)][:top_n]
+        return [(int(c), 0.0, "popular", 0) for c in cols]
+
+
+REASONS = ("fof", "cofollow", "category")
+REASON_LABELS = {
+    "fof": "El segueix gent que segueixes",
+    "cofollow": "Seguit per usuaris amb gustos semblants",
+    "category": "Fa esdeveniments de les categories que mires",
+    "popular": "Popular a StreamEvents",
+}
+
+
+def _scale_rows(matrix, weight: float):
+    """
+    Cada fila dividida pel seu màxim i multiplicada per `weight`.
+    """
+    from scipy import sparse
+
+    matrix.sort_indices()
+    maxima = matrix.max(axis=1).toarray().ravel()
+    maxima[maxima == 0] = 1.0
+    scaled = (sparse.diags((weight / maxima).astype(np.float32)) @ matrix).tocsr()
+    scaled.sort_indices()
+    return scaled
+
+
+def _row_values(matrix, row: int, cols: np.ndarray) -> np.ndarray:
+    """
+    Valors de `matrix[row, cols]` (índexs de la fila ordenats); 0 si no hi són.
+    """
+    lo, hi = matrix.indptr[row], matrix.indptr[row + 1]
+    indices, data = matrix.indices[lo:hi], matrix.data[lo:hi]
+    out = np.zeros(len(cols), dtype=np.float32)
+    if hi == lo:
+        return out
+    pos = np.minimum(np.searchsorted(indices, cols), len(indices) - 1)
+    hit = indices[pos] == cols
+    out[hit] = data[pos[hit]]
+    return out
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+# ==========================
+#   CÀRREGA DES DE LA BD
+# ==========================
+
+def load_graph(chunk_size: int = 100_000):
+    """
+    (ids d'usuari ordenats, FollowGraph). Les arestes es llegeixen per trossos
+    i es converteixen directament a índexs int32, sense tuples de Python
+    de tot el graf a memòria.
+    """
+    from django.contrib.auth import get_user_model
+
+    from events.models import CATEGORY_CHOICES, Event
+
+    from .models import Follow
+
+    user_ids = np.fromiter(
+        get_user_model().objects.order_by("pk").values_list("pk", flat=True).iterator(chunk_size=chunk_size),
+        dtype=np.int64,
+    )
+    n = len(user_ids)
+
+    total = Follow.objects.count()
+    src = np.empty(total, dtype=np.int32)
+    dst = np.empty(total, dtype=np.int32)
+    filled = 0
+    buffer = []
+
+    def flush():
+        nonlocal filled, buffer
+        if not buffer:
+            return
+        pairs = np.array(buffer, dtype=np.int64)
+        size = min(len(pairs), total - filled)
+        src[filled:filled + size] = np.searchsorted(user_ids, pairs[:size, 0])
+        dst[filled:filled + size] = np.searchsorted(user_ids, pairs[:size, 1])
+        filled += size
+        buffer = []
+
+    for pair in Follow.objects.values_list("follower_id", "following_id").iterator(chunk_size=chunk_size):
+        buffer.append(pair)
+        if len(buffer) >= chunk_size:
+            flush()
+    flush()
+    src, dst = src[:filled], dst[:filled]
+
+    categories = {value: index for index, (value, _) in enumerate(CATEGORY_CHOICES)}
+    counts = np.zeros((n, len(categories)), dtype=np.float32)
+    for creator_id, category in Event.objects.values_list("creator_id", "category").iterator(chunk_size=chunk_size):
+        row = np.searchsorted(user_ids, creator_id)
+        if row < n and user_ids[row] == creator_id and category in categories:
+            counts[row, categories[category]] += 1
+
+    return user_ids, FollowGraph(n, src, dst, counts)
+
+
+# ==========================
+#   RECÀLCUL I LECTURA
+# ==========================
+
+def rebuild(memory_mb: int | None = None, top_n: int | None = None, stdout=None) -> dict:
+    """
+    Recalcula i desa els suggeriments de tots els usuaris. Retorna estadístiques.
+    """
+    from pymongo import UpdateOne
+
+    from .models import FollowSuggestions
+
+    started = time.perf_counter()
+    user_ids, graph = load_graph()
+    load_seconds = time.perf_counter() - started
+
+    written = 0
+    blocks = 0
+    now = time.time()
+    for start, end in graph.blocks(memory_mb):
+        ops = []
+        for u, ranked in graph.suggest_block(start, end, top_n=top_n, memory_mb=memory_mb):
+            payload = [
+                {"user_id": int(user_ids[c]), "score": score, "reason": reason, "mutual": mutual}
+                for c, score, reason, mutual in ranked
+            ]
+            ops.append(UpdateOne(
+                {"user_id": int(user_ids[u])},
+                {"$set": {"suggestions": payload, "computed_at": now}},
+                upsert=True,
+            ))
+        if ops:
+            FollowSuggestions.objects.mongo_bulk_write(ops, ordered=False)
+            written += len(ops)
+        blocks += 1
+        if stdout is not None:
+            stdout.write(f"  files {start}-{end}: {written}/{graph.n} usuaris")
+
+    stats = {
+        "users": graph.n,
+        "edges": graph.edges,
+        "graph_mb": round(graph.memory_bytes() / 1e6, 1),
+        "blocks": blocks,
+        "written": written,
+        "load_seconds": round(load_seconds, 2),
+        "total_seconds": round(time.perf_counter() - started, 2),
+    }
+    logger.info("Suggeriments de seguiment recalculats: %s", stats)
+    return stats
+
+
+def get_suggestions(user, limit: int = 5) -> list:
+    """
+    Usuaris suggerits (els que encara no segueix), en ordre, amb `suggestion_reason`
+    (text) i `suggestion_mutual`. Una lectura per clau + els usuaris suggerits.
+    """
+    from django.contrib.auth import get_user_model
+
+    from .models import Follow, FollowSuggestions
+
+    doc = FollowSuggestions.objects.mongo_find_one({"user_id": user.pk}, {"suggestions": 1}) or {}
+    entries = doc.get("suggestions") or []
+    if not entries:
+        return []
+
+    # Els suggeriments són d'abans: treure els que ja ha començat a seguir
+    candidate_ids = [entry["user_id"] for entry in entries[: limit * 3]]
+    followed = set(
+        Follow.objects.filter(follower=user, following_id__in=candidate_ids).values_list("following_id", flat=True)
+    )
+    users = get_user_model().objects.in_bulk(candidate_ids)
+    result = []
+    for entry in entries[: limit * 3]:
+        candidate = users.get(entry["user_id"])
+        if candidate is None or candidate.pk in followed or candidate.pk == user.pk:
+            continue
+        candidate.suggestion_reason = REASON_LABELS.get(entry.get("reason"), "")
+        candidate.suggestion_mutual = entry.get("mutual") or 0
+        result.append(candidate)
+        if len(result) >= limit:
+            break
+    return result
@@ -1,3 +1,151 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.test import SimpleTestCase
+from pymongo import UpdateOne
+
+from users import stats
+from users.models import ProfileStats
+from users.suggestions import BYTES_PER_NNZ, FollowGraph, MemoryBudgetError
+
+
+# ==========================
+#   SUGGERIMENTS DE SEGUIMENT
+# ==========================
+
+def _graph(edges, n=5, categories=None):
+    src, dst = zip(*edges)
+    return FollowGraph(n, np.array(src, dtype=np.int32), np.array(dst, dtype=np.int32), categories)
+
+
+class FollowGraphTests(SimpleTestCase):
+    def setUp(self):
+        # 0 -> 1, 1 -> 2, 1 -> 3, 4 -> 1 (la 2 no segueix ningú)
+        self.graph = _graph([(0, 1), (1, 2), (1, 3), (4, 1), (0, 1)])
+
+    def _suggest(self, u):
+        return dict(self.graph.suggest_block(0, self.graph.n, top_n=5))[u]
+
+    def test_duplicate_edges_count_once(self):
+        self.assertEqual(self.graph.edges, 4)
+        self.assertEqual(self.graph.indeg.tolist(), [0, 2, 1, 1, 0])
+
+    def test_friends_of_friends_exclude_self_and_followed(self):
+        ranked = self._suggest(0)
+        self.assertCountEqual([c for c, *_ in ranked], [2, 3])
+        for _, score, reason, mutual in ranked:
+            self.assertGreater(score, 0)
+            self.assertEqual(reason, "fof")
+            self.assertEqual(mutual, 1)
+
+    def test_without_signal_falls_back_to_popular(self):
+        ranked = self._suggest(2)
+        self.assertEqual([c for c, *_ in ranked], [1, 3])
+        self.assertEqual({reason for _, _, reason, _ in ranked}, {"popular"})
+
+    def test_category_affinity(self):
+        categories = np.zeros((5, 2), dtype=np.float32)
+        categories[1, 0] = 3
+        categories[2, 0] = 1
+        categories[3, 1] = 1
+        graph = _graph([(0, 1), (1, 2), (1, 3)], categories=categories)
+        ranked = dict(graph.suggest_block(0, 1, top_n=5))[0]
+        self.assertEqual([c for c, *_ in ranked], [2, 3])
+
+    def test_blocks_cover_all_rows(self):
+        blocks = list(self.graph.blocks(memory_mb=1))
+        self.assertEqual(blocks, [(0, self.graph.n)])
+
+    def test_graph_over_budget_raises(self):
+        with self.assertRaises(MemoryBudgetError):
+            list(self.graph.blocks(memory_mb=self.graph.memory_bytes() / 2**20 / 2))
+
+    def test_blocks_use_what_the_graph_leaves(self):
+        # Pressupost = graf + 3 valors no nuls: blocs més petits que el graf sencer
+        memory_mb = (self.graph.memory_bytes() + 3 * BYTES_PER_NNZ) / 2**20
+        blocks = list(self.graph.blocks(memory_mb=memory_mb))
+        self.assertGreater(len(blocks), 1)
+        self.assertEqual(blocks[0][0], 0)
+        self.assertEqual(blocks[-1][1], self.graph.n)
+        self.assertTrue(all(a[1] == b[0] for a, b in zip(blocks, blocks[1:])))
+
+    def test_products_match_scipy(self):
+        from scipy import sparse
+
+        rng = np.random.default_rng(0)
+        n = 40
+        graph = _graph(zip(rng.integers(0, n, 300), rng.integers(0, n, 300)), n=n)
+        A = sparse.csr_matrix((np.ones(graph.edges, np.float32), graph.indices, graph.indptr), shape=(n, n))
+        weighted = A @ sparse.diags(graph.cofollow_weight)
+        for start, end in [(0, n), (5, 17)]:
+            block = graph._block(start, end)
+            # Trossos de 7 entrades: la suma per trossos ha de donar el mateix
+            np.testing.assert_allclose(graph._expand(block, limit=7).toarray(), (block @ A).toarray())
+            np.testing.assert_allclose(
+                graph._cofollow(start, end).toarray(), (weighted[start:end] @ A.T).toarray(), rtol=1e-6
+            )
+
+
+# ==========================
+#   ESTADÍSTIQUES DE PERFIL
+# ==========================
+
+class ProfileStatsTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(ProfileStats, "objects")
+        self.objects = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _ops(self):
+        (ops,), _ = self.objects.mongo_bulk_write.call_args
+        return ops
+
+    def test_positive_deltas_upsert(self):
+        stats.follow_changed(1, 2, 1)
+        self.assertEqual(self._ops(), [
+            UpdateOne({"user_id": 1}, {"$inc": {"following": 1}}, upsert=True),
+            UpdateOne({"user_id": 2}, {"$inc": {"followers": 1}}, upsert=True),
+        ])
+        stats.event_created(1, "Programat")
+        self.assertEqual(self._ops(), [
+            UpdateOne({"user_id": 1}, {"$inc": {"events_by_status.Programat": 1}}, upsert=True),
+        ])
+
+    def test_negative_deltas_do_not_upsert(self):
+        # Un decrement arriba després d'esborrar: no ha de recrear el document
+        stats.follow_changed(1, 2, -1)
+        self.assertFalse(any(op._upsert for op in self._ops()))
+        stats.event_deleted(1, "Programat")
+        self.assertEqual(self._ops(), [
+            UpdateOne({"user_id": 1}, {"$inc": {"events_by_status.Programat": -1}}, upsert=False),
+        ])
+        stats.event_status_changed(1, "Programat", "En Directe")
+        self.assertEqual(self._ops(), [UpdateOne(
+            {"user_id": 1},
+            {"$inc": {"events_by_status.Programat": -1, "events_by_status.En Directe": 1}},
+            upsert=False,
+        )])
+
+    def test_unchanged_status_writes_nothing(self):
+        stats.event_status_changed(1, "Programat", "Programat")
+        self.objects.mongo_bulk_write.assert_not_called()
+
+    def test_reconcile_fixes_drift(self):
+        self.objects.mongo_find_one.return_value = {
+            "followers": 3,
+            "following": 1,
+            "events_by_status": {"Programat": 2, "Finalitzat": 0},
+        }
+        real = {"followers": 4, "following": 1, "events_by_status": {"Programat": 2}}
+        with mock.patch.object(stats, "compute", return_value=real):
+            self.assertEqual(stats.reconcile(7, dry_run=True), {"followers": (3, 4)})
+            self.objects.mongo_update_one.assert_not_called()
+            self.assertEqual(stats.reconcile(7), {"followers": (3, 4)})
+        self.objects.mongo_update_one.assert_called_once_with({"user_id": 7}, {"$set": real}, upsert=True)
+
+    def test_reconcile_without_drift(self):
+        self.objects.mongo_find_one.return_value = None
+        real = {"followers": 0, "following": 0, "events_by_status": {}}
+        with mock.patch.object(stats, "compute", return_value=real):
+            self.assertEqual(stats.reconcile(7), {})
+        self.objects.mongo_update_one.assert_not_called()
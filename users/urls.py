@@ -4,7 +4,8 @@ from django.urls import reverse_lazy
 
 from .views import (
     register_view, login_view, logout_view,
-    profile_view, edit_profile_view, public_profile_view
+    profile_view, edit_profile_view, public_profile_view,
+    follow_view, unfollow_view,
 )
 
 app_name = "users"
@@ -34,6 +35,9 @@ urlpatterns = [
         name="password_change_done",
     ),
 
+    path("<str:username>/follow/", follow_view, name="follow"),
+    path("<str:username>/unfollow/", unfollow_view, name="unfollow"),
+
     # PERFIL PÚBLIC (última perquè no tapi rutes)
     path("<str:username>/", public_profile_view, name="public_profile"),
 ]
@@ -3,8 +3,14 @@ from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth import get_user_model
-from django.db import DatabaseError
+from django.db import DatabaseError, IntegrityError
+from django.views.decorators.http import require_POST
+from pymongo.errors import PyMongoError
 
+from events.home_feed import get_home_feed
+
+from . import stats
+from .models import Follow
 from .forms import (
     CustomUserCreationForm,
     CustomAuthenticationForm,
@@ -62,13 +68,28 @@ def logout_view(request):
 
 # HOME
 def home_view(request):
-    return render(request, "home.html")
+    # Portada materialitzada: dades de targeta ja preparades (vegeu events.home_feed)
+    try:
+        feed = get_home_feed()
+    except (DatabaseError, PyMongoError):
+        feed = {}
+    return render(request, "home.html", {"feed": feed})
+
+
+def _profile_stats(user):
+    """
+    Comptadors desnormalitzats del perfil (una lectura, sense agregacions).
+    """
+    try:
+        return stats.get_stats(user.pk)
+    except (DatabaseError, PyMongoError):
+        return None
 
 
 # 2.4 PERFIL PROPI
 @login_required
 def profile_view(request):
-    return render(request, "users/profile.html")
+    return render(request, "users/profile.html", {"stats": _profile_stats(request.user)})
 
 
 # 2.5 EDITAR PERFIL
@@ -89,4 +110,46 @@ def edit_profile_view(request):
 # 2.6 PERFIL PÚBLIC
 def public_profile_view(request, username):
     user_profile = get_object_or_404(User, username=username)
-    return render(request, "users/public_profile.html", {"user_profile": user_profile})
+    is_following = (
+        request.user.is_authenticated
+        and Follow.objects.filter(follower=request.user, following=user_profile).exists()
+    )
+    return render(
+        request,
+        "users/public_profile.html",
+        {
+            "user_profile": user_profile,
+            "is_following": is_following,
+            "stats": _profile_stats(user_profile),
+        },
+    )
+
+
+# 2.7 SEGUIR / DEIXAR DE SEGUIR
+# (el feed "Seguint" s'actualitza als signals: backfill en seguir, prune en deixar-ho)
+@login_required
+@require_POST
+def follow_view(request, username):
+    target = get_object_or_404(User, username=username)
+    if target == request.user:
+        messages.error(request, "No et pots seguir a tu mateix.")
+    else:
+        try:
+            _, created = Follow.objects.get_or_create(follower=request.user, following=target)
+            if created:
+                messages.success(request, f"Ara segueixes {target.display_name or target.username}.")
+        except (IntegrityError, DatabaseError, PyMongoError):
+            messages.error(request, "No s'ha pogut seguir aquest usuari. Torna-ho a provar.")
+    return redirect("users:public_profile", username=username)
+
+
+@login_required
+@require_POST
+def unfollow_view(request, username):
+    target = get_object_or_404(User, username=username)
+    try:
+        Follow.objects.filter(follower=request.user, following=target).delete()
+        messages.info(request, f"Has deixat de seguir {target.display_name or target.username}.")
+    except (DatabaseError, PyMongoError):
+        messages.error(request, "No s'ha pogut deixar de seguir aquest usuari. Torna-ho a provar.")
+    return redirect("users:public_profile", username=username)